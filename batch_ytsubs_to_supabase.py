@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
-import os, sys, argparse, json, re, datetime, requests
+import os, sys, argparse, datetime, asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from typing import Optional, Tuple
 from pathlib import Path
 from dotenv import load_dotenv
 
 # --- YouTube via pytubefix (ohne PoToken) ---
-from pytubefix import YouTube
-from pytubefix.cli import on_progress
+from src.caption_fetcher import CaptionFetcher
+from src.timedtext import clean_timedtext, is_auto_code
+from src.supabase_client import SupabaseClient
+from src.supabase_writer import SupabaseWriter, RowFailure
 
 # --- .env laden ---
 env_path = Path(__file__).parent / '.env'
@@ -33,69 +36,21 @@ if not SUPABASE_SERVICE_ROLE_KEY:
     sys.exit(1)
 
 REST_URL = f"{SUPABASE_URL}/rest/v1"
-HDRS = {
-    "apikey": SUPABASE_SERVICE_ROLE_KEY,
-    "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
-    "Content-Type": "application/json",
-    "Prefer": "resolution=merge-duplicates,return=representation",
-}
-
-def clean_srt_to_text(srt_text: str) -> str:
-    out = []
-    for line in srt_text.splitlines():
-        if re.match(r"^\d+$", line):            # SRT-Index
-            continue
-        if re.match(r"^\d\d:\d\d:\d\d", line):  # Zeitstempel
-            continue
-        if not line.strip():
-            continue
-        out.append(line.strip())
-    return " ".join(out)
-
-def pick_caption(yt: YouTube, prefer: Optional[str]) -> Optional[object]:
-    subs = yt.captions or {}
-    if not subs:
-        return None
-    by_code = {}
-    for k in subs.keys():
-        try:
-            code = getattr(k, "code", None) or str(k)
-            by_code[code] = subs[k.code]
-        except Exception:
-            pass
-    if prefer and prefer in by_code:
-        return by_code[prefer]
-    for fb in ("de", "en"):
-        if fb in by_code:
-            return by_code[fb]
-    return next(iter(by_code.values())) if by_code else None
-
-def fetch_subs(url: str, lang: Optional[str]) -> Tuple[str, Optional[str]]:
-    # Versuch 1: ANDROID
-    try:
-        yt = YouTube(url, on_progress_callback=on_progress)
-        title = yt.title or url
-        cap = pick_caption(yt, lang)
-        if cap:
-            srt = cap.generate_srt_captions()
-            return title, clean_srt_to_text(srt)
-    except Exception as e:
-        print(f"[WARN] ANDROID failed: {e}", file=sys.stderr)
-
-    # Versuch 2: WEB
-    try:
-        yt = YouTube(url, on_progress_callback=on_progress, client="WEB")
-        title = yt.title or url
-        cap = pick_caption(yt, lang)
-        if cap:
-            srt = cap.generate_srt_captions()
-            return title, clean_srt_to_text(srt)
-    except Exception as e:
-        print(f"[WARN] WEB failed: {e}", file=sys.stderr)
-
-    return url, None
-
-def upsert_result(url: str, title: str, text: Optional[str], source: str, priority: int):
+# Gemeinsamer Client mit Keep-Alive-Pool und Retries (siehe .env.example)
+SUPABASE = SupabaseClient.from_env(REST_URL, SUPABASE_SERVICE_ROLE_KEY)
+
+# Untertitel-Abruf mit lokalem Cache und adaptiver Client-Reihenfolge (siehe .env.example)
+CAPTION_FETCHER = CaptionFetcher.from_env()
+
+def fetch_raw(url: str, lang: Optional[str]) -> Tuple[str, Optional[str], Optional[str]]:
+    """Holt die rohe Caption-Spur (XML/json3), ANDROID/WEB adaptiv, mit lokalem Cache. Returns: (title, code, raw)"""
+    return CAPTION_FETCHER.fetch_track(url, lang)
+
+def clean_raw(raw: str, code: Optional[str]) -> Tuple[str, int]:
+    """Spur -> Fließtext; Auto-Spuren ('a.de') ohne rollende Wiederholungen. Returns: (text, eingesparte Bytes)"""
+    return clean_timedtext(raw, dedup=is_auto_code(code))
+
+def build_payload(url: str, text: Optional[str], source: str, priority: int) -> dict:
     now = datetime.datetime.now(datetime.timezone.utc).isoformat()
     payload = {
         "url": url,
@@ -106,52 +61,150 @@ def upsert_result(url: str, title: str, text: Optional[str], source: str, priori
     }
     if text:
         payload["subtitles"] = text
-    r = requests.post(f"{REST_URL}/{SUPABASE_TABLE}?on_conflict=url",
-                      headers=HDRS, json=[payload], timeout=30)
-    if not r.ok:
-        raise RuntimeError(f"Supabase upsert failed: {r.status_code} {r.text}")
+    return payload
+
+def _report_upsert_failure(failure: RowFailure):
+    print(f"[ERR] Supabase upsert fehlgeschlagen für {failure.key}: {failure.error}", file=sys.stderr)
+
+def make_writer(batch_size: int = 50, batch_bytes: int = 4 * 1024 * 1024, batch_interval: float = 10.0) -> SupabaseWriter:
+    """Multi-Row-Upserts mit return=minimal; fehlerhafte Zeilen werden einzeln gemeldet"""
+    return SupabaseWriter(SUPABASE, SUPABASE_TABLE, max_rows=batch_size, max_bytes=batch_bytes,
+                          max_interval=batch_interval, on_failure=_report_upsert_failure)
 
-def load_unprocessed_urls() -> list[str]:
+def iter_unprocessed_pages(page_size: int):
     """
-    Holt alle URLs aus Supabase, bei denen 'processed' = false oder NULL ist.
+    Liefert unverarbeitete Zeilen (id, url) seitenweise, per Keyset nach id sortiert.
+    Keyset statt offset, weil bereits verarbeitete Zeilen während des Laufs
+    aus dem Filter herausfallen und offset sonst Zeilen überspringen würde.
     """
-    params = {
-        "processed": "is.false",
-        "select": "url",
-        "order": "added_at.asc"
-    }
-    r = requests.get(f"{REST_URL}/{SUPABASE_TABLE}", headers=HDRS, params=params, timeout=30)
-    if not r.ok:
-        raise RuntimeError(f"❌ Fehler beim Abruf der URLs: {r.status_code} {r.text}")
-    return [entry["url"] for entry in r.json() if "url" in entry]
+    return SUPABASE.iter_pages(SUPABASE_TABLE, select="id,url", page_size=page_size,
+                               params={"processed": "is.false"})
+
+# --- Pipeline: Reader -> Fetcher-Pool -> Cleaner -> Batch-Writer ---
+_DONE = object()
+
+async def _reader(args, url_q: asyncio.Queue, io_pool: ThreadPoolExecutor, stats: dict):
+    loop = asyncio.get_running_loop()
+    pages = iter_unprocessed_pages(args.page_size)
+    while True:
+        page = await loop.run_in_executor(io_pool, next, pages, None)
+        if page is None:
+            break
+        for row in page:
+            if not row.get("url"):
+                continue
+            stats["read"] += 1
+            await url_q.put((stats["read"], row["url"]))
+    for _ in range(args.fetchers):
+        await url_q.put(_DONE)
+
+async def _fetcher(args, url_q: asyncio.Queue, clean_q: asyncio.Queue, io_pool: ThreadPoolExecutor):
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await url_q.get()
+        if item is _DONE:
+            return
+        i, url = item
+        print(f"[{i}] Hole Untertitel: {url}")
+        title, code, raw = await loop.run_in_executor(io_pool, fetch_raw, url, args.lang)
+        await clean_q.put((i, url, code, raw))
+
+async def _fetch_stage(args, url_q: asyncio.Queue, clean_q: asyncio.Queue, io_pool: ThreadPoolExecutor):
+    # Erst wenn alle Fetcher fertig sind, bekommt jeder Cleaner sein Ende-Signal
+    await asyncio.gather(*(_fetcher(args, url_q, clean_q, io_pool) for _ in range(args.fetchers)))
+    for _ in range(args.cleaners):
+        await clean_q.put(_DONE)
+
+async def _cleaner(args, clean_q: asyncio.Queue, write_q: asyncio.Queue, cpu_pool: ProcessPoolExecutor, stats: dict):
+    # Jeder Cleaner wartet auf genau einen Prozess-Job; args.cleaners Cleaner halten den Pool ausgelastet
+    loop = asyncio.get_running_loop()
+    while True:
+        item = await clean_q.get()
+        if item is _DONE:
+            break
+        i, url, code, raw = item
+        try:
+            text, saved = await loop.run_in_executor(cpu_pool, clean_raw, raw, code) if raw else (None, 0)
+        except Exception as e:
+            # Eine kaputte Spur (z.B. XML-ParseError) betrifft nur diese Zeile, nicht die Pipeline
+            print(f"  [{i}] -> [ERR] Bereinigung fehlgeschlagen: {e}", file=sys.stderr)
+            await write_q.put(build_payload(url, None, args.source, args.priority))
+            continue
+        stats["dedup_saved"] += saved
+        if text:
+            print(f"  [{i}] -> OK ({len(text)} Zeichen" + (f", Rolling-Dedup -{saved} Bytes)" if saved else ")"))
+        else:
+            print(f"  [{i}] -> KEINE Untertitel gefunden / geblockt", file=sys.stderr)
+        await write_q.put(build_payload(url, text, args.source, args.priority))
+    await write_q.put(_DONE)
+
+async def _writer(args, write_q: asyncio.Queue, io_pool: ThreadPoolExecutor, writer: SupabaseWriter):
+    # Der Writer schreibt selbst nach Zeilenzahl, Bytes oder Zeit; add() kann dabei
+    # einen Request auslösen und läuft daher im IO-Pool
+    loop = asyncio.get_running_loop()
+    finished = 0
+    while finished < args.cleaners:
+        item = await write_q.get()
+        if item is _DONE:
+            finished += 1
+            continue
+        await loop.run_in_executor(io_pool, writer.add, item)
+    await loop.run_in_executor(io_pool, writer.close)
+
+async def run_pipeline(args) -> dict:
+    """
+    Verarbeitet alle unverarbeiteten URLs als gestaffelte Pipeline.
+    Begrenzte Queues halten den Speicherbedarf konstant, unabhängig von der Backlog-Größe.
+    """
+    stats = {"read": 0, "ok": 0, "dedup_saved": 0}
+    writer = make_writer(args.batch_size, args.batch_bytes, args.batch_interval)
+    url_q = asyncio.Queue(maxsize=args.fetchers * 2)
+    clean_q = asyncio.Queue(maxsize=max(args.fetchers, args.cleaners) * 2)
+    write_q = asyncio.Queue(maxsize=args.batch_size * 2)
+    with ThreadPoolExecutor(max_workers=args.fetchers + 2, thread_name_prefix="io") as io_pool, \
+         ProcessPoolExecutor(max_workers=args.cleaners) as cpu_pool:
+        await asyncio.gather(
+            _reader(args, url_q, io_pool, stats),
+            _fetch_stage(args, url_q, clean_q, io_pool),
+            *(_cleaner(args, clean_q, write_q, cpu_pool, stats) for _ in range(args.cleaners)),
+            _writer(args, write_q, io_pool, writer),
+        )
+    stats["ok"] = writer.stats["ok"]
+    stats["upserts"] = writer.summary_line()
+    return stats
 
 def main():
     ap = argparse.ArgumentParser(description="Batch YouTube subtitles -> Supabase")
     ap.add_argument("--lang", default=os.getenv("DEFAULT_SUBTITLE_LANG", "de"), help="Bevorzugte Sprachspur, z.B. de oder en")
     ap.add_argument("--source", default=os.getenv("DEFAULT_SOURCE", "vm-cron"), help="Wert für Spalte 'source'")
     ap.add_argument("--priority", type=int, default=int(os.getenv("DEFAULT_PRIORITY", "0")))
+    ap.add_argument("--fetchers", type=int, default=int(os.getenv("SUBTITLE_WORKERS", "4")), help="Parallele Untertitel-Abrufe")
+    ap.add_argument("--cleaners", type=int, default=1, help="Prozesse für das Parsen der Caption-Spuren")
+    ap.add_argument("--page-size", type=int, default=500, help="Zeilen pro Leseseite aus Supabase")
+    ap.add_argument("--batch-size", type=int, default=50, help="Zeilen pro Upsert-Request")
+    ap.add_argument("--batch-bytes", type=int, default=4 * 1024 * 1024, help="Max. Payload-Bytes pro Upsert-Request")
+    ap.add_argument("--batch-interval", type=float, default=10.0, help="Max. Sekunden bis ein Teil-Batch geschrieben wird")
     args = ap.parse_args()
+    if min(args.fetchers, args.cleaners, args.page_size, args.batch_size) < 1:
+        ap.error("--fetchers, --cleaners, --page-size und --batch-size müssen >= 1 sein")
 
-    urls = load_unprocessed_urls()
-    if not urls:
+    try:
+        stats = asyncio.run(run_pipeline(args))
+    except KeyboardInterrupt:
+        print("\nAbbruch durch Benutzer", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        CAPTION_FETCHER.save_stats()
+    if not stats["read"]:
         print("Keine unverarbeiteten URLs gefunden.")
         return
-
-    ok = 0
-    for i, url in enumerate(urls, 1):
-        print(f"[{i}/{len(urls)}] Hole Untertitel: {url}")
-        title, text = fetch_subs(url, args.lang)
-        if text:
-            print(f"  -> OK ({len(text)} Zeichen)")
-        else:
-            print("  -> KEINE Untertitel gefunden / geblockt", file=sys.stderr)
-        try:
-            upsert_result(url, title, text, args.source, args.priority)
-        except Exception as e:
-            print(f"[ERR] Supabase upsert fehlgeschlagen: {e}", file=sys.stderr)
-            continue
-        ok += 1
-    print(f"Fertig. {ok}/{len(urls)} Einträge verarbeitet.")
+    print(f"Fertig. {stats['ok']}/{stats['read']} Einträge verarbeitet.")
+    print(stats["upserts"])
+    print(SUPABASE.summary_line())
+    if stats["dedup_saved"]:
+        print(f"Rolling-Dedup: {stats['dedup_saved'] / 1024:.1f} KB eingespart")
+    for line in CAPTION_FETCHER.summary_lines():
+        print(line)
 
 if __name__ == "__main__":
     main()
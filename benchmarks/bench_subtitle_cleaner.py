@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Benchmark: SRT-Bereinigung alt (zwei re.match pro Zeile) vs. neu (src.subtitle_text)
+Aufruf: python benchmarks/bench_subtitle_cleaner.py [--cues 60000] [--repeat 5]
+"""
+import argparse
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.subtitle_text import clean_srt_to_text
+from tests.test_subtitle_cleaner import legacy_clean_srt_to_text, make_srt
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark SRT -> Text")
+    ap.add_argument("--cues", type=int, default=60_000, help="Anzahl Cues (60k ~ mehrstündiger Vortrag)")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    srt = make_srt(args.cues, seed=1)
+    assert clean_srt_to_text(srt) == legacy_clean_srt_to_text(srt), "Ausgabe weicht ab!"
+    print(f"Eingabe: {args.cues} Cues, {len(srt.encode('utf-8')) / 1e6:.1f} MB")
+
+    results = {}
+    for name, fn in (("alt", legacy_clean_srt_to_text), ("neu", clean_srt_to_text)):
+        best = min(timeit.repeat(lambda: fn(srt), number=1, repeat=args.repeat))
+        results[name] = best
+        print(f"  {name}: {best * 1000:8.1f} ms  ({len(srt) / best / 1e6:6.1f} MB/s)")
+    print(f"  Speedup: {results['alt'] / results['neu']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,7 @@ Kompletter Workflow ohne Django:
 3. Neue URLs zu Supabase hochladen
 4. Untertitel sofort abrufen (pytubefix)
 
-Aufruf: python run_youtube_history_scraper.py [--lang de|en] [--source source-name]
+Aufruf: python run_youtube_history_scraper.py [--lang de|en] [--source source-name] [--workers N]
 """
 import os
 import sys
@@ -16,14 +16,14 @@ import time
 import argparse
 import datetime
 import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Optional, Tuple, Set, List
 import subprocess
 from pathlib import Path
 
 import requests
 import pandas as pd
-from pytubefix import YouTube
-from pytubefix.cli import on_progress
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
@@ -34,6 +34,13 @@ import zipfile
 import shutil
 import io
 
+from src.caption_fetcher import CaptionFetcher
+from src.supabase_client import SupabaseClient
+from src.known_index import KnownUrlIndex
+from src.bloom_filter import BloomPrefilter, bloom_key, find_existing_videos
+from src.video_id import canonicalize_url
+from src.supabase_writer import SupabaseWriter, RowFailure
+
 # --- .env laden ---
 env_path = Path(__file__).parent / '.env'
 if not env_path.exists():
@@ -65,103 +72,66 @@ if not SUPABASE_SERVICE_ROLE_KEY:
     sys.exit(1)
 
 REST_URL = f"{SUPABASE_URL}/rest/v1"
-HDRS = {
-    "apikey": SUPABASE_SERVICE_ROLE_KEY,
-    "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
-    "Content-Type": "application/json",
-    "Prefer": "resolution=merge-duplicates,return=representation",
-}
+EXISTING_PAGE_SIZE = int(os.getenv("SUPABASE_PAGE_SIZE", "1000"))
+# Gemeinsamer Client mit Keep-Alive-Pool und Retries (siehe .env.example)
+SUPABASE = SupabaseClient.from_env(REST_URL, SUPABASE_SERVICE_ROLE_KEY)
 
-# --- Hilfsfunktionen für Untertitel ---
-def clean_srt_to_text(srt_text: str) -> str:
-    """Entfernt SRT-Formatierung und erstellt Fließtext"""
-    out = []
-    for line in srt_text.splitlines():
-        if re.match(r"^\d+$", line):            # SRT-Index
-            continue
-        if re.match(r"^\d\d:\d\d:\d\d", line):  # Zeitstempel
-            continue
-        if not line.strip():
-            continue
-        out.append(line.strip())
-    return " ".join(out)
-
-
-def pick_caption(yt: YouTube, prefer: Optional[str]) -> Optional[object]:
-    """Wählt die beste verfügbare Caption-Spur aus"""
-    subs = yt.captions or {}
-    if not subs:
-        return None
-
-    by_code = {}
-    for k in subs.keys():
-        try:
-            code = getattr(k, "code", None) or str(k)
-            by_code[code] = subs[k.code]
-        except Exception:
-            pass
+def _report_upsert_failure(failure: RowFailure):
+    print(f"  ❌ Supabase-Fehler für {failure.key}: {failure.error}", file=sys.stderr)
 
-    # Bevorzugte Sprache
-    if prefer and prefer in by_code:
-        return by_code[prefer]
 
-    # Fallback: de, dann en
-    for fb in ("de", "en"):
-        if fb in by_code:
-            return by_code[fb]
+# Upserts werden gesammelt und als Multi-Row-Batches geschrieben (siehe .env.example)
+UPSERT_WRITER = SupabaseWriter.from_env(SUPABASE, SUPABASE_TABLE, on_failure=_report_upsert_failure)
 
-    # Letzte Option: irgendeine Caption
-    return next(iter(by_code.values())) if by_code else None
+# Untertitel-Abruf mit lokalem Cache und adaptiver Client-Reihenfolge (siehe .env.example)
+CAPTION_FETCHER = CaptionFetcher.from_env(log_prefix="  ")
 
-
-def fetch_subtitles(url: str, lang: Optional[str]) -> Tuple[str, Optional[str]]:
+# --- Hilfsfunktionen für Untertitel ---
+def fetch_subtitles(url: str, lang: Optional[str]) -> Tuple[str, Optional[str], int]:
     """
     Versucht Untertitel für ein YouTube-Video abzurufen.
-    Probiert erst ANDROID, dann WEB-Client.
+    Probiert erst ANDROID, dann WEB-Client; bereits geladene Spuren kommen aus dem lokalen Cache.
+    Auto-Untertitel werden von rollenden Wiederholungen befreit.
 
-    Returns: (title, subtitle_text)
+    Returns: (title, subtitle_text, durch Dedup eingesparte Bytes)
     """
-    # Versuch 1: ANDROID
-    try:
-        yt = YouTube(url, on_progress_callback=on_progress)
-        title = yt.title or url
-        cap = pick_caption(yt, lang)
-        if cap:
-            srt = cap.generate_srt_captions()
-            return title, clean_srt_to_text(srt)
-    except Exception as e:
-        print(f"  [WARN] ANDROID failed: {e}", file=sys.stderr)
-
-    # Versuch 2: WEB
-    try:
-        yt = YouTube(url, on_progress_callback=on_progress, client="WEB")
-        title = yt.title or url
-        cap = pick_caption(yt, lang)
-        if cap:
-            srt = cap.generate_srt_captions()
-            return title, clean_srt_to_text(srt)
-    except Exception as e:
-        print(f"  [WARN] WEB failed: {e}", file=sys.stderr)
-
-    return url, None
+    title, text, saved = CAPTION_FETCHER.fetch_clean(url, lang)
+    return title, text or None, saved
 
 
 # --- Supabase-Funktionen ---
 def fetch_existing_urls() -> Set[str]:
-    """Holt alle existierenden URLs aus Supabase"""
-    url = f"{REST_URL}/{SUPABASE_TABLE}?select=url"
-    response = requests.get(url, headers=HDRS, timeout=30)
-    if not response.ok:
-        raise RuntimeError(f"Supabase-Query fehlgeschlagen: {response.status_code} {response.text}")
-
-    data = response.json()
-    existing = {row["url"] for row in data if row.get("url")}
-    print(f"ℹ️  {len(existing)} URLs bereits in Supabase vorhanden.")
+    """
+    Holt alle existierenden URLs aus Supabase.
+    Seitenweise per Keyset nach id, damit max-rows die Antwort nicht still
+    abschneidet und nie die ganze Tabelle in einer Antwort im Speicher liegt.
+
+    Returns: Video-IDs (bloom_key), damit auch Zeilen unter Alt-URLs (&t=..., youtu.be) treffen
+    """
+    existing = set()
+    for page in SUPABASE.iter_pages(SUPABASE_TABLE, select="url", page_size=EXISTING_PAGE_SIZE):
+        existing.update(bloom_key(row["url"]) for row in page if row.get("url"))
+    print(f"ℹ️  {len(existing)} Videos bereits in Supabase vorhanden.")
+    return existing
+
+
+def fetch_existing_among(urls: List[str]) -> Set[str]:
+    """
+    Diff-Modus: fragt nur die gescrapten Kandidaten ab - exakt per url=in.(...),
+    den Rest über die Video-ID (find_existing_videos).
+    Returns: die Kandidaten, deren Video bereits in Supabase steht
+    """
+    existing = find_existing_videos(SUPABASE, SUPABASE_TABLE, urls)
+    print(f"ℹ️  {len(existing)} von {len(set(urls))} gescrapten URLs bereits in Supabase vorhanden.")
     return existing
 
 
 def upsert_url_with_subtitles(url: str, title: str, text: Optional[str], source: str, priority: int):
-    """Fügt URL mit Untertiteln in Supabase ein/aktualisiert sie"""
+    """
+    Fügt URL mit Untertiteln in Supabase ein/aktualisiert sie.
+    Die Zeile wird gepuffert und mit dem nächsten Batch geschrieben; Fehler
+    meldet UPSERT_WRITER pro Zeile.
+    """
     now = datetime.datetime.now(datetime.timezone.utc).isoformat()
 
     payload = {
@@ -175,15 +145,7 @@ def upsert_url_with_subtitles(url: str, title: str, text: Optional[str], source:
     if text:
         payload["subtitles"] = text
 
-    r = requests.post(
-        f"{REST_URL}/{SUPABASE_TABLE}?on_conflict=url",
-        headers=HDRS,
-        json=[payload],
-        timeout=30
-    )
-
-    if not r.ok:
-        raise RuntimeError(f"Supabase upsert failed: {r.status_code} {r.text}")
+    UPSERT_WRITER.add(payload)
 
 
 # --- Chrome & Selenium ---
@@ -238,7 +200,8 @@ def scrape_youtube_history() -> List[str]:
 
         print("📋 Extrahiere Video-URLs...")
         elements = driver.find_elements("css selector", 'a[href*="/watch"]')
-        links = list({el.get_attribute("href") for el in elements})
+        # Kanonische URLs: &t=...-/&pp=...-Varianten desselben Videos fallen zusammen
+        links = list({url for el in elements if (url := canonicalize_url(el.get_attribute("href")))})
         print(f"✓ {len(links)} YouTube-Links gesammelt")
 
         # CSV-Backup speichern
@@ -390,6 +353,98 @@ def _create_chrome_driver(options: Options):
         return webdriver.Chrome(service=service, options=options)
 
 
+# --- Verarbeitung neuer URLs ---
+def process_url(url: str, lang: Optional[str], source: str, priority: int,
+                stop_event: Optional[threading.Event] = None) -> Tuple[bool, List[str]]:
+    """
+    Holt Untertitel für eine URL und lädt sie nach Supabase hoch.
+    Die Fortschrittsausgabe wird gesammelt statt direkt gedruckt, damit sich
+    parallele Worker nicht gegenseitig ins Wort fallen.
+
+    Returns: (erfolgreich, Ausgabezeilen)
+    """
+    lines = []
+    title, subtitles, saved = fetch_subtitles(url, lang)
+
+    if subtitles:
+        dedup_note = f" (Rolling-Dedup: -{saved} Bytes)" if saved else ""
+        lines.append(f"  ✓ Untertitel: {len(subtitles)} Zeichen{dedup_note}")
+    else:
+        lines.append(f"  ⚠️  Keine Untertitel verfügbar")
+
+    # Nach Abbruch (Strg+C) nichts mehr schreiben
+    if stop_event is not None and stop_event.is_set():
+        lines.append("  ⏹️  Abgebrochen, kein Upload")
+        return False, lines
+
+    try:
+        upsert_url_with_subtitles(url, title, subtitles, source, priority)
+        return True, lines
+    except Exception as e:
+        lines.append(f"  ❌ Supabase-Fehler: {e}")
+        return False, lines
+
+
+def _print_result_lines(lines: List[str]):
+    for line in lines:
+        print(line, file=sys.stderr if "❌" in line else sys.stdout)
+
+
+def process_urls_sequential(urls: List[str], args) -> List[str]:
+    """Verarbeitet URLs nacheinander. Returns: die tatsächlich hochgeladenen URLs"""
+    uploaded = []
+    for i, url in enumerate(urls, 1):
+        print(f"\n[{i}/{len(urls)}] {url}")
+        try:
+            ok, lines = process_url(url, args.lang, args.source, args.priority)
+        except Exception as e:
+            # Wie im Worker-Pool: ein Fehler betrifft nur diese URL
+            ok, lines = False, [f"  ❌ Fehler: {e}"]
+        _print_result_lines(lines)
+        if ok:
+            uploaded.append(url)
+    return uploaded
+
+
+def process_urls_parallel(urls: List[str], args) -> List[str]:
+    """
+    Verarbeitet URLs mit einem begrenzten Worker-Pool (--workers).
+    Ausgabe erfolgt pro URL, sobald sie fertig ist. Bei Strg+C werden
+    wartende Aufträge verworfen und laufende Worker schreiben nichts mehr.
+
+    Returns: die tatsächlich hochgeladenen URLs
+    """
+    print(f"⚙️  {args.workers} parallele Worker")
+    stop_event = threading.Event()
+    uploaded = []
+    done = 0
+
+    executor = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="subs")
+    try:
+        futures = {
+            executor.submit(process_url, url, args.lang, args.source, args.priority, stop_event): (i, url)
+            for i, url in enumerate(urls, 1)
+        }
+        for future in as_completed(futures):
+            i, url = futures[future]
+            done += 1
+            try:
+                ok, lines = future.result()
+            except Exception as e:
+                ok, lines = False, [f"  ❌ Fehler: {e}"]
+            print(f"\n[{done}/{len(urls)}] (#{i}) {url}")
+            _print_result_lines(lines)
+            if ok:
+                uploaded.append(url)
+    except KeyboardInterrupt:
+        stop_event.set()
+        executor.shutdown(wait=False, cancel_futures=True)
+        print(f"\n⏹️  Stoppe Worker... ({len(uploaded)}/{len(urls)} bereits hochgeladen)")
+        raise
+    executor.shutdown(wait=True)
+    return uploaded
+
+
 # --- Hauptlogik ---
 def main():
     parser = argparse.ArgumentParser(
@@ -411,7 +466,36 @@ def main():
         default=int(os.getenv("DEFAULT_PRIORITY", "0")),
         help="Priorität der URLs"
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("SUBTITLE_WORKERS", "1")),
+        help="Anzahl paralleler Untertitel-Abrufe (1 = sequentiell)"
+    )
+    parser.add_argument(
+        "--dedup",
+        choices=["index", "bloom", "diff", "full"],
+        default=os.getenv("DEDUP_MODE", "index"),
+        help="Abgleich: index = lokaler URL-Index mit inkrementellem Sync, "
+             "bloom = Bloom-Filter, nur 'vielleicht bekannte' Kandidaten abfragen, "
+             "diff = nur gescrapte Kandidaten abfragen, full = ganze Tabelle laden"
+    )
+    parser.add_argument(
+        "--rebuild-bloom",
+        action="store_true",
+        help="Bloom-Filter aus der Tabelle neu aufbauen (nur mit --dedup bloom)"
+    )
+    parser.add_argument(
+        "--bloom-fp-rate",
+        type=float,
+        default=None,
+        help="Ziel-Fehlalarmrate des Bloom-Filters (Standard: BLOOM_FP_RATE bzw. 0.01)"
+    )
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error("--workers muss mindestens 1 sein")
+    if args.bloom_fp_rate is not None and not 0 < args.bloom_fp_rate < 1:
+        parser.error("--bloom-fp-rate muss zwischen 0 und 1 liegen")
 
     print("="*80)
     print("🎬 YouTube History Scraper to Supabase")
@@ -426,8 +510,28 @@ def main():
 
         # 3. Mit Supabase abgleichen
         print("\n🔄 Gleiche mit Supabase ab...")
-        existing_urls = fetch_existing_urls()
-        new_urls = [url for url in scraped_urls if url not in existing_urls]
+        known_index = None
+        bloom = None
+        if args.dedup == "index":
+            known_index = KnownUrlIndex.from_env()
+            known_index.sync(SUPABASE, SUPABASE_TABLE)
+            print(f"ℹ️  {known_index.summary_line()}")
+            new_urls = known_index.filter_new(scraped_urls)
+        elif args.dedup == "bloom":
+            bloom = BloomPrefilter.from_env(args.bloom_fp_rate)
+            bloom.prepare(SUPABASE, SUPABASE_TABLE, rebuild=args.rebuild_bloom)
+            definitely_new, maybe = bloom.split(scraped_urls)
+            existing_urls = bloom.resolve(SUPABASE, SUPABASE_TABLE, maybe) if maybe else set()
+            print(f"ℹ️  {len(existing_urls)} von {len(set(maybe))} 'vielleicht bekannten' URLs bereits in Supabase vorhanden.")
+            new_urls = [url for url in scraped_urls if url not in existing_urls]
+            print(f"ℹ️  {bloom.summary_line()}")
+        else:
+            if args.dedup == "full":
+                existing_ids = fetch_existing_urls()
+                new_urls = [url for url in scraped_urls if bloom_key(url) not in existing_ids]
+            else:
+                existing_urls = fetch_existing_among(scraped_urls)
+                new_urls = [url for url in scraped_urls if url not in existing_urls]
         print(f"✨ {len(new_urls)} neue URLs gefunden")
 
         if not new_urls:
@@ -436,30 +540,34 @@ def main():
 
         # 4. Für jede neue URL: Untertitel holen und uploaden
         print(f"\n📥 Verarbeite {len(new_urls)} neue URLs...")
-        success_count = 0
-
-        for i, url in enumerate(new_urls, 1):
-            print(f"\n[{i}/{len(new_urls)}] {url}")
-
-            # Untertitel abrufen
-            title, subtitles = fetch_subtitles(url, args.lang)
-
-            if subtitles:
-                print(f"  ✓ Untertitel: {len(subtitles)} Zeichen")
-            else:
-                print(f"  ⚠️  Keine Untertitel verfügbar")
-
-            # Zu Supabase hochladen
-            try:
-                upsert_url_with_subtitles(url, title, subtitles, args.source, args.priority)
-                success_count += 1
-            except Exception as e:
-                print(f"  ❌ Supabase-Fehler: {e}", file=sys.stderr)
+        if args.workers > 1:
+            uploaded = process_urls_parallel(new_urls, args)
+        else:
+            uploaded = process_urls_sequential(new_urls, args)
+
+        # Restliche gepufferte Upserts schreiben; fehlgeschlagene Zeilen zählen nicht als Erfolg.
+        # Nur wirklich geschriebene URLs kommen in Index/Bloom, der Rest wird beim nächsten Lauf erneut versucht
+        UPSERT_WRITER.flush()
+        failed = {f.key for f in UPSERT_WRITER.failures}
+        written = [url for url in uploaded if url not in failed]
+        success_count = len(written)
+        if known_index is not None:
+            known_index.add(written)
+            known_index.save()
+        if bloom is not None:
+            bloom.add(written)
+            bloom.save()
 
         # 5. Zusammenfassung
         print("\n" + "="*80)
         print("✅ FERTIG!")
         print(f"📊 {success_count}/{len(new_urls)} URLs erfolgreich verarbeitet")
+        print(f"   {UPSERT_WRITER.summary_line()}")
+        print(f"   {SUPABASE.summary_line()}")
+        if bloom is not None:
+            print(f"   {bloom.summary_line()}")
+        for line in CAPTION_FETCHER.summary_lines():
+            print(f"   {line}")
         print("="*80)
 
     except KeyboardInterrupt:
@@ -468,6 +576,9 @@ def main():
     except Exception as e:
         print(f"\n❌ FEHLER: {e}", file=sys.stderr)
         sys.exit(1)
+    finally:
+        UPSERT_WRITER.close()
+        CAPTION_FETCHER.save_stats()
 
 
 if __name__ == "__main__":
@@ -8,6 +8,7 @@ setup(
         "selenium",
         "pytubefix",
         "pandas",
+        "numpy",
         "requests",
     ],
     entry_points={
@@ -0,0 +1,164 @@
+"""
+Batch-Klassifikation per KI
+Packt viele unsichere Videos in eine Anfrage und erwartet eine JSON-Liste mit
+einer Antwort pro Video. Mehrere Batches laufen begrenzt parallel; lässt sich
+eine Batch-Antwort nicht auswerten, werden die Videos dieses Batches einzeln
+über den bestehenden Einzel-Aufruf klassifiziert. Bei HTTP 429 wartet der Batch
+(Retry-After bzw. exponentiell) und wiederholt sich, statt in Einzelaufrufe zu
+zerfallen - die würden das Limit nur schneller erreichen.
+"""
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import requests
+
+ANSWERS = ("RELEVANT", "IRRELEVANT", "UNSURE")
+PREVIEW_CHARS = 500
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: Optional[float]):
+        super().__init__(f"HTTP 429 (Retry-After: {retry_after})")
+        self.retry_after = retry_after
+
+
+def parse_answers(text: str, count: int) -> Optional[List[str]]:
+    """
+    Liest eine Antwort wie [{"id": 1, "answer": "RELEVANT"}, ...] (auch mit Text drumherum).
+
+    Returns: Antworten in Video-Reihenfolge oder None, wenn nicht jedes Video genau eine gültige Antwort hat
+    """
+    start, end = text.find("["), text.rfind("]")
+    if start < 0 or end < start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except ValueError:
+        return None
+    if not isinstance(data, list) or len(data) != count:
+        return None
+    answers: List[Optional[str]] = [None] * count
+    for entry in data:
+        if not isinstance(entry, dict):
+            return None
+        idx, answer = entry.get("id"), str(entry.get("answer", "")).strip().upper()
+        if not isinstance(idx, int) or not 1 <= idx <= count or answers[idx - 1] or answer not in ANSWERS:
+            return None
+        answers[idx - 1] = answer
+    return answers
+
+
+class AIBatchClassifier:
+    def __init__(self, api: str, api_key: str, model: str, url: str, prompt: str,
+                 single: Callable[[str, Optional[str]], str],
+                 batch_size: int = 20, concurrency: int = 4, timeout: float = 60,
+                 retries: int = 3, backoff: float = 2.0, max_backoff: float = 60.0):
+        """
+        api: "openai" oder "anthropic" (bestimmt Request- und Antwortformat)
+        prompt: Vorlage mit Platzhalter {videos}
+        single: Einzel-Klassifikation (title, subtitles) -> Antwort, Fallback bei unlesbaren Batches
+        retries/backoff: Wiederholungen eines Batches bei HTTP 429
+        """
+        self.api = api
+        self.api_key = api_key
+        self.model = model
+        self.url = url
+        self.prompt = prompt
+        self.single = single
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stats = {"requests": 0, "fallbacks": 0, "throttled": 0}
+        self._lock = threading.Lock()
+
+    def build_prompt(self, items: Sequence[Tuple[str, Optional[str]]]) -> str:
+        videos = []
+        for n, (title, subtitles) in enumerate(items, 1):
+            preview = subtitles[:PREVIEW_CHARS] if subtitles else "Keine Untertitel verfügbar"
+            videos.append(f"Video {n}:\nTitel: {title}\nUntertitel (erste {PREVIEW_CHARS} Zeichen): {preview}")
+        return self.prompt.format(videos="\n\n".join(videos))
+
+    def _request(self, prompt: str, max_tokens: int) -> str:
+        """Returns: Antworttext des Modells (wirft bei HTTP-Fehlern)"""
+        if self.api == "openai":
+            headers = {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"}
+            data = {
+                "model": self.model,
+                "messages": [
+                    {"role": "system", "content": "Du bist ein Experte für Tech-Content-Klassifikation."},
+                    {"role": "user", "content": prompt}
+                ],
+                "temperature": 0.3,
+                "max_tokens": max_tokens
+            }
+        else:
+            headers = {"x-api-key": self.api_key, "anthropic-version": "2023-06-01",
+                       "Content-Type": "application/json"}
+            data = {
+                "model": self.model,
+                "messages": [{"role": "user", "content": prompt}],
+                "max_tokens": max_tokens,
+                "temperature": 0.3
+            }
+        response = requests.post(self.url, headers=headers, json=data, timeout=self.timeout)
+        if response.status_code == 429:
+            retry_after = response.headers.get("Retry-After", "")
+            raise RateLimited(float(retry_after) if retry_after.isdigit() else None)
+        response.raise_for_status()
+        result = response.json()
+        if self.api == "openai":
+            return result["choices"][0]["message"]["content"]
+        return result["content"][0]["text"]
+
+    def _classify_chunk(self, items: Sequence[Tuple[str, Optional[str]]]) -> List[str]:
+        answers = None
+        prompt = self.build_prompt(items)
+        for attempt in range(self.retries + 1):
+            with self._lock:
+                self.stats["requests"] += 1
+            try:
+                # Kompakt ca. 12 Tokens pro Eintrag {"id": n, "answer": "..."}; Reserve für
+                # eingerückte Antworten, sonst scheitert parse_answers an abgeschnittenem JSON
+                text = self._request(prompt, max_tokens=32 * len(items) + 64)
+                answers = parse_answers(text, len(items))
+            except RateLimited as e:
+                if attempt < self.retries:
+                    time.sleep(min(self.max_backoff, e.retry_after or self.backoff * 2 ** attempt))
+                    continue
+                print(f"KI-Batch gedrosselt ({len(items)} Videos), bleibt UNSURE: {e}")
+                with self._lock:
+                    self.stats["throttled"] += 1
+                return ["UNSURE"] * len(items)
+            except Exception as e:
+                print(f"KI-Batch fehlgeschlagen ({len(items)} Videos): {e}")
+            break
+        if answers is None:
+            with self._lock:
+                self.stats["fallbacks"] += 1
+            answers = [self.single(title, subtitles) for title, subtitles in items]
+        return answers
+
+    def classify_many(self, items: Sequence[Tuple[str, Optional[str]]]) -> List[str]:
+        """
+        Klassifiziert (title, subtitles)-Paare in Batches von batch_size,
+        höchstens concurrency Anfragen gleichzeitig.
+
+        Returns: "RELEVANT", "IRRELEVANT" oder "UNSURE" je Eintrag, in Eingabereihenfolge
+        """
+        chunks = [items[i:i + self.batch_size] for i in range(0, len(items), self.batch_size)]
+        if not chunks:
+            return []
+        if len(chunks) == 1:
+            return self._classify_chunk(chunks[0])
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(chunks))) as pool:
+            return [answer for answers in pool.map(self._classify_chunk, chunks) for answer in answers]
+
+    def summary_line(self) -> str:
+        return (f"KI-Batches: {self.stats['requests']} Anfragen, "
+                f"{self.stats['fallbacks']} einzeln nachklassifiziert, {self.stats['throttled']} gedrosselt")
@@ -0,0 +1,254 @@
+"""
+Persistenter Bloom-Filter als Vorfilter für den Abgleich
+Ein paar KB Bitfeld statt der ganzen URL-Liste: "sicher neu" braucht keine
+Supabase-Abfrage mehr, nur "vielleicht bekannt" wird geprüft (resolve) - erst
+exakt per url=in.(...), der Rest über die Video-ID, damit auch Zeilen unter
+alten, nicht kanonischen URLs gefunden werden.
+Der Filter merkt sich die größte id der Tabelle und holt vor jeder Nutzung die
+seitdem eingefügten Zeilen nach (auch aus anderen Skripten). Löschungen
+erzeugen nur Fehlalarme, die die Datenbank-Abfrage auflöst; neu aufgebaut wird
+auf Wunsch, nach BLOOM_REBUILD_HOURS oder wenn der Filter übervoll ist.
+"""
+import os
+import math
+import time
+import struct
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .supabase_client import SupabaseClient
+from .video_id import extract_video_id
+
+DEFAULT_BLOOM_PATH = Path(__file__).resolve().parent.parent / ".cache" / "known_urls.bloom"
+MAGIC = b"BLM1"
+# magic, Bits, Hashfunktionen, Einträge, Kapazität, größte id, Ziel-Fehlerrate, Aufbauzeit
+_HEADER = struct.Struct("<4sQIQQqdd")
+
+
+def bloom_key(url: str) -> str:
+    """Returns: Video-ID (trifft alle URL-Varianten) oder die URL selbst"""
+    return extract_video_id(url) or url
+
+
+def _hash_pairs(keys: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    digests = b"".join(hashlib.blake2b(k.encode("utf-8"), digest_size=16).digest() for k in keys)
+    pairs = np.frombuffer(digests, dtype="<u8").reshape(-1, 2)
+    # h2 ungerade, damit die Doppel-Hash-Folge nicht auf wenige Positionen kollabiert
+    return pairs[:, 0].astype(np.uint64), pairs[:, 1].astype(np.uint64) | np.uint64(1)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, fp_rate: float = 0.01):
+        if not 0 < fp_rate < 1:
+            raise ValueError("fp_rate muss zwischen 0 und 1 liegen")
+        self.capacity = max(1, capacity)
+        self.fp_rate = fp_rate
+        self.num_bits = max(64, math.ceil(-self.capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.num_bits / self.capacity * math.log(2)))
+        self.bits = np.zeros((self.num_bits + 7) // 8, dtype=np.uint8)
+        self.count = 0
+
+    def _positions(self, keys: List[str]) -> np.ndarray:
+        """Returns: (len(keys), num_hashes)-Matrix der Bitpositionen (Kirsch-Mitzenmacher: h1 + i*h2)"""
+        h1, h2 = _hash_pairs(keys)
+        steps = np.arange(self.num_hashes, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.num_bits)
+
+    def add_many(self, keys: Iterable[str]):
+        keys = list(keys)
+        if not keys:
+            return
+        pos = self._positions(keys).ravel()
+        np.bitwise_or.at(self.bits, pos >> np.uint64(3), np.left_shift(1, pos & np.uint64(7)).astype(np.uint8))
+        self.count += len(keys)
+
+    def might_contain_many(self, keys: List[str]) -> np.ndarray:
+        """Returns: bool-Array; False heißt sicher nicht enthalten"""
+        if not keys:
+            return np.zeros(0, dtype=bool)
+        pos = self._positions(keys)
+        hits = (self.bits[pos >> np.uint64(3)] >> (pos & np.uint64(7)).astype(np.uint8)) & 1
+        return hits.all(axis=1)
+
+    def __contains__(self, key: str) -> bool:
+        return bool(self.might_contain_many([key])[0])
+
+    def estimated_fp_rate(self) -> float:
+        """Returns: Fehlalarmrate aus dem Füllgrad (steigt, wenn mehr als capacity Einträge drin sind)"""
+        filled = int(np.unpackbits(self.bits)[:self.num_bits].sum()) / self.num_bits
+        return filled ** self.num_hashes
+
+    @property
+    def nbytes(self) -> int:
+        return self.bits.nbytes
+
+
+def find_existing_videos(client: SupabaseClient, table: str, urls: List[str], column: str = "url",
+                         id_chunk_size: int = 20) -> Set[str]:
+    """
+    Sucht URLs nach Video-ID in der Tabelle. Der exakte Abgleich nutzt den Index
+    auf url; nur was dort fehlt - neue Videos oder Videos unter einer Alt-URL
+    (&t=..., youtu.be, shorts) - geht per like auf die Video-ID.
+
+    Returns: die URLs aus urls, deren Video bereits in der Tabelle steht
+    """
+    existing = client.find_existing(table, column, urls)
+    unresolved: Dict[str, List[str]] = {}
+    for url in urls:
+        video_id = extract_video_id(url)
+        if url not in existing and video_id:
+            unresolved.setdefault(video_id, []).append(url)
+    ids = list(unresolved)
+    for i in range(0, len(ids), id_chunk_size):
+        chunk = ids[i:i + id_chunk_size]
+        # IDs bestehen nur aus [A-Za-z0-9_-] und brauchen in or=(...) kein Quoting;
+        # "_" ist in like ein Platzhalter, darum wird die ID des Treffers nachgeprüft
+        pattern = ",".join(f"{column}.like.*{video_id}*" for video_id in chunk)
+        r = client.get(table, params={"select": column, "or": f"({pattern})"})
+        if not r.ok:
+            raise RuntimeError(f"Supabase-Query fehlgeschlagen: {r.status_code} {r.text}")
+        for row in r.json():
+            video_id = extract_video_id(row.get(column) or "")
+            if video_id in unresolved:
+                existing.update(unresolved[video_id])
+    return existing
+
+
+class BloomPrefilter:
+    def __init__(self, path: Optional[Path] = None, fp_rate: float = 0.01, rebuild_hours: float = 168.0,
+                 page_size: int = 1000):
+        self.path = Path(path) if path else None
+        self.fp_rate = fp_rate
+        self.rebuild_seconds = rebuild_hours * 3600
+        self.page_size = page_size
+        self.filter: Optional[BloomFilter] = None
+        self.max_id = 0
+        self.built_at = 0.0
+        self.stats = {"mode": "-", "caught_up": 0, "definitely_new": 0, "maybe": 0, "false_positives": 0}
+        if self.path:
+            self.load()
+
+    @classmethod
+    def from_env(cls, fp_rate: Optional[float] = None) -> "BloomPrefilter":
+        """Pfad aus BLOOM_PATH (leer = nur im Speicher), Fehlerrate BLOOM_FP_RATE, Neuaufbau alle BLOOM_REBUILD_HOURS"""
+        path = os.getenv("BLOOM_PATH", str(DEFAULT_BLOOM_PATH))
+        return cls(
+            path=Path(path) if path else None,
+            fp_rate=fp_rate if fp_rate is not None else float(os.getenv("BLOOM_FP_RATE", "0.01")),
+            rebuild_hours=float(os.getenv("BLOOM_REBUILD_HOURS", "168")),
+            page_size=int(os.getenv("SUPABASE_PAGE_SIZE", "1000")),
+        )
+
+    # --- Persistenz ---
+    def load(self):
+        try:
+            with open(self.path, "rb") as f:
+                header = f.read(_HEADER.size)
+                bits = np.frombuffer(f.read(), dtype=np.uint8)
+        except FileNotFoundError:
+            return
+        if len(header) != _HEADER.size:
+            return
+        magic, num_bits, num_hashes, count, capacity, max_id, fp_rate, built_at = _HEADER.unpack(header)
+        if magic != MAGIC or len(bits) != (num_bits + 7) // 8:
+            return
+        bloom = BloomFilter(capacity, fp_rate)
+        if (bloom.num_bits, bloom.num_hashes) != (num_bits, num_hashes):
+            return
+        bloom.bits = bits.copy()
+        bloom.count = count
+        self.filter, self.max_id, self.built_at = bloom, max_id, built_at
+
+    def save(self):
+        if not self.path or self.filter is None:
+            return
+        bloom = self.filter
+        header = _HEADER.pack(MAGIC, bloom.num_bits, bloom.num_hashes, bloom.count, bloom.capacity,
+                              self.max_id, bloom.fp_rate, self.built_at)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                f.write(bloom.bits.tobytes())
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    # --- Aufbau und Nachführen ---
+    def needs_rebuild(self) -> bool:
+        bloom = self.filter
+        return (bloom is None
+                or bloom.fp_rate != self.fp_rate
+                or time.time() - self.built_at >= self.rebuild_seconds
+                or bloom.estimated_fp_rate() > 2 * self.fp_rate)
+
+    def _read_urls(self, client: SupabaseClient, table: str, column: str, after: Optional[int]) -> List[str]:
+        urls = []
+        for page in client.iter_pages(table, select=f"id,{column}", page_size=self.page_size, after=after):
+            urls.extend(row[column] for row in page if row.get(column))
+            self.max_id = max(self.max_id, page[-1]["id"])
+        return urls
+
+    def prepare(self, client: SupabaseClient, table: str, column: str = "url", rebuild: bool = False):
+        """
+        Baut den Filter neu auf (auf Wunsch oder wenn fällig) bzw. holt die
+        Zeilen nach, die seit dem letzten Lauf hinzugekommen sind.
+        """
+        if rebuild or self.needs_rebuild():
+            self.max_id = 0
+            urls = self._read_urls(client, table, column, None)
+            # Luft für künftige Läufe, sonst steigt die Fehlalarmrate sofort über das Ziel
+            self.filter = BloomFilter(max(1000, 2 * len(urls)), self.fp_rate)
+            self.filter.add_many(bloom_key(u) for u in urls)
+            self.built_at = time.time()
+            self.stats["mode"] = "neu aufgebaut"
+        else:
+            urls = self._read_urls(client, table, column, self.max_id)
+            self.filter.add_many(bloom_key(u) for u in urls)
+            self.stats["mode"] = "geladen"
+        self.stats["caught_up"] = len(urls)
+        self.save()
+
+    def split(self, urls: List[str]) -> Tuple[List[str], List[str]]:
+        """Returns: (sicher neue URLs, vielleicht bekannte URLs), jeweils in Eingabereihenfolge"""
+        maybe = self.filter.might_contain_many([bloom_key(u) for u in urls])
+        definitely_new = [u for u, hit in zip(urls, maybe) if not hit]
+        candidates = [u for u, hit in zip(urls, maybe) if hit]
+        self.stats["definitely_new"] += len(definitely_new)
+        self.stats["maybe"] += len(candidates)
+        return definitely_new, candidates
+
+    def resolve(self, client: SupabaseClient, table: str, urls: List[str], column: str = "url",
+                id_chunk_size: int = 20) -> Set[str]:
+        """
+        Prüft "vielleicht bekannte" URLs gegen die Tabelle (find_existing_videos).
+        Nicht gefundene URLs werden als Fehlalarm gezählt.
+
+        Returns: die URLs aus urls, deren Video bereits in der Tabelle steht
+        """
+        existing = find_existing_videos(client, table, urls, column, id_chunk_size)
+        self.record_false_positives(sum(1 for url in set(urls) if url not in existing))
+        return existing
+
+    def record_false_positives(self, count: int):
+        self.stats["false_positives"] += count
+
+    def add(self, urls: Iterable[str]):
+        """Frisch geschriebene URLs eintragen (max_id bleibt, der nächste Lauf holt sie ohnehin nach)"""
+        self.filter.add_many(bloom_key(u) for u in urls)
+
+    def summary_line(self) -> str:
+        bloom = self.filter
+        return (f"Bloom-Filter ({self.stats['mode']}): {bloom.count} Einträge in {bloom.nbytes // 1024} KB, "
+                f"Fehlalarmrate Ziel {self.fp_rate:.2%} / geschätzt {bloom.estimated_fp_rate():.2%}, "
+                f"{self.stats['definitely_new']} sicher neu, {self.stats['maybe']} geprüft "
+                f"({self.stats['false_positives']} Fehlalarme)")
@@ -0,0 +1,215 @@
+"""
+Lokaler Caption-Cache
+Speichert Titel, verfügbare Sprachspuren und rohe Caption-Spuren (XML) pro Video-ID
+auf der Platte, damit erneute Läufe (andere --lang, Retry, Re-Klassifizierung)
+ohne Netzwerkzugriff auskommen.
+
+Layout:  <root>/<id[:2]>/<id>/meta.json      Titel + Liste der Spur-Codes
+         <root>/<id[:2]>/<id>/<code>.json    rohe Spur + SHA-256
+
+Mehrere Prozesse dürfen denselben Cache nutzen: Schreiben erfolgt atomar
+(Temp-Datei + os.replace), die LRU-Verdrängung läuft unter einer Lock-Datei.
+"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+from pathlib import Path
+from typing import Optional, List, Dict
+
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / ".cache" / "captions"
+LOCK_NAME = ".evict.lock"
+STALE_LOCK_SECONDS = 120
+
+
+class CaptionCache:
+    def __init__(self, root: Path, max_bytes: int = 512 * 1024 * 1024,
+                 ttl_seconds: float = 30 * 24 * 3600):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._approx_size: Optional[int] = None
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evicted": 0}
+
+    @classmethod
+    def from_env(cls) -> Optional["CaptionCache"]:
+        """
+        Erstellt den Cache aus CAPTION_CACHE_DIR / CAPTION_CACHE_MAX_MB / CAPTION_CACHE_TTL_DAYS.
+        Returns: None wenn CAPTION_CACHE_DIR leer gesetzt ist (Cache deaktiviert)
+        """
+        root = os.getenv("CAPTION_CACHE_DIR", str(DEFAULT_CACHE_DIR))
+        if not root:
+            return None
+        max_mb = float(os.getenv("CAPTION_CACHE_MAX_MB", "512"))
+        ttl_days = float(os.getenv("CAPTION_CACHE_TTL_DAYS", "30"))
+        return cls(Path(root), int(max_mb * 1024 * 1024), ttl_days * 24 * 3600)
+
+    # --- Pfade ---
+    def _video_dir(self, video_id: str) -> Path:
+        return self.root / video_id[:2] / video_id
+
+    @staticmethod
+    def _track_name(code: str) -> str:
+        # Codes wie "a.en" oder "de-DE" sind dateisystemsicher, "/" nicht
+        return code.replace("/", "_") + ".json"
+
+    # --- Lesen ---
+    def _read(self, path: Path) -> Optional[Dict]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        if time.time() - entry.get("fetched_at", 0) > self.ttl_seconds:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)  # LRU: Zugriff als mtime festhalten
+        except OSError:
+            pass
+        return entry
+
+    def get_meta(self, video_id: str) -> Optional[Dict]:
+        """Returns: {"title": str, "tracks": [codes]} oder None"""
+        entry = self._read(self._video_dir(video_id) / "meta.json")
+        if entry is None:
+            self.stats["misses"] += 1
+        return entry
+
+    def get_track(self, video_id: str, code: str) -> Optional[str]:
+        """Returns: rohe Caption-Spur oder None (fehlt, abgelaufen oder beschädigt)"""
+        path = self._video_dir(video_id) / self._track_name(code)
+        entry = self._read(path)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        payload = entry.get("payload", "")
+        if hashlib.sha256(payload.encode("utf-8")).hexdigest() != entry.get("sha256"):
+            self._remove(path)
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        return payload
+
+    # --- Schreiben ---
+    def put_meta(self, video_id: str, title: str, tracks: List[str]):
+        self._write(self._video_dir(video_id) / "meta.json", {
+            "fetched_at": time.time(),
+            "title": title,
+            "tracks": list(tracks),
+        })
+
+    def put_track(self, video_id: str, code: str, payload: str):
+        self._write(self._video_dir(video_id) / self._track_name(code), {
+            "fetched_at": time.time(),
+            "code": code,
+            "sha256": hashlib.sha256(payload.encode("utf-8")).hexdigest(),
+            "payload": payload,
+        })
+
+    def _write(self, path: Path, entry: Dict):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        data = json.dumps(entry, ensure_ascii=False).encode("utf-8")
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            self._remove(Path(tmp))
+            raise
+        self.stats["writes"] += 1
+
+        if self._approx_size is None:
+            self._approx_size = self.total_size()
+        else:
+            self._approx_size += len(data)
+        if self._approx_size > self.max_bytes:
+            self.evict()
+
+    # --- Verdrängung ---
+    def _entries(self) -> List[os.DirEntry]:
+        entries = []
+        for shard in os.scandir(self.root):
+            if not shard.is_dir():
+                continue
+            for video in os.scandir(shard.path):
+                if not video.is_dir():
+                    continue
+                entries.extend(e for e in os.scandir(video.path)
+                               if e.is_file() and not e.name.startswith(".tmp-"))
+        return entries
+
+    def total_size(self) -> int:
+        total = 0
+        for e in self._entries():
+            try:
+                total += e.stat().st_size
+            except FileNotFoundError:
+                pass
+        return total
+
+    def evict(self, target_ratio: float = 0.9) -> int:
+        """
+        Entfernt abgelaufene und am längsten nicht genutzte Einträge, bis der Cache
+        unter target_ratio * max_bytes liegt. Hält bereits ein anderer Prozess den
+        Lock, wird übersprungen.
+
+        Returns: Anzahl gelöschter Dateien
+        """
+        lock = self.root / LOCK_NAME
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            try:
+                if time.time() - lock.stat().st_mtime > STALE_LOCK_SECONDS:
+                    self._remove(lock)
+            except FileNotFoundError:
+                pass
+            return 0
+
+        removed = 0
+        try:
+            os.close(fd)
+            files = []
+            for e in self._entries():
+                try:
+                    st = e.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((st.st_mtime, st.st_size, Path(e.path)))
+            files.sort()
+
+            now = time.time()
+            total = sum(size for _, size, _ in files)
+            target = self.max_bytes * target_ratio
+            for mtime, size, path in files:
+                expired = now - mtime > self.ttl_seconds
+                if total <= target and not expired:
+                    break
+                if self._remove(path):
+                    total -= size
+                    removed += 1
+                    self._remove_empty_dir(path.parent)
+            self._approx_size = total
+        finally:
+            self._remove(lock)
+        self.stats["evicted"] += removed
+        return removed
+
+    @staticmethod
+    def _remove(path: Path) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _remove_empty_dir(path: Path):
+        try:
+            path.rmdir()
+        except OSError:
+            pass
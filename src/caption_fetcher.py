@@ -0,0 +1,337 @@
+"""
+Gemeinsamer Untertitel-Abruf für run_youtube_history_scraper.py und batch_ytsubs_to_supabase.py
+Probiert die pytubefix-Clients (ANDROID, WEB) in der Reihenfolge, die der
+ClientSelector aus den bisherigen Trefferquoten ableitet, und nutzt den lokalen
+CaptionCache, damit bereits geladene Spuren nicht erneut abgerufen werden.
+"""
+import os
+import sys
+import time
+import queue
+import threading
+from collections import deque
+from typing import Optional, Tuple, Dict, Iterable, List, NamedTuple
+
+from pytubefix import YouTube
+from pytubefix.captions import Caption
+from pytubefix.cli import on_progress
+
+from .caption_cache import CaptionCache
+from .video_id import extract_video_id
+from .client_stats import ClientSelector
+from .timedtext import clean_timedtext, is_auto_code
+from .transcript import Transcript
+from .rate_limiter import AdaptiveRateLimiter, Permit, get_youtube_limiter, is_throttle_error, OK, THROTTLED, ERROR, CANCELLED
+
+# Client-Name -> Konstruktor-Argumente für YouTube(); ANDROID ist der pytubefix-Default
+CLIENT_KWARGS = {
+    "ANDROID": {},
+    "WEB": {"client": "WEB"},
+}
+
+def captions_by_code(yt: YouTube) -> Dict[str, Caption]:
+    """Liefert die Caption-Spuren eines Videos als {code: Caption}"""
+    subs = yt.captions or {}
+    by_code = {}
+    for k in subs.keys():
+        try:
+            code = getattr(k, "code", None) or str(k)
+            by_code[code] = subs[k.code]
+        except Exception:
+            pass
+    return by_code
+
+
+def pick_caption_code(codes: Iterable[str], prefer: Optional[str]) -> Optional[str]:
+    """Wählt den besten Spur-Code: bevorzugte Sprache, dann de, dann en, dann irgendeiner"""
+    codes = list(codes)
+    if prefer and prefer in codes:
+        return prefer
+    for fb in ("de", "en"):
+        if fb in codes:
+            return fb
+    return codes[0] if codes else None
+
+
+def pick_caption(yt: YouTube, prefer: Optional[str]) -> Optional[Caption]:
+    """Wählt die beste verfügbare Caption-Spur aus"""
+    by_code = captions_by_code(yt)
+    code = pick_caption_code(by_code, prefer)
+    return by_code[code] if code else None
+
+
+class AttemptResult(NamedTuple):
+    client: str
+    title: Optional[str]
+    codes: List[str]
+    code: Optional[str]
+    xml: Optional[str]
+    error: Optional[Exception]
+    latency: float
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[idx]
+
+
+def video_id_from_url(url: str) -> Optional[str]:
+    """Cache-Schlüssel: kanonische ID, damit &t=...-Varianten denselben Eintrag treffen"""
+    return extract_video_id(url)
+
+
+class CaptionFetcher:
+    def __init__(self, cache: Optional[CaptionCache] = None,
+                 clients: Tuple[str, ...] = ("ANDROID", "WEB"),
+                 selector: Optional[ClientSelector] = None,
+                 limiter: Optional[AdaptiveRateLimiter] = None,
+                 deadline: float = 60.0,
+                 hedge_delay: float = 10.0,
+                 log_prefix: str = ""):
+        self.cache = cache
+        self.clients = clients
+        self.selector = selector
+        self.limiter = limiter
+        self.deadline = deadline
+        self.hedge_delay = hedge_delay
+        self.log_prefix = log_prefix
+        self.latencies = deque(maxlen=10000)
+        self.dedup_stats = {"videos": 0, "saved_bytes": 0}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, log_prefix: str = "") -> "CaptionFetcher":
+        """Fetcher mit Cache, adaptiver Client-Reihenfolge und Deadlines laut .env"""
+        clients = ("ANDROID", "WEB")
+        return cls(
+            cache=CaptionCache.from_env(),
+            clients=clients,
+            selector=ClientSelector.from_env(clients),
+            limiter=get_youtube_limiter(),
+            deadline=float(os.getenv("CAPTION_DEADLINE_SECONDS", "60")),
+            hedge_delay=float(os.getenv("CAPTION_HEDGE_DELAY_SECONDS", "10")),
+            log_prefix=log_prefix,
+        )
+
+    def _warn(self, msg: str):
+        print(f"{self.log_prefix}[WARN] {msg}", file=sys.stderr)
+
+    def client_order(self) -> List[str]:
+        return self.selector.order() if self.selector else list(self.clients)
+
+    def _record(self, client: str, ok: bool, latency: float, timeout: bool = False):
+        if self.selector:
+            self.selector.record(client, ok, latency, timeout=timeout)
+
+    def _from_cache(self, video_id: str, lang: Optional[str]) -> Optional[Tuple[str, Optional[str], Optional[str]]]:
+        meta = self.cache.get_meta(video_id)
+        if meta is None:
+            return None
+        code = pick_caption_code(meta["tracks"], lang)
+        if code is None:
+            # Bekannt: Video hat keine Untertitel
+            self.cache.stats["hits"] += 1
+            return meta["title"], None, None
+        xml = self.cache.get_track(video_id, code)
+        if xml is None:
+            return None
+        return meta["title"], code, xml
+
+    @staticmethod
+    def _attempt(client: str, url: str, lang: Optional[str], cancel: threading.Event,
+                 results: "queue.Queue[AttemptResult]", permit: Optional[Permit]):
+        """Ein Abrufversuch mit einem Client; läuft in einem eigenen Daemon-Thread"""
+        started = time.monotonic()
+        outcome = OK
+        try:
+            yt = YouTube(url, on_progress_callback=on_progress, **CLIENT_KWARGS.get(client, {"client": client}))
+            title = yt.title or url
+            by_code = captions_by_code(yt)
+            code = pick_caption_code(by_code, lang)
+            xml = None
+            if code and not cancel.is_set():
+                xml = by_code[code].xml_captions
+            results.put(AttemptResult(client, title, list(by_code), code, xml, None,
+                                      time.monotonic() - started))
+        except Exception as e:
+            outcome = THROTTLED if is_throttle_error(e) else ERROR
+            results.put(AttemptResult(client, None, [], None, None, e, time.monotonic() - started))
+        finally:
+            if permit is not None:
+                permit.release(outcome)
+
+    def fetch_raw(self, url: str, lang: Optional[str]) -> Tuple[str, Optional[str]]:
+        """Returns: (title, xml) - siehe fetch_track"""
+        title, _, xml = self.fetch_track(url, lang)
+        return title, xml
+
+    def fetch_track(self, url: str, lang: Optional[str]) -> Tuple[str, Optional[str], Optional[str]]:
+        """
+        Holt die rohe Caption-Spur (XML) eines Videos samt Spur-Code.
+
+        Der bevorzugte Client startet sofort. Antwortet er nicht innerhalb von
+        hedge_delay, startet parallel der nächste Client; die erste Antwort mit
+        Untertiteln gewinnt. Schlägt ein Client fehl, startet der nächste sofort.
+        Nach deadline Sekunden wird abgebrochen und noch laufende Versuche werden
+        als Timeout verbucht.
+
+        Returns: (title, code, xml) - xml ist None wenn keine Untertitel gefunden wurden
+        """
+        started = time.monotonic()
+        try:
+            return self._fetch_track(url, lang)
+        finally:
+            with self._lock:
+                self.latencies.append(time.monotonic() - started)
+
+    def _fetch_track(self, url: str, lang: Optional[str]) -> Tuple[str, Optional[str], Optional[str]]:
+        video_id = video_id_from_url(url) if self.cache else None
+        if video_id:
+            cached = self._from_cache(video_id, lang)
+            if cached is not None:
+                return cached
+
+        order = self.client_order()
+        results: "queue.Queue[AttemptResult]" = queue.Queue()
+        running: Dict[str, Tuple[threading.Event, float, Optional[Permit]]] = {}
+        finished: List[str] = []
+        empty: List[Tuple[str, float]] = []
+        empty_title = None
+        now = time.monotonic()
+        deadline_at = now + self.deadline
+        hedge_at = now + self.hedge_delay
+
+        def start_next(blocking: bool = True) -> bool:
+            # Hedges warten nicht auf den Limiter, damit laufende Antworten nicht liegen bleiben
+            client = order[len(running) + len(finished)]
+            permit = None
+            if self.limiter:
+                timeout = max(0.0, deadline_at - time.monotonic()) if blocking else 0.0
+                permit = self.limiter.acquire(timeout=timeout)
+                if permit is None:
+                    return False
+            cancel = threading.Event()
+            running[client] = (cancel, time.monotonic(), permit)
+            threading.Thread(target=self._attempt, args=(client, url, lang, cancel, results, permit),
+                             name=f"caption-{client}", daemon=True).start()
+            return True
+
+        if not start_next():
+            self._warn("Rate-Limit: kein Abruf-Slot innerhalb der Deadline")
+            return url, None, None
+
+        while running:
+            now = time.monotonic()
+            if now >= deadline_at:
+                break
+            can_hedge = len(running) + len(finished) < len(order)
+            wait_until = min(deadline_at, hedge_at) if can_hedge else deadline_at
+            try:
+                res = results.get(timeout=max(0.0, wait_until - now))
+            except queue.Empty:
+                if can_hedge and time.monotonic() >= hedge_at:
+                    start_next(blocking=False)
+                    hedge_at = time.monotonic() + self.hedge_delay
+                continue
+
+            running.pop(res.client, None)
+            finished.append(res.client)
+            if res.error is not None:
+                self._record(res.client, False, res.latency)
+                self._warn(f"{res.client} failed: {res.error}")
+            elif res.xml is None:
+                # Keine Untertitel liegen meist am Video, nicht am Client: nur als Fehlgriff
+                # zählen, wenn ein anderer Client doch eine Spur findet
+                empty.append((res.client, res.latency))
+                empty_title = res.title
+            else:
+                self._record(res.client, True, res.latency)
+                for client, latency in empty:
+                    self._record(client, False, latency)
+                # Verlierer eines Hedges zählen als Fehlgriff mit ihrer bisherigen Laufzeit,
+                # sonst bekäme ein dauerhaft langsamer Client nie schlechtere Werte
+                now = time.monotonic()
+                for client, (cancel, client_started, permit) in running.items():
+                    cancel.set()
+                    if permit is not None:
+                        permit.release(CANCELLED)
+                    self._record(client, False, now - client_started)
+                if video_id:
+                    self.cache.put_meta(video_id, res.title, res.codes)
+                    self.cache.put_track(video_id, res.code, res.xml)
+                return res.title, res.code, res.xml
+
+            # Fehlschlag oder keine Untertitel: nächsten Client ohne Warten starten
+            if len(running) + len(finished) < len(order):
+                start_next(blocking=not running)
+                hedge_at = time.monotonic() + self.hedge_delay
+
+        for client, (cancel, client_started, permit) in running.items():
+            cancel.set()
+            if permit is not None:
+                permit.release(CANCELLED)
+            self._record(client, False, time.monotonic() - client_started, timeout=True)
+            self._warn(f"{client} timeout nach {self.deadline:.0f}s")
+
+        # Nur cachen, wenn ein Client tatsächlich "keine Untertitel" gemeldet hat
+        if video_id and empty_title is not None:
+            self.cache.put_meta(video_id, empty_title, [])
+        return url, None, None
+
+    def fetch_text(self, url: str, lang: Optional[str]) -> Tuple[str, Optional[str]]:
+        """Returns: (title, text) - siehe fetch_clean"""
+        title, text, _ = self.fetch_clean(url, lang)
+        return title, text
+
+    def fetch_clean(self, url: str, lang: Optional[str]) -> Tuple[str, Optional[str], int]:
+        """
+        Holt die Untertitel als Fließtext; die rohe Spur wird direkt geparst (kein SRT-Zwischenschritt).
+        Bei Auto-Spuren werden die rollenden Wiederholungen entfernt.
+
+        Returns: (title, text, eingesparte Bytes) - text ist None wenn keine Untertitel gefunden wurden
+        """
+        title, code, xml = self.fetch_track(url, lang)
+        if not xml:
+            return title, None, 0
+        text, saved = clean_timedtext(xml, dedup=is_auto_code(code))
+        if saved:
+            with self._lock:
+                self.dedup_stats["videos"] += 1
+                self.dedup_stats["saved_bytes"] += saved
+        return title, text, saved
+
+    def fetch_transcript(self, url: str, lang: Optional[str]) -> Tuple[str, Optional[Transcript]]:
+        """
+        Holt die Untertitel als kompaktes Transcript mit Zeitstempeln.
+
+        Returns: (title, transcript) - transcript ist None wenn keine Untertitel gefunden wurden
+        """
+        title, code, xml = self.fetch_track(url, lang)
+        return title, Transcript.from_timedtext(xml, dedup=is_auto_code(code)) if xml else None
+
+    def save_stats(self):
+        """Speichert die Client-Statistik für den nächsten Lauf"""
+        if self.selector:
+            self.selector.save()
+
+    def summary_lines(self) -> List[str]:
+        lines = []
+        with self._lock:
+            latencies = list(self.latencies)
+        if latencies:
+            lines.append(f"Abruf-Latenz pro Video: p50 {percentile(latencies, 50):.1f}s, "
+                         f"p99 {percentile(latencies, 99):.1f}s (Deadline {self.deadline:.0f}s)")
+        if self.selector:
+            lines.extend(self.selector.summary_lines())
+        if self.limiter:
+            lines.append(self.limiter.summary_line())
+        if self.dedup_stats["videos"]:
+            lines.append(f"Rolling-Dedup: {self.dedup_stats['videos']} Auto-Spuren, "
+                         f"{self.dedup_stats['saved_bytes'] / 1024:.1f} KB eingespart")
+        if self.cache:
+            s = self.cache.stats
+            lines.append(f"Caption-Cache: {s['hits']} Treffer, {s['misses']} Fehlgriffe, {s['evicted']} verdrängt")
+        return lines
@@ -0,0 +1,81 @@
+"""
+Klassifizierungs-Cache nach Inhalts-Hash
+Merkt sich pro Zeile den Hash aus bewertetem Text und Filter-Konfiguration
+(VideoFilter.content_key) samt Ergebnis. Stimmt der Hash beim nächsten Lauf
+überein, wird die Zeile weder neu bewertet noch zurückgeschrieben; eine
+Änderung an filter_config ändert den Fingerabdruck und damit alle Hashes.
+"""
+import os
+import json
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parent.parent / ".cache" / "classification_cache.json"
+CACHE_VERSION = 1
+
+
+class ClassificationCache:
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else None
+        # Zeilen-Schlüssel (id bzw. url) -> [content_key, is_relevant, score, method]
+        self.entries: Dict[str, list] = {}
+        self.stats = {"hits": 0, "misses": 0}
+        if self.path:
+            self.load()
+
+    @classmethod
+    def from_env(cls) -> "ClassificationCache":
+        """Pfad aus CLASSIFICATION_CACHE_PATH (leer = nur im Speicher)"""
+        path = os.getenv("CLASSIFICATION_CACHE_PATH", str(DEFAULT_CACHE_PATH))
+        return cls(Path(path) if path else None)
+
+    @staticmethod
+    def row_key(record: Dict) -> str:
+        return str(record.get("id") or record.get("url"))
+
+    def get(self, record: Dict, content_key: str) -> Optional[Tuple[bool, float, str]]:
+        """Returns: gespeichertes (is_relevant, score, method), wenn sich Inhalt und Konfiguration nicht geändert haben"""
+        entry = self.entries.get(self.row_key(record))
+        if entry and entry[0] == content_key:
+            self.stats["hits"] += 1
+            return bool(entry[1]), float(entry[2]), entry[3]
+        self.stats["misses"] += 1
+        return None
+
+    def put(self, record: Dict, content_key: str, result: Tuple[bool, float, str]):
+        is_relevant, score, method = result
+        self.entries[self.row_key(record)] = [content_key, bool(is_relevant), float(score), method]
+
+    def discard(self, record: Dict):
+        """Entfernt den Eintrag einer gelöschten Zeile"""
+        self.entries.pop(self.row_key(record), None)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get("version") == CACHE_VERSION:
+            self.entries = data.get("entries", {})
+
+    def save(self):
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": CACHE_VERSION, "entries": self.entries}, f)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def summary_line(self) -> str:
+        return (f"Klassifizierungs-Cache: {self.stats['hits']} unverändert übersprungen "
+                f"({len(self.entries)} Einträge)")
@@ -0,0 +1,141 @@
+"""
+Adaptive Client-Reihenfolge für den Untertitel-Abruf
+Führt pro pytubefix-Client (ANDROID, WEB, ...) ein gleitendes Fenster aus
+Trefferquote und Latenz und probiert den aktuell besseren Client zuerst.
+Mit kleiner Wahrscheinlichkeit kommt ein anderer Client nach vorne, damit ein
+einmal blockierter Client wieder Messwerte bekommt und sich erholen kann.
+Die Statistik wird zwischen Läufen in einer JSON-Datei gehalten.
+"""
+import os
+import json
+import random
+import tempfile
+import threading
+from collections import deque
+from pathlib import Path
+from typing import Optional, Dict, List, Sequence
+
+DEFAULT_STATS_PATH = Path(__file__).resolve().parent.parent / ".cache" / "client_stats.json"
+
+
+class ClientStats:
+    """Gleitendes Fenster der letzten Versuche eines Clients: (Treffer, Latenz in s, Timeout)"""
+
+    def __init__(self, window: int = 50):
+        self.samples = deque(maxlen=window)
+
+    def record(self, ok: bool, latency: float, timeout: bool = False):
+        self.samples.append((bool(ok), float(latency), bool(timeout)))
+
+    @property
+    def timeouts(self) -> int:
+        return sum(1 for _, _, timeout in self.samples if timeout)
+
+    @property
+    def count(self) -> int:
+        return len(self.samples)
+
+    @property
+    def hit_rate(self) -> float:
+        # Laplace-Glättung: neue Clients starten bei 50% statt 0% oder 100%
+        hits = sum(1 for ok, _, _ in self.samples if ok)
+        return (hits + 1) / (len(self.samples) + 2)
+
+    @property
+    def avg_latency(self) -> float:
+        if not self.samples:
+            return 1.0
+        return sum(lat for _, lat, _ in self.samples) / len(self.samples)
+
+    def expected_cost(self) -> float:
+        """Erwartete Zeit bis zum Treffer (Latenz / Trefferquote) - kleiner ist besser"""
+        return self.avg_latency / self.hit_rate
+
+
+class ClientSelector:
+    def __init__(self, clients: Sequence[str], window: int = 50, path: Optional[Path] = None,
+                 explore: float = 0.1, rng: Optional[random.Random] = None):
+        """explore: Anteil der Abrufe, bei denen ein zufälliger anderer Client zuerst probiert wird"""
+        self.clients = tuple(clients)
+        self.window = window
+        self.path = Path(path) if path else None
+        self.explore = explore
+        self.probes = 0
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
+        self.stats: Dict[str, ClientStats] = {c: ClientStats(window) for c in self.clients}
+        if self.path:
+            self.load()
+
+    @classmethod
+    def from_env(cls, clients: Sequence[str]) -> "ClientSelector":
+        """Pfad aus CLIENT_STATS_PATH (leer = nicht speichern), Fenster aus CLIENT_STATS_WINDOW,
+        Erkundungsanteil aus CLIENT_EXPLORE_RATE"""
+        path = os.getenv("CLIENT_STATS_PATH", str(DEFAULT_STATS_PATH))
+        window = int(os.getenv("CLIENT_STATS_WINDOW", "50"))
+        explore = float(os.getenv("CLIENT_EXPLORE_RATE", "0.1"))
+        return cls(clients, window=window, path=Path(path) if path else None, explore=explore)
+
+    def ranking(self) -> List[str]:
+        """Returns: Clients sortiert nach erwarteten Kosten; bei Gleichstand die Standard-Reihenfolge"""
+        with self._lock:
+            costs = {c: self.stats[c].expected_cost() for c in self.clients}
+        return sorted(self.clients, key=lambda c: (costs[c], self.clients.index(c)))
+
+    def order(self) -> List[str]:
+        """Returns: Reihenfolge für einen Abruf - meist ranking(), mit Anteil explore ein zufälliger anderer Client zuerst"""
+        ranked = self.ranking()
+        with self._lock:
+            if len(ranked) < 2 or self._rng.random() >= self.explore:
+                return ranked
+            probe = self._rng.choice(ranked[1:])
+            self.probes += 1
+        ranked.remove(probe)
+        return [probe] + ranked
+
+    def record(self, client: str, ok: bool, latency: float, timeout: bool = False):
+        with self._lock:
+            self.stats.setdefault(client, ClientStats(self.window)).record(ok, latency, timeout)
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        with self._lock:
+            for client, samples in data.get("clients", {}).items():
+                if client not in self.stats:
+                    continue
+                # Ältere Dateien enthalten noch (Treffer, Latenz) ohne Timeout-Flag
+                for sample in samples[-self.window:]:
+                    self.stats[client].record(*sample)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            data = {"clients": {c: list(s.samples) for c, s in self.stats.items()}}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def summary_lines(self) -> List[str]:
+        lines = [f"Client-Reihenfolge: {' > '.join(self.ranking())}"
+                 + (f" ({self.probes} Erkundungen)" if self.probes else "")]
+        for client in self.clients:
+            s = self.stats[client]
+            hits = sum(1 for ok, _, _ in s.samples if ok)
+            rate = f"{hits / s.count * 100:.0f}%" if s.count else "-"
+            lines.append(f"  {client}: Trefferquote {rate} (n={s.count}, Ø {s.avg_latency:.1f}s, "
+                         f"{s.timeouts} Timeouts)")
+        return lines
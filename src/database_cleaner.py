@@ -3,9 +3,10 @@ Datenbank-Bereinigungs-Tool für YouTube URLs
 Erweiterte Funktionen zum Löschen und Verwalten von URLs
 """
 import os
-import requests
-from typing import List, Dict, Optional
+from typing import List
 from datetime import datetime, timedelta
+from supabase_client import SupabaseClient
+from url_rollup import UrlRollup
 
 SUPABASE_URL = "http://148.230.71.150:8000/rest/v1"
 SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
@@ -15,12 +16,9 @@ if not SUPABASE_KEY:
 
 class DatabaseCleaner:
     def __init__(self):
-        self.headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation"
-        }
+        # Gemeinsamer Client: Keep-Alive statt neuer TCP-Verbindung pro PATCH/DELETE
+        self.client = SupabaseClient.from_env(SUPABASE_URL, SUPABASE_KEY)
+        self.rollup = UrlRollup.from_env()
         self.stats = {
             "deleted": 0,
             "kept": 0,
@@ -31,8 +29,8 @@ class DatabaseCleaner:
         """Löscht alle URLs mit einer bestimmten Klassifizierung"""
         try:
             # Hole alle URLs mit der Klassifizierung
-            fetch_url = f"{SUPABASE_URL}/youtube_urls?classification=eq.{classification}"
-            response = requests.get(fetch_url, headers=self.headers, timeout=30)
+            fetch_url = f"youtube_urls?classification=eq.{classification}"
+            response = self.client.get(fetch_url, timeout=30)
             
             if not response.ok:
                 print(f"✗ Fehler beim Abrufen: {response.status_code}")
@@ -53,8 +51,8 @@ class DatabaseCleaner:
                 return 0
             
             # Lösche URLs
-            delete_url = f"{SUPABASE_URL}/youtube_urls?classification=eq.{classification}"
-            response = requests.delete(delete_url, headers=self.headers, timeout=30)
+            delete_url = f"youtube_urls?classification=eq.{classification}"
+            response = self.client.delete(delete_url, timeout=30)
             
             if response.ok:
                 print(f"✓ {total} URLs gelöscht")
@@ -71,8 +69,8 @@ class DatabaseCleaner:
         """Löscht URLs mit Relevanz-Score unter einem Schwellwert"""
         try:
             # Hole URLs unter dem Score
-            fetch_url = f"{SUPABASE_URL}/youtube_urls?relevance_score=lt.{max_score}"
-            response = requests.get(fetch_url, headers=self.headers, timeout=30)
+            fetch_url = f"youtube_urls?relevance_score=lt.{max_score}"
+            response = self.client.get(fetch_url, timeout=30)
             
             if not response.ok:
                 print(f"✗ Fehler beim Abrufen: {response.status_code}")
@@ -103,8 +101,8 @@ class DatabaseCleaner:
                 return 0
             
             # Lösche URLs
-            delete_url = f"{SUPABASE_URL}/youtube_urls?relevance_score=lt.{max_score}"
-            response = requests.delete(delete_url, headers=self.headers, timeout=30)
+            delete_url = f"youtube_urls?relevance_score=lt.{max_score}"
+            response = self.client.delete(delete_url, timeout=30)
             
             if response.ok:
                 print(f"✓ {total} URLs gelöscht")
@@ -123,11 +121,11 @@ class DatabaseCleaner:
             cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
             
             # Hole alte irrelevante URLs
-            fetch_url = f"{SUPABASE_URL}/youtube_urls"
+            fetch_url = f"youtube_urls"
             fetch_url += f"?classification=eq.IRRELEVANT"
             fetch_url += f"&added_at=lt.{cutoff_date}"
             
-            response = requests.get(fetch_url, headers=self.headers, timeout=30)
+            response = self.client.get(fetch_url, timeout=30)
             
             if not response.ok:
                 print(f"✗ Fehler beim Abrufen: {response.status_code}")
@@ -148,11 +146,11 @@ class DatabaseCleaner:
                 return 0
             
             # Lösche URLs
-            delete_url = f"{SUPABASE_URL}/youtube_urls"
+            delete_url = f"youtube_urls"
             delete_url += f"?classification=eq.IRRELEVANT"
             delete_url += f"&added_at=lt.{cutoff_date}"
             
-            response = requests.delete(delete_url, headers=self.headers, timeout=30)
+            response = self.client.delete(delete_url, timeout=30)
             
             if response.ok:
                 print(f"✓ {total} alte irrelevante URLs gelöscht")
@@ -166,14 +164,14 @@ class DatabaseCleaner:
             return 0
     
     def delete_by_keywords(self, keywords: List[str], in_title: bool = True, 
-                          in_subtitles: bool = False) -> int:
-        """Löscht URLs die bestimmte Keywords enthalten"""
+                          in_subtitles: bool = False, dry_run: bool = False) -> int:
+        """Löscht URLs die bestimmte Keywords enthalten (dry_run: nur zählen)"""
         try:
             all_urls = []
             
             # Hole alle URLs (müssen wir manuell filtern für Keyword-Suche)
-            fetch_url = f"{SUPABASE_URL}/youtube_urls?select=*"
-            response = requests.get(fetch_url, headers=self.headers, timeout=30)
+            fetch_url = f"youtube_urls?select=*"
+            response = self.client.get(fetch_url, timeout=30)
             
             if not response.ok:
                 print(f"✗ Fehler beim Abrufen: {response.status_code}")
@@ -213,63 +211,45 @@ class DatabaseCleaner:
             if len(to_delete) > 5:
                 print(f"  ... und {len(to_delete) - 5} weitere")
             
-            confirm = input("\nDiese URLs löschen? (j/n): ").strip().lower()
-            
-            if confirm != 'j':
-                print("Abgebrochen.")
-                return 0
-            
-            # Lösche URLs einzeln
-            deleted = 0
-            for record in to_delete:
-                url = record.get("url")
-                delete_url = f"{SUPABASE_URL}/youtube_urls?url=eq.{requests.utils.quote(url)}"
-                response = requests.delete(delete_url, headers=self.headers, timeout=10)
-                if response.ok:
-                    deleted += 1
-            
-            print(f"✓ {deleted} URLs gelöscht")
-            return deleted
+            if not dry_run:
+                confirm = input("\nDiese URLs löschen? (j/n): ").strip().lower()
+                
+                if confirm != 'j':
+                    print("Abgebrochen.")
+                    return 0
+            
+            # Gebündelt über die ID löschen (id=in.(...), parallele Blöcke)
+            result = self.client.bulk_delete("youtube_urls", [r["id"] for r in to_delete], dry_run=dry_run)
+            self.stats["errors"] += result.failed
+            if result.failed:
+                print(f"✗ {result.failed} URLs konnten nicht gelöscht werden")
+            if dry_run:
+                print(f"ℹ️  Trockenlauf: {result.deleted} URLs würden gelöscht")
+            else:
+                self.stats["deleted"] += result.deleted
+                print(f"✓ {result.deleted} URLs gelöscht")
+            return result.deleted
             
         except Exception as e:
             print(f"✗ Fehler: {e}")
             return 0
     
-    def show_statistics(self):
-        """Zeigt Statistiken der Datenbank"""
+    def show_statistics(self, trend_days: int = 7):
+        """
+        Zeigt Statistiken der Datenbank. Die Zählungen laufen als HEAD mit
+        count=exact (keine Zeilen im Body), der Trend kommt aus dem lokalen Rollup,
+        das hier nur um neue Zeilen ergänzt wird (Neuaufbau: rebuild_trend).
+        """
         try:
-            # Gesamtanzahl
-            response = requests.get(
-                f"{SUPABASE_URL}/youtube_urls?select=*",
-                headers={**self.headers, "Prefer": "count=exact"},
-                timeout=30
-            )
-            total = int(response.headers.get("content-range", "0-0/0").split("/")[1])
-            
-            # Nach Klassifizierung
-            stats = {}
-            for classification in ["RELEVANT", "IRRELEVANT", None]:
-                if classification:
-                    url = f"{SUPABASE_URL}/youtube_urls?classification=eq.{classification}&select=*"
-                else:
-                    url = f"{SUPABASE_URL}/youtube_urls?classification=is.null&select=*"
-                
-                response = requests.get(
-                    url,
-                    headers={**self.headers, "Prefer": "count=exact"},
-                    timeout=30
-                )
-                count = int(response.headers.get("content-range", "0-0/0").split("/")[1])
-                stats[classification or "UNCLASSIFIED"] = count
-            
-            # Nach Verarbeitung
-            processed_url = f"{SUPABASE_URL}/youtube_urls?processed=eq.true&select=*"
-            response = requests.get(
-                processed_url,
-                headers={**self.headers, "Prefer": "count=exact"},
-                timeout=30
-            )
-            processed = int(response.headers.get("content-range", "0-0/0").split("/")[1])
+            counts = self.client.count_many("youtube_urls", {
+                "total": {},
+                "processed": {"processed": "eq.true"},
+                "RELEVANT": {"classification": "eq.RELEVANT"},
+                "IRRELEVANT": {"classification": "eq.IRRELEVANT"},
+                "UNCLASSIFIED": {"classification": "is.null"},
+            })
+            total = counts["total"]
+            processed = counts["processed"]
             
             # Ausgabe
             print("\n" + "="*60)
@@ -279,17 +259,43 @@ class DatabaseCleaner:
             print(f"Verarbeitet:        {processed}")
             print(f"Unverarbeitet:      {total - processed}")
             print("\nKlassifizierung:")
-            print(f"  Relevant:         {stats.get('RELEVANT', 0)}")
-            print(f"  Irrelevant:       {stats.get('IRRELEVANT', 0)}")
-            print(f"  Unklassifiziert:  {stats.get('UNCLASSIFIED', 0)}")
+            print(f"  Relevant:         {counts['RELEVANT']}")
+            print(f"  Irrelevant:       {counts['IRRELEVANT']}")
+            print(f"  Unklassifiziert:  {counts['UNCLASSIFIED']}")
             
             if total > 0:
-                relevance_rate = (stats.get('RELEVANT', 0) / total) * 100
+                relevance_rate = (counts['RELEVANT'] / total) * 100
                 print(f"\n✨ Relevanz-Rate:    {relevance_rate:.1f}%")
             
         except Exception as e:
             print(f"✗ Fehler beim Abrufen der Statistiken: {e}")
+            return
+        
+        try:
+            self.rollup.sync(self.client, "youtube_urls")
+        except Exception as e:
+            print(f"✗ Rollup nicht aktualisiert: {e}")
+        if self.rollup.needs_rebuild():
+            print("\nℹ️  Trend-Rollup fehlt oder ist veraltet - Neuaufbau über Option 6")
+        recent = self.rollup.recent(trend_days)
+        if recent:
+            print(f"\n📈 Neue URLs (letzte {len(recent)} Tage mit Einträgen):")
+            for day, per_source in recent:
+                sources = ", ".join(f"{src}: {n}" for src, n in sorted(per_source.items(), key=lambda i: -i[1]))
+                print(f"  {day}  {sum(per_source.values()):>5}  ({sources})")
+            print("\nNach Quelle (gesamt):")
+            for source, n in list(self.rollup.by_source().items())[:5]:
+                print(f"  {source:<18} {n}")
     
+    def rebuild_trend(self):
+        """Baut das Trend-Rollup aus der ganzen Tabelle neu auf (liest id, added_at, source)"""
+        print("⏳ Baue Trend-Rollup neu auf...")
+        try:
+            rows = self.rollup.rebuild(self.client, "youtube_urls")
+            print(f"✓ {rows} Zeilen gezählt")
+        except Exception as e:
+            print(f"✗ Neuaufbau fehlgeschlagen: {e}")
+
     def interactive_clean(self):
         """Interaktive Bereinigung mit Vorschau"""
         while True:
@@ -305,9 +311,10 @@ class DatabaseCleaner:
             print("3. Lösche alte irrelevante URLs")
             print("4. Lösche URLs mit bestimmten Keywords")
             print("5. Statistiken aktualisieren")
+            print("6. Trend-Rollup neu aufbauen (liest die ganze Tabelle)")
             print("0. Beenden")
             
-            choice = input("\nDeine Wahl (0-5): ").strip()
+            choice = input("\nDeine Wahl (0-6): ").strip()
             
             if choice == "1":
                 self.delete_by_classification("IRRELEVANT")
@@ -328,12 +335,16 @@ class DatabaseCleaner:
                 
                 in_title = scope in ["1", "3"]
                 in_subtitles = scope in ["2", "3"]
+                dry_run = input("Nur Trockenlauf (zählen, nichts löschen)? (j/n): ").strip().lower() == "j"
                 
-                self.delete_by_keywords(keywords, in_title, in_subtitles)
+                self.delete_by_keywords(keywords, in_title, in_subtitles, dry_run=dry_run)
                 
             elif choice == "5":
                 continue  # Statistiken werden automatisch aktualisiert
                 
+            elif choice == "6":
+                self.rebuild_trend()
+                
             elif choice == "0":
                 print("\n👋 Beendet")
                 break
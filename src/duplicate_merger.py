@@ -0,0 +1,150 @@
+"""
+Einmaliges Backfill: Duplikate desselben Videos zusammenführen
+Findet Zeilen, deren URLs auf dieselbe Video-ID zeigen (z.B. watch?v=X und
+watch?v=X&t=72s&pp=...), führt sie in einer Zeile mit kanonischer URL zusammen
+und löscht die übrigen. Auch einzelne Zeilen mit nicht-kanonischer URL werden
+umgeschrieben. Ohne --apply wird nur angezeigt, was passieren würde.
+
+Nutzung (aus dem Projektverzeichnis):
+    python -m src.duplicate_merger            # Trockenlauf
+    python -m src.duplicate_merger --apply
+"""
+import os
+import sys
+import argparse
+import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from .supabase_client import SupabaseClient, in_filter
+from .video_id import extract_video_id, canonical_url
+
+# Spalten, die vom Behalter übernommen bzw. aus Duplikaten ergänzt werden
+MERGE_FIELDS = ("title", "subtitles", "processed_at", "source", "classification",
+                "relevance_score", "classification_method", "classified_at")
+
+
+class MergePlan(NamedTuple):
+    video_id: str
+    keeper_id: int
+    delete_ids: List[int]
+    patch: Dict            # Felder ohne url, die beim Behalter ergänzt werden
+    url: Optional[str]     # neue kanonische URL, None wenn schon kanonisch
+
+
+def find_duplicate_groups(rows: Iterable[Dict]) -> Dict[str, List[Dict]]:
+    """
+    Gruppiert Zeilen (mind. id, url) nach Video-ID.
+
+    Returns: {video_id: Zeilen} nur für Gruppen mit Duplikaten oder nicht-kanonischer URL
+    """
+    groups: Dict[str, List[Dict]] = {}
+    for row in rows:
+        video_id = extract_video_id(row.get("url") or "")
+        if video_id:
+            groups.setdefault(video_id, []).append(row)
+    return {vid: grp for vid, grp in groups.items()
+            if len(grp) > 1 or grp[0]["url"] != canonical_url(vid)}
+
+
+def _keeper_rank(row: Dict):
+    # Zeile mit Untertiteln bevorzugen, dann verarbeitete, dann klassifizierte, dann die älteste
+    return (not row.get("subtitles"), not row.get("processed"), row.get("classification") is None, row["id"])
+
+
+def merge_group(video_id: str, rows: List[Dict]) -> MergePlan:
+    """Plant das Zusammenführen einer Gruppe vollständiger Zeilen"""
+    ordered = sorted(rows, key=_keeper_rank)
+    keeper, others = ordered[0], ordered[1:]
+    patch: Dict = {}
+    for field in MERGE_FIELDS:
+        if keeper.get(field) is None:
+            value = next((r[field] for r in others if r.get(field) is not None), None)
+            if value is not None:
+                patch[field] = value
+    if not keeper.get("processed") and any(r.get("processed") for r in others):
+        patch["processed"] = True
+    priorities = [r["priority"] for r in rows if r.get("priority") is not None]
+    if priorities and max(priorities) != keeper.get("priority"):
+        patch["priority"] = max(priorities)
+    added = [r["added_at"] for r in rows if r.get("added_at")]
+    if added:
+        earliest = min(added, key=lambda v: datetime.datetime.fromisoformat(v.replace("Z", "+00:00")))
+        if earliest != keeper.get("added_at"):
+            patch["added_at"] = earliest
+    target = canonical_url(video_id)
+    return MergePlan(video_id, keeper["id"], [r["id"] for r in others], patch,
+                     target if keeper["url"] != target else None)
+
+
+def apply_plan(client: SupabaseClient, table: str, plan: MergePlan):
+    """
+    Reihenfolge: erst Daten beim Behalter ergänzen, dann Duplikate löschen,
+    zuletzt die URL umschreiben (url ist unique, die kanonische URL kann noch
+    einem Duplikat gehören). So geht bei einem Abbruch nichts verloren.
+    """
+    if plan.patch:
+        _check(client.patch(f"{table}?id=eq.{plan.keeper_id}", json=plan.patch))
+    if plan.delete_ids:
+        _check(client.delete(table, params={"id": in_filter(map(str, plan.delete_ids))}))
+    if plan.url:
+        _check(client.patch(f"{table}?id=eq.{plan.keeper_id}", json={"url": plan.url}))
+
+
+def _check(response):
+    if not response.ok:
+        raise RuntimeError(f"Supabase-Fehler: {response.status_code} {response.text}")
+
+
+def fetch_full_rows(client: SupabaseClient, table: str, ids: List[int]) -> List[Dict]:
+    r = client.get(table, params={"select": "*", "id": in_filter(map(str, ids))})
+    _check(r)
+    return r.json()
+
+
+def main():
+    from dotenv import load_dotenv
+    load_dotenv(Path(__file__).resolve().parent.parent / ".env")
+
+    ap = argparse.ArgumentParser(description="Führt Duplikate desselben Videos in youtube_urls zusammen")
+    ap.add_argument("--apply", action="store_true", help="Änderungen wirklich schreiben (sonst Trockenlauf)")
+    ap.add_argument("--table", default=os.getenv("SUPABASE_TABLE", "youtube_urls"))
+    args = ap.parse_args()
+
+    if not os.getenv("SUPABASE_URL") or not os.getenv("SUPABASE_SERVICE_KEY"):
+        print("❌ FEHLER: SUPABASE_URL / SUPABASE_SERVICE_KEY nicht gesetzt!")
+        sys.exit(1)
+    client = SupabaseClient.from_env()
+
+    print("🔍 Lese id/url aller Zeilen...")
+    rows = [row for page in client.iter_pages(args.table, select="id,url") for row in page]
+    groups = find_duplicate_groups(rows)
+    duplicates = sum(len(g) - 1 for g in groups.values())
+    print(f"ℹ️  {len(rows)} Zeilen, {len(groups)} Videos betroffen, {duplicates} Duplikate")
+
+    merged = 0
+    for video_id, group in groups.items():
+        plan = merge_group(video_id, fetch_full_rows(client, args.table, [r["id"] for r in group]))
+        action = f"behalte #{plan.keeper_id}"
+        if plan.delete_ids:
+            action += f", lösche {plan.delete_ids}"
+        if plan.url:
+            action += ", URL -> kanonisch"
+        if plan.patch:
+            action += f", ergänze {sorted(plan.patch)}"
+        print(f"  {video_id}: {action}")
+        if args.apply:
+            try:
+                apply_plan(client, args.table, plan)
+                merged += 1
+            except RuntimeError as e:
+                print(f"  ❌ {video_id}: {e}", file=sys.stderr)
+
+    if args.apply:
+        print(f"✅ {merged}/{len(groups)} Videos zusammengeführt")
+    else:
+        print("Trockenlauf - mit --apply ausführen, um die Änderungen zu schreiben.")
+
+
+if __name__ == "__main__":
+    main()
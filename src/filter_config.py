@@ -55,6 +55,18 @@ EXCLUDE_KEYWORDS = {
     'shorts', 'tiktok', 'instagram reels'
 }
 
+# Keywords matchen nur an Wortgrenzen ("ai" nicht in "maintain"); ab
+# KEYWORD_SUFFIX_MIN_LEN Zeichen sind diese Endungen erlaubt ("robots", "databases")
+KEYWORD_SUFFIXES = ("s", "es")
+KEYWORD_SUFFIX_MIN_LEN = 4
+
+# Starke Indikatoren zählen dreifach
+STRONG_INDICATORS = {'ai', 'künstliche intelligenz', 'machine learning',
+                     'gpt', 'programming', 'coding', 'robotics'}
+
+# Wie viele Zeichen der Untertitel in den Keyword-Score eingehen (0 = komplettes Transkript)
+SUBTITLE_SCORE_CHARS = int(os.environ.get("SUBTITLE_SCORE_CHARS", "1000"))
+
 # --- KI-basierte Analyse Konfiguration ---
 # OpenAI API (optional, falls du OpenAI nutzen möchtest)
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
@@ -67,6 +79,14 @@ ANTHROPIC_MODEL = "claude-3-haiku-20240307"  # Schnelles, günstiges Modell
 # Welche API soll primär genutzt werden? ("openai", "anthropic", oder None für nur Keywords)
 PREFERRED_AI_API = os.environ.get("PREFERRED_AI_API", None)
 
+# API-Endpunkte (überschreibbar, z.B. für Proxies oder lokale Test-Server)
+OPENAI_API_URL = os.environ.get("OPENAI_API_URL", "https://api.openai.com/v1/chat/completions")
+ANTHROPIC_API_URL = os.environ.get("ANTHROPIC_API_URL", "https://api.anthropic.com/v1/messages")
+
+# Batch-Klassifikation: so viele Videos pro Anfrage, so viele Anfragen gleichzeitig
+AI_BATCH_SIZE = int(os.environ.get("AI_BATCH_SIZE", "20"))
+AI_BATCH_CONCURRENCY = int(os.environ.get("AI_BATCH_CONCURRENCY", "4"))
+
 # --- Filter-Einstellungen ---
 # Minimum Score für Keyword-Matching (0-1)
 MIN_KEYWORD_SCORE = 0.3
@@ -93,4 +113,20 @@ IRRELEVANT - wenn das Video nichts mit den Themen zu tun hat
 UNSURE - wenn du dir nicht sicher bist
 
 Antwort:
-"""
\ No newline at end of file
+"""
+# Batch-Variante: mehrere Videos pro Anfrage, Antwort als JSON-Liste
+AI_BATCH_PROMPT = """
+Analysiere die folgenden YouTube-Videos (Titel und Untertitel-Anfang) und bestimme
+für jedes, ob es relevant für jemanden ist, der sich für folgende Themen interessiert:
+- Künstliche Intelligenz / Machine Learning
+- Programmierung / Software-Entwicklung
+- Computer / Technologie
+- Robotik / Automation
+
+{videos}
+
+Antworte NUR mit einer kompakten JSON-Liste (eine Zeile, ohne Einrückung),
+ein Eintrag pro Video in derselben Reihenfolge:
+[{{"id": 1, "answer": "RELEVANT"}}, {{"id": 2, "answer": "IRRELEVANT"}}, ...]
+answer ist RELEVANT, IRRELEVANT oder UNSURE (wenn du dir nicht sicher bist).
+"""
@@ -0,0 +1,109 @@
+"""
+Aho-Corasick-Keyword-Matcher
+Findet alle Include- und Exclude-Keywords in einem einzigen Durchlauf über den
+Text, statt für jedes Keyword einen eigenen Substring-Scan zu machen. Treffer
+zählen nur an Wortgrenzen ("ai" nicht in "maintain"); längere Keywords dürfen
+eine Endung wie "s" tragen ("robots", "databases").
+"""
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+
+
+def _is_word_char(c: str) -> bool:
+    return c.isalnum() or c == "_"
+
+
+class KeywordMatcher:
+    def __init__(self, groups: Dict[str, Iterable[str]], suffixes: Iterable[str] = (),
+                 suffix_min_len: int = 4):
+        """
+        groups: {Gruppenname: Keywords}, z.B. {"include": TECH_KEYWORDS, "exclude": EXCLUDE_KEYWORDS}
+        suffixes: erlaubte Endungen hinter Keywords ab suffix_min_len Zeichen
+        """
+        self.groups = list(groups)
+        self.suffixes = tuple(suffixes)
+        self.suffix_min_len = suffix_min_len
+        # Trie als Liste von Dicts; outputs[state] = Keywords, die in state enden (inkl. Fail-Kette)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._outputs: List[List[str]] = [[]]
+        self._labels: Dict[str, List[str]] = {}
+        for group, keywords in groups.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword:
+                    self._labels.setdefault(keyword, []).append(group)
+        for keyword in self._labels:
+            self._insert(keyword)
+        self._link()
+
+    def _insert(self, keyword: str):
+        state = 0
+        for c in keyword:
+            nxt = self._goto[state].get(c)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][c] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._outputs.append([])
+            state = nxt
+        self._outputs[state].append(keyword)
+
+    def _link(self):
+        # Breitensuche: Fail-Link = längstes echtes Suffix, das auch Präfix eines Keywords ist
+        queue = list(self._goto[0].values())
+        head = 0
+        while head < len(queue):
+            state = queue[head]
+            head += 1
+            for c, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and c not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(c, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._outputs[nxt] = self._outputs[nxt] + self._outputs[self._fail[nxt]]
+        # Fail-Links in vollständige Übergänge auflösen (DFA): pro Zeichen genau ein Dict-Lookup
+        self._delta: List[Dict[str, int]] = [dict(self._goto[0])] + [{} for _ in self._goto[1:]]
+        for state in queue:
+            self._delta[state] = {**self._delta[self._fail[state]], **self._goto[state]}
+
+    def _ends_at_boundary(self, text: str, keyword: str, end: int) -> bool:
+        if end >= len(text) or not _is_word_char(keyword[-1]) or not _is_word_char(text[end]):
+            return True
+        if len(keyword) < self.suffix_min_len:
+            return False
+        for suffix in self.suffixes:
+            after = end + len(suffix)
+            if text.startswith(suffix, end) and (after >= len(text) or not _is_word_char(text[after])):
+                return True
+        return False
+
+    def find_all(self, text: str) -> Iterator[Tuple[int, str]]:
+        """
+        Ein Durchlauf über den (kleingeschriebenen) Text.
+
+        Returns: Iterator über (Startposition, Keyword) aller Treffer an Wortgrenzen
+        """
+        text = text.lower()
+        delta, outputs = self._delta, self._outputs
+        state = 0
+        for i, c in enumerate(text):
+            state = delta[state].get(c, 0)
+            if not outputs[state]:  # Normalfall, spart den Schleifenaufbau
+                continue
+            for keyword in outputs[state]:
+                start = i - len(keyword) + 1
+                if start > 0 and _is_word_char(keyword[0]) and _is_word_char(text[start - 1]):
+                    continue
+                if self._ends_at_boundary(text, keyword, i + 1):
+                    yield start, keyword
+
+    def scan(self, text: str) -> Dict[str, Set[str]]:
+        """Returns: {Gruppenname: gefundene Keywords} (jede Gruppe ist enthalten, ggf. leer)"""
+        hits: Dict[str, Set[str]] = {group: set() for group in self.groups}
+        for _, keyword in self.find_all(text):
+            for group in self._labels[keyword]:
+                hits[group].add(keyword)
+        return hits
@@ -0,0 +1,218 @@
+"""
+Lokaler Index bekannter URLs mit High-Watermark-Sync
+Hält alle bereits in Supabase gespeicherten Videos lokal vor - als kompakte
+VideoIdSet (8 Byte pro ID) plus einer kleinen Menge für URLs ohne Video-ID - und
+merkt sich das größte (added_at, id)-Paar. Beim Start werden nur Zeilen
+nachgeladen, die danach hinzugekommen sind; in größeren Abständen erfolgt ein
+vollständiger Abgleich, damit Löschungen (z.B. durch DatabaseCleaner) ankommen.
+"""
+import os
+import sys
+import json
+import time
+import tempfile
+import datetime
+from pathlib import Path
+from typing import Optional, Iterable, Tuple, Set, Dict, List
+
+import numpy as np
+
+from .supabase_client import SupabaseClient
+from .video_id import extract_video_id, is_encodable
+from .video_id_set import VideoIdSet, encode_video_ids
+
+DEFAULT_INDEX_PATH = Path(__file__).resolve().parent.parent / ".cache" / "known_urls.json"
+INDEX_VERSION = 3  # 3: Video-IDs als uint64 in <path>.ids, Meta + Rest-URLs im JSON
+
+
+def _parse_ts(value: str) -> datetime.datetime:
+    # PostgREST kürzt Nachkommastellen; fromisoformat vergleicht korrekt, der String nicht immer
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class KnownUrlIndex:
+    def __init__(self, path: Optional[Path] = None, full_sync_hours: float = 24.0, page_size: int = 1000):
+        self.path = Path(path) if path else None
+        self.full_sync_seconds = full_sync_hours * 3600
+        self.page_size = page_size
+        self.ids = VideoIdSet()
+        self.extra: Set[str] = set()  # URLs ohne erkennbare Video-ID
+        self.watermark: Optional[Tuple[str, int]] = None  # (added_at wie von PostgREST geliefert, id)
+        self.full_sync_at = 0.0
+        self.stats = {"loaded": 0, "fetched": 0, "mode": "-"}
+        if self.path:
+            self.load()
+
+    @classmethod
+    def from_env(cls) -> "KnownUrlIndex":
+        """Pfad aus KNOWN_INDEX_PATH (leer = nur im Speicher), Voll-Abgleich alle KNOWN_INDEX_FULL_SYNC_HOURS"""
+        path = os.getenv("KNOWN_INDEX_PATH", str(DEFAULT_INDEX_PATH))
+        return cls(
+            path=Path(path) if path else None,
+            full_sync_hours=float(os.getenv("KNOWN_INDEX_FULL_SYNC_HOURS", "24")),
+            page_size=int(os.getenv("SUPABASE_PAGE_SIZE", "1000")),
+        )
+
+    @property
+    def ids_path(self) -> Path:
+        return self.path.with_suffix(".ids")
+
+    @staticmethod
+    def _split(urls: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """Returns: (Video-IDs, URLs ohne kodierbare ID) - über die ID treffen auch &t=...-Varianten"""
+        ids, extra = [], []
+        for url in urls:
+            vid = extract_video_id(url)
+            if vid and is_encodable(vid):
+                ids.append(vid)
+            else:
+                extra.append(url)
+        return ids, extra
+
+    def __contains__(self, url: str) -> bool:
+        vid = extract_video_id(url)
+        if vid and is_encodable(vid):
+            return vid in self.ids
+        return url in self.extra
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self.extra)
+
+    def filter_new(self, urls: List[str]) -> List[str]:
+        """Batch-Diff: Returns: die URLs, deren Video noch nicht bekannt ist (Reihenfolge bleibt)"""
+        vids = [extract_video_id(url) for url in urls]
+        encodable = [i for i, vid in enumerate(vids) if vid and is_encodable(vid)]
+        known = np.array([url in self.extra for url in urls], dtype=bool)
+        known[encodable] = self.ids.contains_many([vids[i] for i in encodable])
+        return [url for url, hit in zip(urls, known) if not hit]
+
+    def add(self, urls: Iterable[str]):
+        """Frisch geschriebene URLs sofort als bekannt markieren (der nächste Sync liefert sie ohnehin)"""
+        ids, extra = self._split(urls)
+        self.ids.add_many(ids)
+        self.extra.update(extra)
+
+    # --- Persistenz ---
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get("version") != INDEX_VERSION:
+            return
+        try:
+            self.ids = VideoIdSet.load(self.ids_path)
+        except (FileNotFoundError, ValueError):
+            return  # ohne ID-Datei ist der Stand unvollständig -> Voll-Abgleich
+        self.extra = set(data.get("extra", ()))
+        wm = data.get("watermark")
+        self.watermark = (wm["added_at"], wm["id"]) if wm else None
+        self.full_sync_at = data.get("full_sync_at", 0.0)
+        self.stats["loaded"] = len(self)
+
+    def save(self):
+        if not self.path:
+            return
+        data = {
+            "version": INDEX_VERSION,
+            "watermark": {"added_at": self.watermark[0], "id": self.watermark[1]} if self.watermark else None,
+            "full_sync_at": self.full_sync_at,
+            "extra": sorted(self.extra),
+        }
+        # Erst die IDs, dann das JSON: ein Abbruch dazwischen lässt höchstens zu viele IDs
+        # neben einer alten Watermark zurück, der nächste Sync lädt dann nur etwas doppelt
+        self.ids.save(self.ids_path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    # --- Sync ---
+    def _advance(self, row: Dict):
+        added_at = row.get("added_at")
+        if not added_at:
+            return
+        if self.watermark is None or (_parse_ts(added_at), row["id"]) > (_parse_ts(self.watermark[0]), self.watermark[1]):
+            self.watermark = (added_at, row["id"])
+
+    def needs_full_sync(self) -> bool:
+        return self.watermark is None or time.time() - self.full_sync_at >= self.full_sync_seconds
+
+    def sync(self, client: SupabaseClient, table: str, column: str = "url", full: bool = False) -> int:
+        """
+        Gleicht den Index mit Supabase ab: voll, wenn fällig (oder full=True),
+        sonst nur Zeilen nach der High-Watermark.
+
+        Returns: Anzahl der geladenen Zeilen
+        """
+        if full or self.needs_full_sync():
+            fetched = self._full_sync(client, table, column)
+            self.stats["mode"] = "voll"
+        else:
+            fetched = self._incremental_sync(client, table, column)
+            self.stats["mode"] = "inkrementell"
+        self.stats["fetched"] = fetched
+        self.save()
+        return fetched
+
+    def _ingest(self, rows: List[Dict], column: str, extra: Set[str]) -> np.ndarray:
+        """Returns: kodierte IDs einer Seite; URLs ohne ID landen in extra"""
+        ids, rest = self._split(row[column] for row in rows if row.get(column))
+        extra.update(rest)
+        for row in rows:
+            self._advance(row)
+        return encode_video_ids(ids)
+
+    def _full_sync(self, client: SupabaseClient, table: str, column: str) -> int:
+        chunks: List[np.ndarray] = []
+        extra: Set[str] = set()
+        self.watermark = None
+        fetched = 0
+        for page in client.iter_pages(table, select=f"id,{column},added_at", page_size=self.page_size):
+            fetched += len(page)
+            chunks.append(self._ingest(page, column, extra))
+        # Ein einziges Sortieren am Ende statt union1d pro Seite
+        self.ids = VideoIdSet(np.concatenate(chunks) if chunks else None)
+        self.extra = extra
+        self.full_sync_at = time.time()
+        return fetched
+
+    def _incremental_sync(self, client: SupabaseClient, table: str, column: str) -> int:
+        # Keyset über (added_at, id): Zeilen mit gleichem Zeitstempel werden über die id getrennt
+        fetched = 0
+        short_page = None
+        warned = False
+        while True:
+            added_at, last_id = self.watermark
+            r = client.get(table, params={
+                "select": f"id,{column},added_at",
+                "or": f'(added_at.gt."{added_at}",and(added_at.eq."{added_at}",id.gt.{last_id}))',
+                "order": "added_at.asc,id.asc",
+                "limit": str(self.page_size),
+            })
+            if not r.ok:
+                raise RuntimeError(f"Supabase-Query fehlgeschlagen: {r.status_code} {r.text}")
+            rows = r.json()
+            if not rows:
+                return fetched
+            if short_page is not None and not warned:
+                warned = True
+                print(f"[WARN] Supabase hat eine Seite auf {short_page} statt {self.page_size} Zeilen gekürzt "
+                      f"(max-rows des Servers?)", file=sys.stderr)
+            short_page = len(rows) if len(rows) < self.page_size else None
+            fetched += len(rows)
+            self.ids.merge_encoded(self._ingest(rows, column, self.extra))
+
+    def summary_line(self) -> str:
+        return (f"URL-Index: {len(self)} bekannt ({self.ids.nbytes // 1024} KB IDs), "
+                f"{self.stats['fetched']} Zeilen geladen "
+                f"({self.stats['mode']} Abgleich)")
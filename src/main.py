@@ -1,5 +1,4 @@
 import os
-import re
 import subprocess
 import time
 import pandas as pd
@@ -8,6 +7,11 @@ from pytubefix import YouTube
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from .video_filter import VideoFilter
+from .rate_limiter import get_youtube_limiter
+from .timedtext import timedtext_to_text
+from .supabase_client import SupabaseClient
+from .known_index import KnownUrlIndex
+from .video_id import extract_video_id as canonical_video_id, canonicalize_url
 import django
 import sys
 from pathlib import Path
@@ -67,47 +71,30 @@ SUPABASE_SERVICE_ROLE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
 if not SUPABASE_SERVICE_ROLE_KEY:
     raise RuntimeError("Umgebungsvariable SUPABASE_SERVICE_KEY fehlt.")
 
-# --- Supabase-Header ---
-HDRS = {
-    "apikey": SUPABASE_SERVICE_ROLE_KEY,
-    "Authorization": f"Bearer {SUPABASE_SERVICE_ROLE_KEY}",
-    "Content-Type": "application/json",
-    "Prefer": "resolution=merge-duplicates,return=representation",
-}
-def clean_subtitle_text(srt_text):
-    # Entfernt Zeitstempel, Nummerierung und Leerzeilen → macht Fließtext
-    lines = srt_text.splitlines()
-    cleaned_lines = []
-    for line in lines:
-        if re.match(r"^\d+$", line):  # Zeilennummer
-            continue
-        if re.match(r"^\d\d:\d\d:\d\d", line):  # Zeitstempel
-            continue
-        if line.strip() == "":
-            continue
-        cleaned_lines.append(line.strip())
-    return " ".join(cleaned_lines)
+# --- Supabase-Client (Keep-Alive-Pool, Retries) ---
+SUPABASE = SupabaseClient.from_env(SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY)
+UPSERT_PREFER = {"Prefer": "resolution=merge-duplicates,return=minimal"}
 def fetch_with_pytubefix(video_id):
     url = f"https://www.youtube.com/watch?v={video_id}"
     try:
-        yt = YouTube(url)
-        title = yt.title
-
-        subs = yt.captions
-        text = None
-        if subs:
-            key = next(iter(subs.keys()))
-            caption = subs[key.code]
-            srt_text = caption.generate_srt_captions()
-            text = clean_subtitle_text(srt_text)
+        # Gemeinsamer Limiter: drosselt bei 429/Bot-Check automatisch
+        with get_youtube_limiter().acquire():
+            yt = YouTube(url)
+            title = yt.title
+
+            subs = yt.captions
+            text = None
+            if subs:
+                key = next(iter(subs.keys()))
+                caption = subs[key.code]
+                text = timedtext_to_text(caption.xml_captions)
         print(f"  Untertitel: {len(text) if text else 0} Zeichen")
         return title, text
     except Exception as e:
         print(f"  Fehler beim Abrufen: {e}")
         return None, None
 def fetch_unprocessed_ids():
-    url = f"{SUPABASE_URL}/{SUPABASE_TABLE}?processed=eq.FALSE&processed_at=is.NULL&select=id"
-    response = requests.get(url, headers=HDRS, timeout=30)
+    response = SUPABASE.get(f"{SUPABASE_TABLE}?processed=eq.FALSE&processed_at=is.NULL&select=id")
     if not response.ok:
         raise RuntimeError(f"Supabase-Abfrage fehlgeschlagen: {response.status_code} {response.text}")
     data = response.json()
@@ -118,11 +105,10 @@ def fetch_unprocessed_ids():
 def upsert_urls(links: list[str]):
     payload = [{"url": link} for link in links]
 
-    response = requests.post(
-        f"{SUPABASE_URL}/{SUPABASE_TABLE}?on_conflict=url",
-        headers=HDRS,
+    response = SUPABASE.post(
+        f"{SUPABASE_TABLE}?on_conflict=url",
+        headers=UPSERT_PREFER,
         json=payload,
-        timeout=30
     )
 
     if not response.ok:
@@ -130,32 +116,17 @@ def upsert_urls(links: list[str]):
     print(f"✅ {len(links)} Links erfolgreich an Supabase gesendet.")
 
 
-
-import json
-
 # --- Vorhandene URLs aus Supabase holen ---
 def fetch_existing_urls() -> set[str]:
-    url = f"{SUPABASE_URL}/{SUPABASE_TABLE}?select=url"
-    response = requests.get(url, headers=HDRS, timeout=30)
-    if not response.ok:
-        raise RuntimeError(f"Supabase-Query fehlgeschlagen: {response.status_code} {response.text}")
-    data = response.json()
-    existing = {row["url"] for row in data if row.get("url")}
+    existing = set()
+    for page in SUPABASE.iter_pages(SUPABASE_TABLE, select="url"):
+        existing.update(row["url"] for row in page if row.get("url"))
     print(f"{len(existing)} URLs bereits in Supabase vorhanden.")
     return existing
 
 def extract_video_id(url: str) -> str:
-    import re
-    from urllib.parse import urlparse, parse_qs
-    # Versucht, die ID aus verschiedenen YouTube-URL-Formaten zu extrahieren
-    parsed = urlparse(url)
-    if parsed.hostname in ["www.youtube.com", "youtube.com"]:
-        query = parse_qs(parsed.query)
-        return query.get("v", [""])[0]
-    elif parsed.hostname in ["youtu.be"]:
-        return parsed.path.lstrip("/")
-    else:
-        return ""
+    # Gemeinsamer Normalizer: watch, youtu.be, shorts, embed; "" wenn keine ID erkennbar
+    return canonical_video_id(url) or ""
 # --- YouTube-Links upserten ---
 def upsert_urls(links: list[str], video_filter: VideoFilter = None) -> ProcessingResults:
     if not links:
@@ -228,7 +199,8 @@ def main():
 
         # --- Links extrahieren ---
         elements = driver.find_elements("css selector", 'a[href*="/watch"]')
-        links = list({el.get_attribute("href") for el in elements})
+        # Kanonische URLs: &t=...-/&pp=...-Varianten desselben Videos fallen zusammen
+        links = list({url for el in elements if (url := canonicalize_url(el.get_attribute("href")))})
         print(f"{len(links)} YouTube-Links gesammelt.")
 
         # --- CSV speichern ---
@@ -238,8 +210,11 @@ def main():
         print("youtube_links.csv gespeichert.")
 
         # --- Vorhandene URLs abgleichen ---
-        existing = fetch_existing_urls()
-        new_links = [link for link in links if link not in existing]
+        # Lokaler URL-Index: lädt nur Zeilen nach der letzten High-Watermark nach
+        known = KnownUrlIndex.from_env()
+        known.sync(SUPABASE, SUPABASE_TABLE)
+        print(known.summary_line())
+        new_links = known.filter_new(links)
         print(f"{len(new_links)} neue Links gefunden.")
 
         # --- Filter initialisieren wenn aktiviert ---
@@ -0,0 +1,177 @@
+"""
+Globaler Rate-Limiter für YouTube-Zugriffe
+Kombiniert einen Token-Bucket (Requests pro Sekunde) mit einer AIMD-Regelung
+(additive increase / multiplicative decrease) für Rate und Parallelität:
+Erfolge erhöhen beide langsam, Drosselungssignale (HTTP 429, Bot-Check)
+halbieren sie und pausieren kurz alle Abrufe. So pendelt sich der Durchsatz
+knapp unter der Grenze ein, ab der YouTube blockiert.
+"""
+import os
+import re
+import time
+import threading
+from typing import Optional, Dict
+
+OK = "ok"
+THROTTLED = "throttled"
+ERROR = "error"
+CANCELLED = "cancelled"
+
+THROTTLE_MARKERS = ("too many requests", "detected as a bot", "sign in to confirm", "rate limit")
+# "429" nur als Status-Code ("HTTP Error 429", "status 429"), nicht als Teil einer Video-ID oder URL
+HTTP_429_PATTERN = re.compile(r"\b(?:http(?: error)?|status(?: code)?|code)[\s:=]*429\b")
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """Erkennt Drosselung durch YouTube (HTTP 429, Bot-Erkennung) anhand von Typ und Meldung"""
+    code = getattr(error, "code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if code == 429:
+        return True
+    name = type(error).__name__.lower()
+    if "bot" in name:
+        return True
+    msg = str(error).lower()
+    return any(marker in msg for marker in THROTTLE_MARKERS) or bool(HTTP_429_PATTERN.search(msg))
+
+
+class Permit:
+    """Berechtigung für einen Abruf; gibt den Slot beim Verlassen genau einmal frei"""
+
+    def __init__(self, limiter: "AdaptiveRateLimiter"):
+        self._limiter = limiter
+        self._released = False
+        self._lock = threading.Lock()
+
+    def release(self, outcome: str = OK):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._limiter._release(outcome)
+
+    def __enter__(self) -> "Permit":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc is None:
+            self.release(OK)
+        else:
+            self.release(THROTTLED if is_throttle_error(exc) else ERROR)
+        return False
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, rate: float = 1.0, max_rate: float = 10.0, min_rate: float = 0.1,
+                 concurrency: float = 2.0, max_concurrency: int = 16, min_concurrency: int = 1,
+                 burst: float = 3.0, rate_increase: float = 0.1, decrease: float = 0.5,
+                 cooldown: float = 30.0, name: str = "YouTube-Limiter"):
+        self.name = name
+        self.rate = rate
+        self.max_rate = max_rate
+        self.min_rate = min_rate
+        self.concurrency = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.burst = burst
+        self.rate_increase = rate_increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+
+        self._cond = threading.Condition()
+        self._tokens = min(burst, 1.0)
+        self._last_refill = time.monotonic()
+        self._in_flight = 0
+        self._paused_until = 0.0
+        self._last_decrease = float("-inf")
+        self.stats: Dict[str, int] = {OK: 0, THROTTLED: 0, ERROR: 0, CANCELLED: 0}
+
+    @classmethod
+    def from_env(cls) -> "AdaptiveRateLimiter":
+        return cls(
+            rate=float(os.getenv("YT_RATE_START", "1.0")),
+            max_rate=float(os.getenv("YT_RATE_MAX", "10")),
+            concurrency=float(os.getenv("YT_CONCURRENCY_START", "2")),
+            max_concurrency=int(os.getenv("YT_CONCURRENCY_MAX", "16")),
+            cooldown=float(os.getenv("YT_THROTTLE_COOLDOWN_SECONDS", "30")),
+        )
+
+    def _refill(self, now: float):
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[Permit]:
+        """
+        Wartet auf ein Token und einen freien Parallelitäts-Slot.
+
+        Returns: Permit, oder None wenn timeout abgelaufen ist
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._in_flight >= int(self.concurrency):
+                    wait = None  # bis ein Slot frei wird
+                elif self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    self._in_flight += 1
+                    return Permit(self)
+                else:
+                    wait = (1.0 - self._tokens) / self.rate
+
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        return None
+                    wait = remaining if wait is None else min(wait, remaining)
+                self._cond.wait(wait)
+
+    def _release(self, outcome: str):
+        with self._cond:
+            self._in_flight -= 1
+            self.stats[outcome] = self.stats.get(outcome, 0) + 1
+            now = time.monotonic()
+            if outcome == OK:
+                # Additive increase: ca. +rate_increase req/s pro Sekunde erfolgreicher Abrufe
+                self.rate = min(self.max_rate, self.rate + self.rate_increase / max(self.rate, 1.0))
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / self.concurrency)
+            elif outcome == THROTTLED:
+                self._decrease(now)
+            self._cond.notify_all()
+
+    def _decrease(self, now: float):
+        # Multiplicative decrease höchstens einmal pro Cooldown, weil gleichzeitig
+        # laufende Abrufe meist gemeinsam scheitern
+        if now - self._last_decrease < self.cooldown:
+            return
+        self.rate = max(self.min_rate, self.rate * self.decrease)
+        self.concurrency = max(self.min_concurrency, self.concurrency * self.decrease)
+        self._paused_until = now + self.cooldown
+        self._last_decrease = now
+
+    def report_throttle(self):
+        """Drosselungssignal ohne Slot-Freigabe, z.B. für einen intern wiederholten Versuch"""
+        with self._cond:
+            self.stats[THROTTLED] += 1
+            self._decrease(time.monotonic())
+            self._cond.notify_all()
+
+    def summary_line(self) -> str:
+        with self._cond:
+            return (f"{self.name}: {self.rate:.2f} req/s, Parallelität {int(self.concurrency)} "
+                    f"({self.stats[OK]} ok, {self.stats[THROTTLED]} gedrosselt, {self.stats[ERROR]} Fehler)")
+
+
+_youtube_limiter: Optional[AdaptiveRateLimiter] = None
+_youtube_limiter_lock = threading.Lock()
+
+
+def get_youtube_limiter() -> AdaptiveRateLimiter:
+    """Der prozessweit gemeinsame Limiter für alle YouTube-Abrufe"""
+    global _youtube_limiter
+    with _youtube_limiter_lock:
+        if _youtube_limiter is None:
+            _youtube_limiter = AdaptiveRateLimiter.from_env()
+        return _youtube_limiter
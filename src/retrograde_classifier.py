@@ -2,12 +2,16 @@
 Retrograde Klassifizierung für alle bestehenden YouTube-URLs in der Datenbank
 """
 import os
-import time
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Optional, Tuple
 from datetime import datetime
 from video_filter import VideoFilter
 from filter_config import *
+from supabase_client import SupabaseClient, RequestTiming
+from rate_limiter import AdaptiveRateLimiter, ERROR
+from classification_cache import ClassificationCache
 
 # Supabase Konfiguration
 SUPABASE_URL = "http://148.230.71.150:8000/rest/v1"
@@ -16,17 +20,29 @@ SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
 if not SUPABASE_KEY:
     raise ValueError("SUPABASE_SERVICE_KEY Umgebungsvariable nicht gesetzt!")
 
+# Keyword-Scoring im Prozess-Pool (0 = alle Kerne), Schreiben parallel und adaptiv gedrosselt
+SCORE_WORKERS = int(os.getenv("CLASSIFY_SCORE_WORKERS", "0"))
+WRITE_WORKERS = int(os.getenv("CLASSIFY_WRITE_WORKERS", "4"))
+
 class RetrogradedClassifier:
     def __init__(self):
         self.filter = VideoFilter()
-        self.headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json",
-            "Prefer": "return=representation"
-        }
+        # Gemeinsamer Client: Keep-Alive statt neuer TCP-Verbindung pro PATCH/DELETE
+        self.client = SupabaseClient.from_env(SUPABASE_URL, SUPABASE_KEY)
+        # Nur die DB-Schreibzugriffe werden gedrosselt: startet zügig, halbiert sich bei 429/503
+        self.write_limiter = AdaptiveRateLimiter(
+            rate=float(os.getenv("DB_WRITE_RATE_START", "20")),
+            max_rate=float(os.getenv("DB_WRITE_RATE_MAX", "200")),
+            concurrency=WRITE_WORKERS, max_concurrency=WRITE_WORKERS, burst=WRITE_WORKERS,
+            rate_increase=1.0, cooldown=5.0, name="DB-Schreiblimiter",
+        )
+        # Der Client wiederholt 429/503 selbst; der Hook meldet schon diese Versuche dem Limiter
+        self.client.add_hook(self._on_request)
+        self._lock = threading.Lock()
+        self.cache = ClassificationCache.from_env()
         self.stats = {
             "total": 0,
+            "skipped": 0,
             "processed": 0,
             "relevant": 0,
             "irrelevant": 0,
@@ -34,11 +50,15 @@ class RetrogradedClassifier:
             "deleted": 0
         }
     
+    def _on_request(self, timing: RequestTiming):
+        if timing.method in ("PATCH", "DELETE") and timing.status in (429, 503):
+            self.write_limiter.report_throttle()
+
     def fetch_all_urls(self, limit: Optional[int] = None) -> List[Dict]:
         """Holt alle URLs aus der Datenbank"""
         try:
             # Basis-Query für alle URLs
-            url = f"{SUPABASE_URL}/youtube_urls?select=*"
+            url = f"youtube_urls?select=*"
             
             # Optional: Limit setzen
             if limit:
@@ -47,7 +67,7 @@ class RetrogradedClassifier:
             # Sortierung nach added_at (älteste zuerst)
             url += "&order=added_at.asc"
             
-            response = requests.get(url, headers=self.headers, timeout=30)
+            response = self.client.get(url, timeout=30)
             
             if response.ok:
                 urls = response.json()
@@ -66,7 +86,7 @@ class RetrogradedClassifier:
         """Holt nur URLs ohne Klassifizierung"""
         try:
             # Query für URLs ohne classification Feld oder mit NULL
-            url = f"{SUPABASE_URL}/youtube_urls?select=*"
+            url = f"youtube_urls?select=*"
             url += "&or=(classification.is.null,not.classification.is.null.false)"
             
             if limit:
@@ -74,7 +94,7 @@ class RetrogradedClassifier:
             
             url += "&order=added_at.asc"
             
-            response = requests.get(url, headers=self.headers, timeout=30)
+            response = self.client.get(url, timeout=30)
             
             if response.ok:
                 urls = response.json()
@@ -92,7 +112,7 @@ class RetrogradedClassifier:
                             relevance_score: float, method: str) -> bool:
         """Aktualisiert die Klassifizierung einer URL"""
         try:
-            api_url = f"{SUPABASE_URL}/youtube_urls?url=eq.{requests.utils.quote(url)}"
+            api_url = f"youtube_urls?url=eq.{requests.utils.quote(url)}"
             
             data = {
                 "classification": classification,
@@ -101,7 +121,11 @@ class RetrogradedClassifier:
                 "classified_at": datetime.now().isoformat()
             }
             
-            response = requests.patch(api_url, json=data, headers=self.headers, timeout=30)
+            with self.write_limiter.acquire() as permit:
+                response = self.client.patch(api_url, json=data, timeout=30)
+                if response.status_code in (429, 503):
+                    # Drosselung hat der Hook schon gemeldet; nur nicht als Erfolg verbuchen
+                    permit.release(ERROR)
             
             return response.ok
             
@@ -112,12 +136,17 @@ class RetrogradedClassifier:
     def delete_irrelevant_url(self, url: str) -> bool:
         """Löscht eine irrelevante URL aus der Datenbank"""
         try:
-            api_url = f"{SUPABASE_URL}/youtube_urls?url=eq.{requests.utils.quote(url)}"
+            api_url = f"youtube_urls?url=eq.{requests.utils.quote(url)}"
             
-            response = requests.delete(api_url, headers=self.headers, timeout=30)
+            with self.write_limiter.acquire() as permit:
+                response = self.client.delete(api_url, timeout=30)
+                if response.status_code in (429, 503):
+                    # Drosselung hat der Hook schon gemeldet; nur nicht als Erfolg verbuchen
+                    permit.release(ERROR)
             
             if response.ok:
-                self.stats["deleted"] += 1
+                with self._lock:
+                    self.stats["deleted"] += 1
                 return True
             return False
             
@@ -140,6 +169,34 @@ class RetrogradedClassifier:
         
         return url
     
+    def _store_classification(self, record: Dict, result: Tuple[bool, float, str],
+                              auto_delete: bool) -> Tuple[bool, bool]:
+        """
+        Schreibt eine Klassifizierung (läuft im Schreib-Pool) und löscht optional irrelevante URLs.
+
+        Returns: (aktualisiert, gelöscht)
+        """
+        is_relevant, score, method = result
+        url = record.get("url")
+        classification = "RELEVANT" if is_relevant else "IRRELEVANT"
+        if not self.update_classification(url, classification, score, method):
+            return False, False
+        deleted = not is_relevant and auto_delete and self.delete_irrelevant_url(url)
+        return True, deleted
+    
+    def _delete_cached_irrelevant(self, records: List[Dict]):
+        """Löscht bereits als irrelevant klassifizierte, unveränderte Zeilen ohne neue Bewertung"""
+        print(f"[DELETE] {len(records)} unveränderte irrelevante URLs werden gelöscht")
+        with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as writers:
+            deleted = list(writers.map(lambda record: self.delete_irrelevant_url(record.get("url")), records))
+        for record, ok in zip(records, deleted):
+            self.stats["processed"] += 1
+            self.stats["irrelevant"] += 1
+            if ok:
+                self.cache.discard(record)
+            else:
+                self.stats["errors"] += 1
+
     # METHODE 1: Batch-Klassifizierung mit automatischer Löschung
     def batch_classify_and_clean(self, auto_delete: bool = False, 
                                 use_ai: bool = True, 
@@ -169,54 +226,75 @@ class RetrogradedClassifier:
         print(f"   KI-Analyse: {'JA' if use_ai else 'NEIN'}")
         print("-" * 40)
         
-        # Verarbeite in Batches
-        for i in range(0, len(all_urls), batch_size):
-            batch = all_urls[i:i+batch_size]
-            batch_num = (i // batch_size) + 1
-            total_batches = (len(all_urls) + batch_size - 1) // batch_size
-            
-            print(f"\n[BATCH] {batch_num}/{total_batches} ({len(batch)} URLs)")
-            
-            for record in batch:
-                url = record.get("url")
-                title = self.extract_title_from_url(record)
-                subtitles = record.get("subtitles")
+        # Unveränderte Zeilen (gleicher Text, gleiche filter_config) weder bewerten noch schreiben;
+        # bei auto_delete gehen zwischengespeichert irrelevante Zeilen direkt ins Löschen.
+        # Kein Ausdünnen des Caches anhand dieser Abfrage: sie kann begrenzt sein (Test-Lauf,
+        # max-rows), Einträge fallen nur für selbst gelöschte Zeilen weg
+        fingerprint = self.filter.fingerprint(use_ai)
+        records, keys, pending, cached_irrelevant = [], [], [], []
+        for record in all_urls:
+            title = self.extract_title_from_url(record)
+            key = self.filter.content_key(title, record.get("subtitles"), fingerprint)
+            cached = self.cache.get(record, key) if record.get("classification") is not None else None
+            if cached is not None:
+                if auto_delete and not cached[0]:
+                    cached_irrelevant.append(record)
+                continue
+            records.append((title, record.get("subtitles")))
+            keys.append(key)
+            pending.append(record)
+        self.stats["skipped"] = len(all_urls) - len(pending) - len(cached_irrelevant)
+        print(f"[INFO] {self.stats['skipped']} unveränderte URLs übersprungen, {len(pending)} zu bewerten")
+        all_urls = pending
+        if cached_irrelevant:
+            self._delete_cached_irrelevant(cached_irrelevant)
+        
+        # Scoring im Prozess-Pool, Ergebnisse in Reihenfolge; geschrieben wird parallel
+        total_batches = (len(all_urls) + batch_size - 1) // batch_size
+        with ThreadPoolExecutor(max_workers=WRITE_WORKERS) as writers:
+            for start, results in self.filter.iter_classify_parallel(
+                    records, use_ai=use_ai, workers=SCORE_WORKERS, chunk_size=batch_size):
+                batch = all_urls[start:start + len(results)]
+                print(f"\n[BATCH] {start // batch_size + 1}/{total_batches} ({len(batch)} URLs)")
                 
-                try:
-                    # Klassifiziere Video
-                    is_relevant, score, method = self.filter.is_relevant(
-                        title, subtitles, use_ai=use_ai
-                    )
-                    
-                    classification = "RELEVANT" if is_relevant else "IRRELEVANT"
-                    
-                    # Update Klassifizierung in DB
-                    if self.update_classification(url, classification, score, method):
-                        self.stats["processed"] += 1
-                        
-                        if is_relevant:
-                            self.stats["relevant"] += 1
-                            print(f"  [+] RELEVANT ({score:.2f}): {title[:50]}...")
-                        else:
-                            self.stats["irrelevant"] += 1
-                            print(f"  [-] IRRELEVANT ({score:.2f}): {title[:50]}...")
-                            
-                            # Optional: Lösche irrelevante URLs
-                            if auto_delete:
-                                if self.delete_irrelevant_url(url):
-                                    print(f"    [DELETED] Geloescht")
-                    else:
+                futures = [
+                    writers.submit(self._store_classification, record, result, auto_delete)
+                    for record, result in zip(batch, results)
+                ]
+                for offset, ((title, _), result, future) in enumerate(zip(
+                        records[start:start + len(results)], results, futures)):
+                    is_relevant, score, method = result
+                    try:
+                        updated, deleted = future.result()
+                    except Exception as e:
                         self.stats["errors"] += 1
-                        
-                except Exception as e:
-                    self.stats["errors"] += 1
-                    print(f"  [WARN] Fehler bei {url}: {e}")
+                        print(f"  [WARN] Fehler bei {title[:50]}: {e}")
+                        continue
+                    if not updated:
+                        self.stats["errors"] += 1
+                        continue
+                    if deleted:
+                        self.cache.discard(batch[offset])
+                    else:
+                        self.cache.put(batch[offset], keys[start + offset], result)
+                    self.stats["processed"] += 1
+                    if is_relevant:
+                        self.stats["relevant"] += 1
+                        print(f"  [+] RELEVANT ({score:.2f}): {title[:50]}...")
+                    else:
+                        self.stats["irrelevant"] += 1
+                        print(f"  [-] IRRELEVANT ({score:.2f}): {title[:50]}...")
+                        if deleted:
+                            print(f"    [DELETED] Geloescht")
                 
-                # Rate limiting
-                time.sleep(0.1)
-            
-            # Zwischen-Statistik
-            self._print_progress()
+                # Zwischen-Statistik
+                self._print_progress()
+        
+        self.cache.save()
+        print(f"\n{self.write_limiter.summary_line()}")
+        print(self.cache.summary_line())
+        if self.filter.ai_batch:
+            print(self.filter.ai_batch.summary_line())
         
         # Finale Statistik
         self._print_final_stats()
@@ -252,10 +330,19 @@ class RetrogradedClassifier:
         
         review_queue = []  # URLs die manuell geprüft werden sollten
         
-        for idx, record in enumerate(unclassified, 1):
+        # Keyword-Scores im Prozess-Pool, Ergebnisse kommen in Reihenfolge zurück
+        records = [(self.extract_title_from_url(record), record.get("subtitles")) for record in unclassified]
+        classified = (
+            (start + offset, result)
+            for start, results in self.filter.iter_classify_parallel(records, use_ai=use_ai, workers=SCORE_WORKERS)
+            for offset, result in enumerate(results)
+        )
+        
+        for i, (is_relevant, score, method) in classified:
+            idx = i + 1
+            record = unclassified[i]
             url = record.get("url")
-            title = self.extract_title_from_url(record)
-            subtitles = record.get("subtitles")
+            title = records[i][0]
             
             # Fortschrittsanzeige
             progress = (idx / self.stats["total"]) * 100
@@ -263,11 +350,6 @@ class RetrogradedClassifier:
             print(f"  [VIDEO] {title[:80]}...")
             
             try:
-                # Klassifiziere
-                is_relevant, score, method = self.filter.is_relevant(
-                    title, subtitles, use_ai=use_ai
-                )
-                
                 # Prüfe ob Review nötig
                 needs_review = (
                     method == "mixed" or 
@@ -300,9 +382,6 @@ class RetrogradedClassifier:
                 self.stats["errors"] += 1
                 print(f"  [WARN] Fehler: {e}")
             
-            # Rate limiting
-            time.sleep(0.05)
-            
             # Zeige Zwischenstand alle 10 URLs
             if idx % 10 == 0:
                 self._print_progress()
@@ -338,9 +417,10 @@ class RetrogradedClassifier:
         if self.stats["total"] == 0:
             return
         
-        progress = (self.stats["processed"] / self.stats["total"]) * 100
+        done = self.stats["processed"] + self.stats["skipped"]
+        progress = (done / self.stats["total"]) * 100
         print(f"\n[PROGRESS] Fortschritt: {progress:.1f}%")
-        print(f"   Verarbeitet: {self.stats['processed']}/{self.stats['total']}")
+        print(f"   Verarbeitet: {done}/{self.stats['total']}")
         print(f"   Relevant: {self.stats['relevant']}")
         print(f"   Irrelevant: {self.stats['irrelevant']}")
         if self.stats["deleted"] > 0:
@@ -352,6 +432,8 @@ class RetrogradedClassifier:
         print("[STATISTIK] FINALE STATISTIK")
         print("="*60)
         print(f"Total URLs:      {self.stats['total']}")
+        if self.stats['skipped']:
+            print(f"Unveraendert:    {self.stats['skipped']} (aus dem Cache)")
         print(f"Verarbeitet:     {self.stats['processed']}")
         print(f"Relevant:        {self.stats['relevant']} ({self._calc_percentage('relevant')}%)")
         print(f"Irrelevant:      {self.stats['irrelevant']} ({self._calc_percentage('irrelevant')}%)")
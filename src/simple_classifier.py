@@ -2,10 +2,9 @@
 Vereinfachter Klassifizierer der mit der bestehenden Datenbankstruktur arbeitet
 """
 import os
-import requests
 from typing import List, Dict
 from video_filter import VideoFilter
-from datetime import datetime
+from supabase_client import SupabaseClient
 
 SUPABASE_URL = "http://148.230.71.150:8000/rest/v1"
 SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_KEY")
@@ -16,11 +15,8 @@ if not SUPABASE_KEY:
 class SimpleClassifier:
     def __init__(self):
         self.filter = VideoFilter()
-        self.headers = {
-            "apikey": SUPABASE_KEY,
-            "Authorization": f"Bearer {SUPABASE_KEY}",
-            "Content-Type": "application/json"
-        }
+        # Gemeinsamer Client: Keep-Alive statt neuer TCP-Verbindung pro PATCH/DELETE
+        self.client = SupabaseClient.from_env(SUPABASE_URL, SUPABASE_KEY)
         self.stats = {
             "total": 0,
             "analyzed": 0,
@@ -33,9 +29,9 @@ class SimpleClassifier:
         """Holt alle URLs mit Subtitles"""
         try:
             # Hole nur URLs die Subtitles haben
-            url = f"{SUPABASE_URL}/youtube_urls?select=*&subtitles=not.is.null&order=added_at.desc"
+            url = f"youtube_urls?select=*&subtitles=not.is.null&order=added_at.desc"
             
-            response = requests.get(url, headers=self.headers, timeout=30)
+            response = self.client.get(url, timeout=30)
             
             if response.ok:
                 return response.json()
@@ -46,6 +42,15 @@ class SimpleClassifier:
             print(f"[ERROR] {e}")
             return []
     
+    @staticmethod
+    def _title_for(record: Dict) -> str:
+        """Verwendet URL/Video-ID als Titel"""
+        url = record.get("url", "")
+        video_id = ""
+        if "watch?v=" in url:
+            video_id = url.split("watch?v=")[1].split("&")[0]
+        return f"Video {video_id}" if video_id else url
+    
     def analyze_and_classify(self) -> Dict[str, List]:
         """Analysiert alle URLs und klassifiziert sie"""
         urls = self.fetch_all_urls()
@@ -56,22 +61,14 @@ class SimpleClassifier:
         relevant_urls = []
         irrelevant_urls = []
         
-        for idx, record in enumerate(urls, 1):
+        # Klassifiziere alle Datensätze auf einmal (vektorisierte Keyword-Scores)
+        results = self.filter.classify_batch(
+            [(self._title_for(record), (record.get("subtitles") or "")[:2000]) for record in urls],
+            use_ai=False
+        )
+        
+        for idx, (record, (is_relevant, score, method)) in enumerate(zip(urls, results), 1):
             url = record.get("url", "")
-            subtitles = record.get("subtitles", "")
-            
-            # Extrahiere Video-ID für "Titel"
-            video_id = ""
-            if "watch?v=" in url:
-                video_id = url.split("watch?v=")[1].split("&")[0]
-            
-            # Verwende URL/Video-ID als Titel
-            title = f"Video {video_id}" if video_id else url
-            
-            # Klassifiziere basierend auf Subtitles
-            is_relevant, score, method = self.filter.is_relevant(
-                title, subtitles[:2000], use_ai=False
-            )
             
             self.stats["analyzed"] += 1
             
@@ -103,33 +100,34 @@ class SimpleClassifier:
             "irrelevant": irrelevant_urls
         }
     
-    def delete_irrelevant_urls(self, urls: List[Dict]) -> int:
-        """Löscht irrelevante URLs"""
-        deleted = 0
-        
-        print(f"\n[DELETE] Lösche {len(urls)} irrelevante URLs...")
-        
-        for url_data in urls:
-            try:
-                # Lösche über ID für bessere Performance
-                if url_data.get("id"):
-                    delete_url = f"{SUPABASE_URL}/youtube_urls?id=eq.{url_data['id']}"
-                else:
-                    delete_url = f"{SUPABASE_URL}/youtube_urls?url=eq.{requests.utils.quote(url_data['url'])}"
-                
-                response = requests.delete(delete_url, headers=self.headers, timeout=10)
-                
-                if response.ok:
-                    deleted += 1
-                    if deleted % 10 == 0:
-                        print(f"  [DELETED] {deleted} URLs gelöscht...")
-                
-            except Exception as e:
-                print(f"  [ERROR] Fehler beim Löschen: {e}")
-        
-        self.stats["deleted"] = deleted
+    def delete_irrelevant_urls(self, urls: List[Dict], dry_run: bool = False) -> int:
+        """
+        Löscht irrelevante URLs gebündelt (id=in.(...), parallele Blöcke).
+        Im Trockenlauf wird nur gezählt, was gelöscht würde.
+
+        Returns: Anzahl gelöschter (bzw. zu löschender) Zeilen laut Supabase
+        """
+        verb = "Zähle (Trockenlauf)" if dry_run else "Lösche"
+        print(f"\n[DELETE] {verb} {len(urls)} irrelevante URLs...")
+
+        # Über die ID löschen; nur Zeilen ohne ID fallen auf die URL zurück
+        ids = [u["id"] for u in urls if u.get("id")]
+        plain_urls = [u["url"] for u in urls if not u.get("id") and u.get("url")]
+        deleted = failed = 0
+        for column, values in (("id", ids), ("url", plain_urls)):
+            if values:
+                result = self.client.bulk_delete("youtube_urls", values, column=column, dry_run=dry_run)
+                deleted += result.deleted
+                failed += result.failed
+
+        if failed:
+            print(f"  [ERROR] {failed} URLs konnten nicht gelöscht werden")
+        if dry_run:
+            print(f"  [DRY-RUN] {deleted} URLs würden gelöscht")
+        else:
+            self.stats["deleted"] = deleted
         return deleted
-    
+
     def print_statistics(self):
         """Zeigt finale Statistiken"""
         print("\n" + "="*60)
@@ -171,13 +169,15 @@ def main():
     # Frage ob löschen
     if results["irrelevant"]:
         print(f"\n[QUESTION] {len(results['irrelevant'])} irrelevante URLs gefunden.")
-        print("Diese jetzt löschen? (j/n): ", end="")
+        print("Diese jetzt löschen? (j/n, d = Trockenlauf): ", end="")
         
         try:
             choice = input().strip().lower()
             if choice == 'j':
                 deleted = classifier.delete_irrelevant_urls(results["irrelevant"])
                 print(f"\n[OK] {deleted} URLs gelöscht")
+            elif choice == 'd':
+                classifier.delete_irrelevant_urls(results["irrelevant"], dry_run=True)
             else:
                 print("\n[INFO] Löschung abgebrochen")
         except:
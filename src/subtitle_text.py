@@ -0,0 +1,21 @@
+"""
+SRT -> Fließtext
+Bereinigt fertige SRT-Strings (z.B. gespeicherte .srt-Dateien). Die Skripte
+lesen Caption-Spuren dagegen direkt über src/timedtext.py ein.
+"""
+import re
+
+# Ein vorkompiliertes, verankertes Muster statt zwei re.match-Aufrufen pro Zeile:
+# reine Zahlenzeile (SRT-Index) oder Zeile, die mit einem Zeitstempel beginnt
+_SKIP_LINE = re.compile(r"\d+\Z|\d\d:\d\d:\d\d").match
+
+
+def clean_srt_to_text(srt_text: str) -> str:
+    """Entfernt SRT-Formatierung und erstellt Fließtext"""
+    # splitlines läuft in C über den ganzen Puffer; pro Zeile bleibt ein strip
+    # und höchstens ein Regex-Match
+    return " ".join([
+        stripped
+        for line in srt_text.splitlines()
+        if (stripped := line.strip()) and not _SKIP_LINE(line)
+    ])
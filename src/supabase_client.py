@@ -0,0 +1,314 @@
+"""
+Gemeinsamer REST-Client für Supabase/PostgREST
+Eine requests.Session mit Keep-Alive-Connection-Pool für alle Skripte, damit
+nicht jeder GET/PATCH/DELETE eine neue TCP-Verbindung aufbaut. Transiente
+Fehler (Verbindungsabbruch, 429, 5xx) werden mit Jitter-Backoff wiederholt,
+DELETE nur bei 429 und Verbindungsaufbau-Timeout (siehe DELETE_RETRY_STATUS);
+Timing-Hooks bekommen jeden Request mit Dauer und Status gemeldet.
+"""
+import os
+import sys
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Callable, List, NamedTuple, Iterator, Iterable, Set, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUS = {429, 500, 502, 503, 504}
+# DELETE wird nur wiederholt, wenn er sicher nicht ausgeführt wurde: nach einem
+# 5xx oder Lese-Timeout kann er schon committet sein, die Wiederholung löscht
+# dann 0 Zeilen und die gemeldete Löschzahl wäre zu klein
+DELETE_RETRY_STATUS = {429}
+
+
+def quote_in_value(value: str) -> str:
+    """Quotet einen Wert für PostgREST-Listen wie in.("a","b") - Kommas, Klammern und Punkte in URLs sind sonst Syntax"""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def in_filter(values: Iterable[str]) -> str:
+    return f"in.({','.join(quote_in_value(v) for v in values)})"
+
+
+def in_chunks(values: Iterable, chunk_size: int = 50, max_filter_chars: int = 6000) -> Iterator[List]:
+    """
+    Teilt Werte (ohne Duplikate) in Blöcke für column=in.(...), begrenzt nach
+    Anzahl und Länge des Filters, damit die Query-URL kurz bleibt.
+
+    Returns: Iterator über Blöcke
+    """
+    chunk: List = []
+    chars = 0
+    for value in dict.fromkeys(values):
+        size = len(quote_in_value(value)) + 1
+        if chunk and (len(chunk) >= chunk_size or chars + size > max_filter_chars):
+            yield chunk
+            chunk, chars = [], 0
+        chunk.append(value)
+        chars += size
+    if chunk:
+        yield chunk
+
+
+def content_range_count(response) -> Optional[int]:
+    """Returns: Gesamtzahl aus Content-Range ("0-9/42" oder "*/42") bei Prefer: count=exact, sonst None"""
+    total = response.headers.get("Content-Range", "").rpartition("/")[2]
+    return int(total) if total.isdigit() else None
+
+
+class RequestTiming(NamedTuple):
+    method: str
+    path: str
+    status: Optional[int]   # None bei Verbindungsfehler
+    elapsed: float          # Sekunden für diesen Versuch
+    attempt: int            # 1 = erster Versuch
+
+
+class DeleteResult(NamedTuple):
+    requested: int          # eindeutige Werte im Filter
+    deleted: int            # laut Content-Range gelöscht (im Trockenlauf: würden gelöscht)
+    failed: int             # Werte in Blöcken, deren Request fehlschlug
+    dry_run: bool
+
+
+class SupabaseClient:
+    def __init__(self, rest_url: str, service_key: str, pool_size: int = 10,
+                 retries: int = 3, backoff: float = 0.5, max_backoff: float = 10.0,
+                 timeout: float = 30.0):
+        self.rest_url = rest_url.rstrip("/")
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.headers = {
+            "apikey": service_key,
+            "Authorization": f"Bearer {service_key}",
+            "Content-Type": "application/json",
+        }
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.hooks: List[Callable[[RequestTiming], None]] = []
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "errors": 0, "seconds": 0.0}
+
+    @classmethod
+    def from_env(cls, rest_url: Optional[str] = None, service_key: Optional[str] = None) -> "SupabaseClient":
+        """
+        URL und Key aus SUPABASE_URL/SUPABASE_SERVICE_KEY (falls nicht übergeben),
+        Pool und Retries aus SUPABASE_POOL_SIZE, SUPABASE_RETRIES, SUPABASE_BACKOFF_SECONDS
+        """
+        if rest_url is None:
+            rest_url = f"{os.getenv('SUPABASE_URL', '').rstrip('/')}/rest/v1"
+        if service_key is None:
+            service_key = os.getenv("SUPABASE_SERVICE_KEY", "")
+        return cls(
+            rest_url, service_key,
+            pool_size=int(os.getenv("SUPABASE_POOL_SIZE", "10")),
+            retries=int(os.getenv("SUPABASE_RETRIES", "3")),
+            backoff=float(os.getenv("SUPABASE_BACKOFF_SECONDS", "0.5")),
+        )
+
+    def add_hook(self, hook: Callable[[RequestTiming], None]):
+        """Registriert einen Hook, der nach jedem Versuch mit RequestTiming aufgerufen wird"""
+        self.hooks.append(hook)
+
+    def url(self, path: str) -> str:
+        return f"{self.rest_url}/{path.lstrip('/')}"
+
+    def _sleep_before_retry(self, attempt: int, response: Optional[requests.Response]):
+        # Full Jitter: zufällig zwischen 0 und exponentieller Obergrenze, damit
+        # parallele Worker nicht im Gleichtakt wiederholen
+        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, min(self.max_backoff, float(retry_after)))
+        time.sleep(delay)
+
+    def request(self, method: str, path: str, headers: Optional[Dict[str, str]] = None,
+                timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """
+        Führt einen Request relativ zur REST-URL aus (z.B. "youtube_urls?select=url").
+        Zusätzliche headers ergänzen bzw. überschreiben die Standard-Header.
+
+        Returns: die letzte Response; Verbindungsfehler nach allen Versuchen werden weitergereicht
+        """
+        url = self.url(path)
+        merged = {**self.headers, **headers} if headers else self.headers
+        timeout = self.timeout if timeout is None else timeout
+        if method.upper() == "DELETE":
+            retry_status, retry_errors = DELETE_RETRY_STATUS, (requests.ConnectTimeout,)
+        else:
+            retry_status, retry_errors = RETRY_STATUS, (requests.ConnectionError, requests.Timeout)
+        attempt = 0
+        while True:
+            attempt += 1
+            started = time.monotonic()
+            response = None
+            try:
+                response = self.session.request(method, url, headers=merged, timeout=timeout, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                self._record(method, path, None, time.monotonic() - started, attempt)
+                if attempt > self.retries or not isinstance(e, retry_errors):
+                    raise
+            else:
+                self._record(method, path, response.status_code, time.monotonic() - started, attempt)
+                if response.status_code not in retry_status or attempt > self.retries:
+                    return response
+            with self._lock:
+                self.stats["retries"] += 1
+            self._sleep_before_retry(attempt, response)
+
+    def _record(self, method: str, path: str, status: Optional[int], elapsed: float, attempt: int):
+        with self._lock:
+            self.stats["requests"] += 1
+            self.stats["seconds"] += elapsed
+            if status is None or status >= 400:
+                self.stats["errors"] += 1
+        if self.hooks:
+            timing = RequestTiming(method, path.split("?", 1)[0], status, elapsed, attempt)
+            for hook in self.hooks:
+                hook(timing)
+
+    def get(self, path: str, **kwargs) -> requests.Response:
+        return self.request("GET", path, **kwargs)
+
+    def head(self, path: str, **kwargs) -> requests.Response:
+        return self.request("HEAD", path, **kwargs)
+
+    def post(self, path: str, **kwargs) -> requests.Response:
+        return self.request("POST", path, **kwargs)
+
+    def patch(self, path: str, **kwargs) -> requests.Response:
+        return self.request("PATCH", path, **kwargs)
+
+    def delete(self, path: str, **kwargs) -> requests.Response:
+        return self.request("DELETE", path, **kwargs)
+
+    def iter_pages(self, table: str, select: str = "*", page_size: int = 1000, key: str = "id",
+                   params: Optional[Dict[str, str]] = None, after=None) -> Iterator[List[dict]]:
+        """
+        Liest eine Tabelle seitenweise per Keyset (order=key.asc, key=gt.<letzter Wert>),
+        mit after nur Zeilen jenseits dieses Schlüssels.
+        Gestoppt wird erst bei einer leeren Seite: PostgREST kürzt Antworten bei
+        max-rows ohne Fehler, eine kurze Seite heißt also nicht "fertig". Folgen
+        auf eine kurze Seite weitere Zeilen, wird einmalig gewarnt.
+
+        Returns: Iterator über Seiten (Listen von Zeilen)
+        """
+        columns = select.split(",")
+        if select != "*" and key not in columns:
+            select = ",".join([key] + columns)
+        last = after
+        short_page = None
+        warned = False
+        while True:
+            query = dict(params or {})
+            query.update({"select": select, "order": f"{key}.asc", "limit": str(page_size)})
+            if last is not None:
+                query[key] = f"gt.{last}"
+            r = self.get(table, params=query)
+            if not r.ok:
+                raise RuntimeError(f"Supabase-Query fehlgeschlagen: {r.status_code} {r.text}")
+            rows = r.json()
+            if not rows:
+                return
+            if short_page is not None and not warned:
+                warned = True
+                print(f"[WARN] Supabase hat eine Seite auf {short_page} statt {page_size} Zeilen gekürzt "
+                      f"(max-rows des Servers?) - lese per Keyset weiter, es fehlen keine Zeilen",
+                      file=sys.stderr)
+            short_page = len(rows) if len(rows) < page_size else None
+            last = rows[-1][key]
+            yield rows
+
+    def count(self, table: str, filters: Optional[Dict[str, str]] = None) -> int:
+        """
+        Zählt Zeilen per HEAD mit Prefer: count=exact - es wird keine Zeile
+        übertragen, nur der Content-Range-Header.
+
+        Returns: Anzahl der Zeilen, auf die die Filter passen
+        """
+        r = self.head(table, headers={"Prefer": "count=exact"}, params={"select": "id", **(filters or {})})
+        total = content_range_count(r)
+        if not r.ok or total is None:
+            raise RuntimeError(f"Supabase-Zählung fehlgeschlagen: {r.status_code} {r.headers.get('Content-Range')}")
+        return total
+
+    def count_many(self, table: str, queries: Dict[str, Dict[str, str]], workers: int = 4) -> Dict[str, int]:
+        """Returns: {Name: Anzahl} für mehrere Filter, parallel über den Pool gezählt"""
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            counts = pool.map(lambda filters: self.count(table, filters), queries.values())
+            return dict(zip(queries, counts))
+
+    def find_existing(self, table: str, column: str, values: Iterable[str],
+                      chunk_size: int = 50, max_filter_chars: int = 6000) -> Set[str]:
+        """
+        Fragt nur die übergebenen Kandidaten ab (column=in.(...)), in Blöcken,
+        damit die Query-URL kurz bleibt. Die Kosten hängen so von der Anzahl der
+        Kandidaten ab, nicht von der Tabellengröße.
+
+        Returns: die Werte, die in der Tabelle bereits vorkommen
+        """
+        found: Set[str] = set()
+        for chunk in in_chunks(values, chunk_size, max_filter_chars):
+            found.update(self._lookup_chunk(table, column, chunk))
+        return found
+
+    def _lookup_chunk(self, table: str, column: str, chunk: List[str]) -> Iterator[str]:
+        r = self.get(table, params={"select": column, column: in_filter(chunk)})
+        if not r.ok:
+            raise RuntimeError(f"Supabase-Query fehlgeschlagen: {r.status_code} {r.text}")
+        return (row[column] for row in r.json() if row.get(column) is not None)
+
+    def bulk_delete(self, table: str, values: Iterable, column: str = "id", chunk_size: int = 200,
+                    workers: int = 4, dry_run: bool = False, max_filter_chars: int = 6000) -> DeleteResult:
+        """
+        Löscht Zeilen blockweise per column=in.(...) statt einem DELETE pro Zeile;
+        die Blöcke laufen parallel über den Pool. Gezählt wird über Prefer: count=exact
+        und Content-Range. Im Trockenlauf zählt ein HEAD mit demselben Filter, was
+        gelöscht würde, ohne etwas zu löschen.
+
+        Returns: DeleteResult
+        """
+        chunks = list(in_chunks(values, chunk_size, max_filter_chars))
+        method = "HEAD" if dry_run else "DELETE"
+        prefer = "count=exact" if dry_run else "count=exact,return=minimal"
+
+        def run(chunk: List) -> Tuple[int, int]:
+            try:
+                r = self.request(method, table, headers={"Prefer": prefer},
+                                 params={"select": column, column: in_filter(chunk)})
+            except (requests.ConnectionError, requests.Timeout) as e:
+                print(f"[ERROR] Bulk-Delete: {len(chunk)} Werte nicht gelöscht: {e}", file=sys.stderr)
+                return 0, len(chunk)
+            if not r.ok:
+                print(f"[ERROR] Bulk-Delete: {len(chunk)} Werte nicht gelöscht: {r.status_code} {r.text}",
+                      file=sys.stderr)
+                return 0, len(chunk)
+            count = content_range_count(r)
+            # Ohne Content-Range (sehr alte PostgREST-Version) bleibt nur die Blockgröße als Obergrenze
+            return (count if count is not None else len(chunk)), 0
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            results = list(pool.map(run, chunks))
+        return DeleteResult(
+            requested=sum(len(c) for c in chunks),
+            deleted=sum(d for d, _ in results),
+            failed=sum(f for _, f in results),
+            dry_run=dry_run,
+        )
+
+    def close(self):
+        self.session.close()
+
+    def summary_line(self) -> str:
+        with self._lock:
+            s = dict(self.stats)
+        avg = s["seconds"] / s["requests"] * 1000 if s["requests"] else 0.0
+        return (f"Supabase-REST: {s['requests']} Requests, Ø {avg:.0f} ms, "
+                f"{s['retries']} Wiederholungen, {s['errors']} Fehler")
@@ -0,0 +1,193 @@
+"""
+Gepufferter Upsert-Writer für Supabase/PostgREST
+Sammelt Zeilen und schreibt sie als Multi-Row-Array, sobald eine Zeilenzahl,
+eine Payload-Größe oder eine Wartezeit erreicht ist. Antworten werden mit
+'return=minimal' angefordert, damit PostgREST nicht jede Zeile (samt
+Untertiteln) zurückschickt. Schlägt ein Batch mit einem Zeilenfehler
+(400/409/422) fehl, wird er halbiert, bis die fehlerhaften Zeilen einzeln feststehen.
+"""
+import os
+import json
+import time
+import threading
+from typing import Optional, Dict, List, Tuple, Callable, NamedTuple
+
+import requests
+
+from .supabase_client import SupabaseClient
+
+
+# Nur bei diesen Status-Codes lohnt es sich, einen Batch zu halbieren
+ROW_ERROR_STATUSES = (400, 409, 422)
+
+
+class RowFailure(NamedTuple):
+    key: str
+    error: str
+
+
+class UpsertError(RuntimeError):
+    def __init__(self, status: Optional[int], message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class SupabaseWriter:
+    def __init__(self, client: SupabaseClient, table: str,
+                 on_conflict: str = "url", max_rows: int = 100,
+                 max_bytes: int = 4 * 1024 * 1024, max_interval: float = 10.0,
+                 timeout: float = 60.0,
+                 on_failure: Optional[Callable[[RowFailure], None]] = None):
+        self.client = client
+        self.path = f"{table}?on_conflict={on_conflict}"
+        self.headers = {"Prefer": "resolution=merge-duplicates,return=minimal"}
+        self.on_conflict = on_conflict
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.max_interval = max_interval
+        self.timeout = timeout
+        self.on_failure = on_failure
+
+        # Schlüssel -> (Key-Set, JSON-kodierte Zeile); spätere Upserts derselben URL
+        # ersetzen frühere, sonst lehnt PostgREST den Batch ab
+        self._rows: Dict[str, Tuple[tuple, bytes]] = {}
+        self._bytes = 0
+        self._first_at: Optional[float] = None
+        self._cond = threading.Condition()
+        # RLock: close() hält ihn über den letzten flush(), der ihn erneut nimmt
+        self._send_lock = threading.RLock()
+        self._closed = False
+        self._thread: Optional[threading.Thread] = None
+        self.failures: List[RowFailure] = []
+        self.stats = {"rows": 0, "ok": 0, "failed": 0, "requests": 0}
+
+    @classmethod
+    def from_env(cls, client: SupabaseClient, table: str, **kwargs) -> "SupabaseWriter":
+        """Schwellen aus UPSERT_BATCH_ROWS, UPSERT_BATCH_MAX_KB und UPSERT_BATCH_INTERVAL_SECONDS"""
+        kwargs.setdefault("max_rows", int(os.getenv("UPSERT_BATCH_ROWS", "100")))
+        kwargs.setdefault("max_bytes", int(os.getenv("UPSERT_BATCH_MAX_KB", "4096")) * 1024)
+        kwargs.setdefault("max_interval", float(os.getenv("UPSERT_BATCH_INTERVAL_SECONDS", "10")))
+        return cls(client, table, **kwargs)
+
+    # --- Puffern ---
+    def add(self, row: dict):
+        """Puffert eine Zeile; schreibt sofort, wenn Zeilen- oder Byte-Grenze erreicht ist"""
+        encoded = json.dumps(row, ensure_ascii=False).encode("utf-8")
+        key = str(row.get(self.on_conflict))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("SupabaseWriter ist bereits geschlossen")
+            old = self._rows.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old[1])
+            else:
+                self.stats["rows"] += 1
+            self._rows[key] = (tuple(sorted(row)), encoded)
+            self._bytes += len(encoded)
+            if self._first_at is None:
+                self._first_at = time.monotonic()
+                self._ensure_timer()
+                self._cond.notify_all()
+            full = len(self._rows) >= self.max_rows or self._bytes >= self.max_bytes
+            batch = self._take() if full else None
+        if batch:
+            self._send_batch(batch)
+
+    def _take(self) -> List[Tuple[str, tuple, bytes]]:
+        batch = [(key, keys, data) for key, (keys, data) in self._rows.items()]
+        self._rows = {}
+        self._bytes = 0
+        self._first_at = None
+        return batch
+
+    def _ensure_timer(self):
+        if self.max_interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._timer, name="supabase-writer", daemon=True)
+            self._thread.start()
+
+    def _timer(self):
+        """Schreibt einen Teil-Batch, wenn die älteste Zeile max_interval wartet"""
+        while True:
+            with self._cond:
+                while not self._closed and (self._first_at is None or
+                                            time.monotonic() < self._first_at + self.max_interval):
+                    wait = None if self._first_at is None else self._first_at + self.max_interval - time.monotonic()
+                    self._cond.wait(wait)
+                if self._closed:
+                    return
+                batch = self._take()
+            self._send_batch(batch)
+
+    def flush(self):
+        """Schreibt alle gepufferten Zeilen sofort"""
+        with self._cond:
+            batch = self._take()
+        if batch:
+            self._send_batch(batch)
+
+    def close(self):
+        """Stoppt den Timer, wartet auf laufende Requests und schreibt den Rest"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        with self._send_lock:
+            self.flush()
+
+    def __enter__(self) -> "SupabaseWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    # --- Senden ---
+    def _post(self, rows: List[bytes]):
+        self.stats["requests"] += 1
+        body = b"[" + b",".join(rows) + b"]"
+        try:
+            r = self.client.post(self.path, headers=self.headers, data=body, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise UpsertError(None, str(e)) from e
+        if not r.ok:
+            raise UpsertError(r.status_code, f"Supabase upsert failed: {r.status_code} {r.text}")
+
+    def _send_batch(self, batch: List[Tuple[str, tuple, bytes]]):
+        # PostgREST verlangt bei Multi-Row-Inserts identische Keys je Request
+        groups: Dict[tuple, List[Tuple[str, bytes]]] = {}
+        for key, keys, data in batch:
+            groups.setdefault(keys, []).append((key, data))
+        with self._send_lock:
+            for rows in groups.values():
+                self._send_group(rows)
+
+    def _send_group(self, rows: List[Tuple[str, bytes]]):
+        try:
+            self._post([data for _, data in rows])
+            self.stats["ok"] += len(rows)
+            return
+        except UpsertError as e:
+            error = e
+        # Zeilenfehler (ungültige Werte, Constraints) stecken in einzelnen Zeilen:
+        # halbieren und getrennt schreiben. Auth-, Größen-, Netz- und Serverfehler
+        # betreffen den ganzen Batch, jede Hälfte würde genauso scheitern.
+        if len(rows) > 1 and error.status in ROW_ERROR_STATUSES:
+            mid = len(rows) // 2
+            self._send_group(rows[:mid])
+            self._send_group(rows[mid:])
+            return
+        for key, _ in rows:
+            self._fail(RowFailure(key, str(error)))
+
+    def _fail(self, failure: RowFailure):
+        self.stats["failed"] += 1
+        self.failures.append(failure)
+        if self.on_failure:
+            self.on_failure(failure)
+
+    def summary_line(self) -> str:
+        s = self.stats
+        return (f"Supabase-Upserts: {s['ok']}/{s['rows']} Zeilen in {s['requests']} Requests"
+                + (f", {s['failed']} fehlgeschlagen" if s["failed"] else ""))
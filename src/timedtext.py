@@ -0,0 +1,148 @@
+"""
+Direktes Parsen von YouTube-Timedtext (XML srv1/srv3 oder json3)
+Liest die rohe Caption-Spur in einem Durchlauf in Text-Segmente, ohne den
+Umweg über einen SRT-String, der danach wieder per Regex zerlegt werden müsste.
+"""
+import json
+import re
+from html import unescape
+from collections import deque
+from typing import Iterable, Iterator, NamedTuple, List, Tuple, Optional
+import xml.etree.ElementTree as ElementTree
+
+# Wie in der SRT-Bereinigung: reine Zahlenzeilen und Zeilen mit führendem
+# Zeitstempel wurden bisher verworfen - beibehalten, damit der gespeicherte
+# Text identisch bleibt
+_SKIP_LINE = re.compile(r"\d+\Z|\d\d:\d\d:\d\d").match
+# Zeichen pro parser.feed(); klein genug, dass Segmente früh ausgegeben werden
+XML_FEED_CHUNK = 16 * 1024
+
+
+class Segment(NamedTuple):
+    start_ms: int
+    end_ms: int
+    text: str
+
+
+def _clean_lines(caption: str) -> List[str]:
+    return [s for line in caption.splitlines() if (s := line.strip()) and not _SKIP_LINE(line)]
+
+
+def iter_xml_segments(xml_captions: str, chunk_size: int = XML_FEED_CHUNK) -> Iterator[Segment]:
+    """
+    Streamt Segmente aus einer XML-Spur: blockweise in den Parser, fertige
+    Elemente werden sofort ausgegeben und geleert, ohne den ganzen Baum aufzubauen.
+    srv1: <transcript><text start="1.2" dur="3.4">...</text>
+    srv3: <timedtext><body><p t="1200" d="3400">...<s>...</s></p>
+    """
+    parser = ElementTree.XMLPullParser(events=("end",))
+    for start in range(0, len(xml_captions), chunk_size):
+        parser.feed(xml_captions[start:start + chunk_size])
+        yield from _drain_xml_events(parser)
+    parser.close()
+    yield from _drain_xml_events(parser)
+
+
+def _drain_xml_events(parser: ElementTree.XMLPullParser) -> Iterator[Segment]:
+    for _, elem in parser.read_events():
+        if elem.tag not in ("p", "text"):
+            continue
+        children = list(elem)
+        if children:
+            # Gleiche Zusammensetzung wie pytubefix.Caption.xml_caption_to_srt
+            caption = "".join(f" {s.text or ''}" for s in children if s.tag == "s")
+        else:
+            caption = elem.text or ""
+        if not caption:
+            elem.clear()
+            continue
+        caption = unescape(caption.replace("\n", " ").replace("  ", " "))
+        attrs = elem.attrib
+        try:
+            if "t" in attrs:
+                start_ms = int(float(attrs["t"]))
+            else:
+                start_ms = int(round(float(attrs["start"]) * 1000))
+            if "d" in attrs:
+                dur_ms = int(float(attrs["d"]))
+            else:
+                dur_ms = int(round(float(attrs.get("dur", 0)) * 1000))
+        except (KeyError, ValueError):
+            start_ms, dur_ms = 0, 0
+        elem.clear()
+        text = " ".join(_clean_lines(caption))
+        if text:
+            yield Segment(start_ms, start_ms + dur_ms, text)
+
+
+def iter_json3_segments(json_captions: str) -> Iterator[Segment]:
+    """Streamt Segmente aus einer json3-Spur ({"events": [{"tStartMs", "dDurationMs", "segs"}]})"""
+    data = json.loads(json_captions)
+    for event in data.get("events", ()):
+        segs = event.get("segs")
+        if not segs:
+            continue
+        caption = "".join(seg.get("utf8", "") for seg in segs)
+        text = " ".join(_clean_lines(caption))
+        if not text:
+            continue
+        start_ms = int(event.get("tStartMs", 0))
+        yield Segment(start_ms, start_ms + int(event.get("dDurationMs", 0)), text)
+
+
+def iter_segments(payload: str) -> Iterator[Segment]:
+    """Erkennt das Format (json3 oder XML) und streamt die Segmente"""
+    if payload.lstrip()[:1] == "{":
+        return iter_json3_segments(payload)
+    return iter_xml_segments(payload)
+
+
+def timedtext_to_text(payload: str) -> str:
+    """Rohe Caption-Spur -> Fließtext (wie bisher SRT + clean_srt_to_text)"""
+    return " ".join(seg.text for seg in iter_segments(payload))
+
+
+def is_auto_code(code: Optional[str]) -> bool:
+    """Automatisch generierte Spuren haben bei YouTube Codes wie 'a.de' oder 'a.en'"""
+    return bool(code) and code.startswith("a.")
+
+
+def dedup_rolling(segments: Iterable[Segment], min_overlap: int = 2,
+                  max_overlap: int = 64) -> Iterator[Segment]:
+    """
+    Entfernt die Wiederholungen aus "rollenden" Auto-Untertiteln: jeder Cue
+    wiederholt die vorige Zeile, bevor die neue folgt. Pro Cue wird der längste
+    Wort-Überlapp zwischen dem Ende des bisherigen Texts und dem Anfang des Cues
+    gesucht und abgeschnitten. Cues, die komplett wiederholt sind, entfallen.
+    Überlappungen unter min_overlap Wörtern bleiben stehen (echte Wortwiederholung).
+    """
+    tail: deque = deque(maxlen=max_overlap)
+    for seg in segments:
+        words = seg.text.split()
+        limit = min(len(tail), len(words), max_overlap)
+        overlap = 0
+        for k in range(limit, 0, -1):
+            if words[0] == tail[-k] and all(tail[j - k] == words[j] for j in range(1, k)):
+                overlap = k
+                break
+        if overlap and (overlap >= min_overlap or overlap == len(words)):
+            words = words[overlap:]
+            if not words:
+                continue
+            seg = Segment(seg.start_ms, seg.end_ms, " ".join(words))
+        tail.extend(words)
+        yield seg
+
+
+def clean_timedtext(payload: str, dedup: bool = False) -> Tuple[str, int]:
+    """
+    Rohe Caption-Spur -> Fließtext, optional mit Rolling-Dedup.
+
+    Returns: (text, eingesparte Bytes durch Dedup)
+    """
+    segments = list(iter_segments(payload))
+    text = " ".join(seg.text for seg in segments)
+    if not dedup:
+        return text, 0
+    deduped = " ".join(seg.text for seg in dedup_rolling(segments))
+    return deduped, len(text.encode("utf-8")) - len(deduped.encode("utf-8"))
@@ -0,0 +1,139 @@
+"""
+Kompaktes Transkript mit Zeitstempeln
+Statt eines Python-Objekts pro Cue werden Start/Ende (ms) als gepackte
+uint32-Arrays und der Text als ein einziger UTF-8-Puffer gehalten. Die Cues
+liegen im Puffer durch je ein Leerzeichen getrennt, daher ist der Puffer
+selbst bereits der Fließtext, wie er in der Spalte 'subtitles' steht.
+"""
+import sys
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, Tuple
+
+from .timedtext import Segment, iter_segments, dedup_rolling
+
+MAGIC = b"TRN1"
+_HEADER = struct.Struct("<4sII")  # magic, Anzahl Cues, Pufferlänge
+
+
+def _le(values: array) -> bytes:
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_le(data: bytes) -> array:
+    values = array("I")
+    values.frombytes(data)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values
+
+
+class Transcript:
+    __slots__ = ("starts", "ends", "offsets", "buffer")
+
+    def __init__(self, starts: array, ends: array, offsets: array, buffer: bytes):
+        self.starts = starts
+        self.ends = ends
+        # offsets[i] = Byte-Offset von Cue i; offsets[n] = len(buffer) + 1 (virtuelles Trennzeichen)
+        self.offsets = offsets
+        self.buffer = buffer
+
+    @classmethod
+    def from_segments(cls, segments: Iterable[Segment]) -> "Transcript":
+        starts, ends, offsets = array("I"), array("I"), array("I")
+        parts = []
+        pos = 0
+        for seg in segments:
+            data = seg.text.encode("utf-8")
+            starts.append(seg.start_ms)
+            ends.append(seg.end_ms)
+            offsets.append(pos)
+            parts.append(data)
+            pos += len(data) + 1
+        offsets.append(pos)
+        return cls(starts, ends, offsets, b" ".join(parts))
+
+    @classmethod
+    def from_timedtext(cls, payload: str, dedup: bool = False) -> "Transcript":
+        """Rohe Caption-Spur (XML/json3) -> Transcript, optional mit Rolling-Dedup"""
+        segments = iter_segments(payload)
+        return cls.from_segments(dedup_rolling(segments) if dedup else segments)
+
+    # --- Zugriff ---
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def text(self) -> str:
+        """Fließtext, identisch zu timedtext_to_text()"""
+        return self.buffer.decode("utf-8")
+
+    def segment_text(self, i: int) -> str:
+        return self.buffer[self.offsets[i]:self.offsets[i + 1] - 1].decode("utf-8")
+
+    def segment(self, i: int) -> Segment:
+        return Segment(self.starts[i], self.ends[i], self.segment_text(i))
+
+    def __iter__(self) -> Iterator[Segment]:
+        for i in range(len(self)):
+            yield self.segment(i)
+
+    def index_at(self, ms: int) -> int:
+        """Returns: Index des letzten Cues, der bei oder vor ms beginnt (-1 wenn keiner)"""
+        return bisect_right(self.starts, ms) - 1
+
+    # --- Ausschnitte ---
+    def _range(self, lo: int, hi: int) -> "Transcript":
+        if lo >= hi:
+            return Transcript(array("I"), array("I"), array("I", [0]), b"")
+        base = self.offsets[lo]
+        offsets = array("I", (o - base for o in self.offsets[lo:hi + 1]))
+        return Transcript(self.starts[lo:hi], self.ends[lo:hi], offsets,
+                          self.buffer[base:self.offsets[hi] - 1])
+
+    def slice(self, start_ms: int, end_ms: int) -> "Transcript":
+        """Alle Cues, die im Fenster [start_ms, end_ms) beginnen"""
+        return self._range(bisect_left(self.starts, start_ms), bisect_left(self.starts, end_ms))
+
+    def windows(self, size_ms: int, step_ms: int = 0) -> Iterator[Tuple[int, str]]:
+        """Fließtext in Zeitfenstern (z.B. für fensterweises Scoring). Returns: (start_ms, text)"""
+        if not len(self):
+            return
+        step_ms = step_ms or size_ms
+        start = self.starts[0]
+        last = self.starts[-1]
+        while start <= last:
+            lo = bisect_left(self.starts, start)
+            hi = bisect_left(self.starts, start + size_ms)
+            if lo < hi:
+                yield start, self.buffer[self.offsets[lo]:self.offsets[hi] - 1].decode("utf-8")
+            start += step_ms
+
+    # --- Serialisierung ---
+    @property
+    def nbytes(self) -> int:
+        return _HEADER.size + 4 * (len(self.starts) + len(self.ends) + len(self.offsets)) + len(self.buffer)
+
+    def to_bytes(self) -> bytes:
+        return b"".join((
+            _HEADER.pack(MAGIC, len(self), len(self.buffer)),
+            _le(self.starts), _le(self.ends), _le(self.offsets),
+            self.buffer,
+        ))
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Transcript":
+        magic, n, buf_len = _HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Kein Transcript-Format (falsche Kennung)")
+        pos = _HEADER.size
+        starts = _from_le(data[pos:pos + 4 * n]); pos += 4 * n
+        ends = _from_le(data[pos:pos + 4 * n]); pos += 4 * n
+        offsets = _from_le(data[pos:pos + 4 * (n + 1)]); pos += 4 * (n + 1)
+        buffer = bytes(data[pos:pos + buf_len])
+        if len(buffer) != buf_len:
+            raise ValueError("Transcript-Daten unvollständig")
+        return cls(starts, ends, offsets, buffer)
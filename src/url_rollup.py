@@ -0,0 +1,126 @@
+"""
+Lokales Rollup: neue URLs pro Tag und Quelle
+Für Trendansichten reicht eine kleine Tabelle {Tag: {source: Anzahl}}. Sie
+wird inkrementell nachgeführt - gelesen werden nur id, added_at und source der
+Zeilen nach der höchsten bereits gezählten id. Der komplette Neuaufbau liest
+die ganze Tabelle und läuft daher nur ausdrücklich (rebuild); needs_rebuild()
+meldet, wann er fällig ist, damit gelöschte Zeilen herausfallen.
+
+Grenze des id-Wasserzeichens: Vergibt die Sequenz eine kleinere id an eine
+Transaktion, die erst nach einem Sync committet, wird diese Zeile erst beim
+nächsten Neuaufbau gezählt. Für eine Trendansicht ist das hinnehmbar.
+
+Bewusst ohne Paket-Importe: DatabaseCleaner importiert die Module flach.
+"""
+import os
+import json
+import time
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_ROLLUP_PATH = Path(__file__).resolve().parent.parent / ".cache" / "url_rollup.json"
+ROLLUP_VERSION = 1
+UNKNOWN_SOURCE = "(ohne)"
+
+
+class UrlRollup:
+    def __init__(self, path: Optional[Path] = None, full_sync_hours: float = 24.0, page_size: int = 1000):
+        self.path = Path(path) if path else None
+        self.full_sync_seconds = full_sync_hours * 3600
+        self.page_size = page_size
+        self.days: Dict[str, Dict[str, int]] = {}
+        self.max_id = 0
+        self.full_sync_at = 0.0
+        if self.path:
+            self.load()
+
+    @classmethod
+    def from_env(cls) -> "UrlRollup":
+        """Pfad aus URL_ROLLUP_PATH (leer = nur im Speicher), Neuaufbau alle URL_ROLLUP_FULL_SYNC_HOURS"""
+        path = os.getenv("URL_ROLLUP_PATH", str(DEFAULT_ROLLUP_PATH))
+        return cls(
+            path=Path(path) if path else None,
+            full_sync_hours=float(os.getenv("URL_ROLLUP_FULL_SYNC_HOURS", "24")),
+            page_size=int(os.getenv("SUPABASE_PAGE_SIZE", "1000")),
+        )
+
+    # --- Persistenz ---
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if data.get("version") != ROLLUP_VERSION:
+            return
+        self.days = data.get("days", {})
+        self.max_id = data.get("max_id", 0)
+        self.full_sync_at = data.get("full_sync_at", 0.0)
+
+    def save(self):
+        if not self.path:
+            return
+        data = {"version": ROLLUP_VERSION, "max_id": self.max_id,
+                "full_sync_at": self.full_sync_at, "days": self.days}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    # --- Sync ---
+    def _count(self, rows: List[Dict]):
+        for row in rows:
+            day = (row.get("added_at") or "")[:10] or "unbekannt"
+            source = row.get("source") or UNKNOWN_SOURCE
+            per_source = self.days.setdefault(day, {})
+            per_source[source] = per_source.get(source, 0) + 1
+            self.max_id = max(self.max_id, row["id"])
+
+    def needs_rebuild(self) -> bool:
+        """Returns: True, wenn noch nie oder vor mehr als full_sync_hours komplett aufgebaut"""
+        return not self.full_sync_at or time.time() - self.full_sync_at >= self.full_sync_seconds
+
+    def rebuild(self, client, table: str) -> int:
+        """Baut das Rollup aus der ganzen Tabelle neu auf. Returns: Anzahl gelesener Zeilen"""
+        return self.sync(client, table, full=True)
+
+    def sync(self, client, table: str, full: bool = False) -> int:
+        """
+        Zählt Zeilen nach der höchsten bekannten id ein; mit full=True wird neu aufgebaut.
+        Ohne vorhandenes Rollup passiert nichts - sonst würde die ganze Tabelle gelesen.
+
+        Returns: Anzahl gelesener Zeilen
+        """
+        after = self.max_id
+        if full:
+            self.days, self.max_id, after = {}, 0, None
+            self.full_sync_at = time.time()
+        elif not self.full_sync_at:
+            return 0
+        fetched = 0
+        for page in client.iter_pages(table, select="id,added_at,source", page_size=self.page_size, after=after):
+            self._count(page)
+            fetched += len(page)
+        self.save()
+        return fetched
+
+    # --- Auswertung ---
+    def recent(self, days: int = 7) -> List[Tuple[str, Dict[str, int]]]:
+        """Returns: die letzten Tage mit Einträgen, neuester zuerst"""
+        return [(day, self.days[day]) for day in sorted(self.days, reverse=True)[:days]]
+
+    def by_source(self) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for per_source in self.days.values():
+            for source, n in per_source.items():
+                totals[source] = totals.get(source, 0) + n
+        return dict(sorted(totals.items(), key=lambda item: -item[1]))
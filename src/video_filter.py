@@ -1,18 +1,38 @@
 """
 Video-Filter-Modul für KI/Tech-relevante YouTube-Videos
 """
-import re
-from typing import Tuple, Optional
+import os
+import hashlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Tuple, Optional, List, Sequence, Iterator
+import numpy as np
 import requests
 import json
-from .filter_config import *
+try:
+    from .filter_config import *
+    from .keyword_matcher import KeywordMatcher
+    from .ai_batch_classifier import AIBatchClassifier
+except ImportError:  # direkt aus src/ importiert (retrograde_classifier, simple_classifier)
+    from filter_config import *
+    from keyword_matcher import KeywordMatcher
+    from ai_batch_classifier import AIBatchClassifier
 
 class VideoFilter:
     def __init__(self):
         self.keywords = {kw.lower() for kw in TECH_KEYWORDS}
         self.exclude_keywords = {kw.lower() for kw in EXCLUDE_KEYWORDS}
+        # Einmal gebauter Automat für alle Include-/Exclude-Keywords
+        self.matcher = KeywordMatcher(
+            {"include": self.keywords, "exclude": self.exclude_keywords},
+            suffixes=KEYWORD_SUFFIXES, suffix_min_len=KEYWORD_SUFFIX_MIN_LEN,
+        )
+        # Spalten der Treffermatrix: Include-Keywords, Maske der starken Indikatoren
+        self._columns = {kw: i for i, kw in enumerate(sorted(self.keywords))}
+        self._strong_mask = np.array([kw in STRONG_INDICATORS for kw in sorted(self.keywords)], dtype=np.int64)
         self.ai_available = self._check_ai_availability()
-        
+        self.ai_batch = self._build_ai_batch() if self.ai_available else None
+
     def _check_ai_availability(self) -> bool:
         """Prüft ob eine KI-API verfügbar ist"""
         if PREFERRED_AI_API == "openai" and OPENAI_API_KEY:
@@ -20,44 +40,175 @@ class VideoFilter:
         elif PREFERRED_AI_API == "anthropic" and ANTHROPIC_API_KEY:
             return True
         return False
+
+    def _build_ai_batch(self) -> AIBatchClassifier:
+        openai = PREFERRED_AI_API == "openai"
+        return AIBatchClassifier(
+            api=PREFERRED_AI_API,
+            api_key=OPENAI_API_KEY if openai else ANTHROPIC_API_KEY,
+            model=OPENAI_MODEL if openai else ANTHROPIC_MODEL,
+            url=OPENAI_API_URL if openai else ANTHROPIC_API_URL,
+            prompt=AI_BATCH_PROMPT,
+            single=lambda title, subtitles: self.ai_classify(title, subtitles),
+            batch_size=AI_BATCH_SIZE,
+            concurrency=AI_BATCH_CONCURRENCY,
+        )
     
     def calculate_keyword_score(self, title: str, subtitles: Optional[str] = None) -> float:
         """
         Berechnet einen Relevanz-Score basierend auf Keywords
         Returns: Score zwischen 0 und 1
         """
-        text = title.lower()
-        if subtitles:
-            # Nur erste 1000 Zeichen der Untertitel für Performance
-            text += " " + subtitles[:1000].lower()
+        text = self._score_text(title, subtitles)
         
-        # Check für Ausschluss-Keywords
-        for exclude_kw in self.exclude_keywords:
-            if exclude_kw in text:
-                return 0.0
+        # Ein Durchlauf findet alle Include- und Exclude-Treffer an Wortgrenzen
+        hits = self.matcher.scan(text)
+        if hits["exclude"]:
+            return 0.0
         
-        # Zähle Keyword-Matches
-        matches = 0
-        matched_keywords = set()
-        
-        for keyword in self.keywords:
-            if keyword in text:
-                matches += 1
-                matched_keywords.add(keyword)
-        
-        # Bonus für bestimmte starke Indikatoren
-        strong_indicators = {'ai', 'künstliche intelligenz', 'machine learning', 
-                            'gpt', 'programming', 'coding', 'robotics'}
-        strong_matches = matched_keywords & strong_indicators
-        
-        if strong_matches:
-            matches += len(strong_matches) * 2
+        # Zähle Keyword-Matches, Bonus für starke Indikatoren
+        matched_keywords = hits["include"]
+        matches = len(matched_keywords) + len(matched_keywords & STRONG_INDICATORS) * 2
         
         # Normalisiere Score (max 10 matches = 1.0)
         score = min(matches / 10, 1.0)
         
         return score
     
+    def fingerprint(self, use_ai: bool = False) -> str:
+        """
+        Fingerabdruck aller Einstellungen, die das Ergebnis beeinflussen (Keywords,
+        Schwellwerte, Untertitel-Länge, bei use_ai auch Modell und Prompt).
+        Jede Änderung in filter_config macht damit alte Cache-Einträge ungültig.
+        """
+        parts = [
+            sorted(self.keywords), sorted(self.exclude_keywords), sorted(STRONG_INDICATORS),
+            list(KEYWORD_SUFFIXES), KEYWORD_SUFFIX_MIN_LEN, SUBTITLE_SCORE_CHARS,
+            MIN_KEYWORD_SCORE, AI_ANALYSIS_MIN_SCORE, AI_ANALYSIS_MAX_SCORE,
+        ]
+        if use_ai and self.ai_available:
+            parts += [PREFERRED_AI_API, OPENAI_MODEL, ANTHROPIC_MODEL, AI_CLASSIFICATION_PROMPT, AI_BATCH_PROMPT]
+        return hashlib.blake2b(json.dumps(parts, ensure_ascii=False).encode("utf-8"), digest_size=8).hexdigest()
+
+    def content_key(self, title: str, subtitles: Optional[str], fingerprint: str) -> str:
+        """Returns: Hash aus bewertetem Text und Konfigurations-Fingerabdruck"""
+        text = self._score_text(title, subtitles)
+        # Die KI sieht die ersten 500 Zeichen der Untertitel, auch wenn der Keyword-Score kürzer ist
+        ai_preview = (subtitles or "")[:500]
+        data = "\0".join((fingerprint, text, ai_preview)).encode("utf-8")
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def _score_text(self, title: str, subtitles: Optional[str]) -> str:
+        if subtitles:
+            return title + " " + (subtitles[:SUBTITLE_SCORE_CHARS] if SUBTITLE_SCORE_CHARS else subtitles)
+        return title
+
+    def hit_matrix(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Dünn besetzte Treffermatrix (CSR) über die Include-Keywords eines Batches.
+
+        Returns: (indptr, indices, excluded) - Zeile r hat die Spalten indices[indptr[r]:indptr[r+1]],
+                 excluded[r] ist True bei einem Exclude-Treffer
+        """
+        indptr = np.zeros(len(texts) + 1, dtype=np.int64)
+        indices: List[int] = []
+        excluded = np.zeros(len(texts), dtype=bool)
+        for r, text in enumerate(texts):
+            hits = self.matcher.scan(text)
+            excluded[r] = bool(hits["exclude"])
+            indices.extend(self._columns[kw] for kw in hits["include"])
+            indptr[r + 1] = len(indices)
+        return indptr, np.array(indices, dtype=np.int64), excluded
+
+    def score_batch(self, records: Sequence[Tuple[str, Optional[str]]]) -> np.ndarray:
+        """
+        Keyword-Scores für viele (Titel, Untertitel)-Paare auf einmal; identisch
+        mit calculate_keyword_score pro Datensatz.
+
+        Returns: float64-Array der Scores in Eingabereihenfolge
+        """
+        return self.score_texts([self._score_text(title, subtitles) for title, subtitles in records])
+
+    def score_texts(self, texts: Sequence[str]) -> np.ndarray:
+        """Wie score_batch, aber für bereits zusammengesetzte Score-Texte (Titel + gekürzte Untertitel)"""
+        indptr, indices, excluded = self.hit_matrix(texts)
+        rows = np.repeat(np.arange(len(texts)), np.diff(indptr))
+        matches = np.diff(indptr) + 2 * np.bincount(rows, weights=self._strong_mask[indices],
+                                                     minlength=len(texts)).astype(np.int64)
+        scores = np.minimum(matches / 10, 1.0)
+        scores[excluded] = 0.0
+        return scores
+
+    def classify_batch(self, records: Sequence[Tuple[str, Optional[str]]],
+                       use_ai: bool = True) -> List[Tuple[bool, float, str]]:
+        """
+        Wie is_relevant für jeden Datensatz, aber mit vektorisierten Keyword-Scores;
+        nur Datensätze im unsicheren Bereich gehen (falls aktiviert) gebündelt an die KI.
+
+        Returns: Liste von (is_relevant, score, method) in Eingabereihenfolge
+        """
+        return self.classify_scored(records, self.score_batch(records), use_ai)
+
+    def classify_scored(self, records: Sequence[Tuple[str, Optional[str]]], scores: np.ndarray,
+                        use_ai: bool = True) -> List[Tuple[bool, float, str]]:
+        """Entscheidungsregeln von is_relevant auf bereits berechnete Keyword-Scores"""
+        relevant = scores >= MIN_KEYWORD_SCORE
+        sure_relevant = relevant & (scores > AI_ANALYSIS_MAX_SCORE)
+        sure_irrelevant = scores < AI_ANALYSIS_MIN_SCORE
+        ask_ai = ~sure_relevant & ~sure_irrelevant & (scores <= AI_ANALYSIS_MAX_SCORE)
+        if not (use_ai and self.ai_available):
+            ask_ai[:] = False
+        ai_rows = np.flatnonzero(ask_ai).tolist()
+        answers = dict(zip(ai_rows, self.ai_classify_many([records[r] for r in ai_rows])))
+        results = []
+        for r, score in enumerate(scores.tolist()):
+            if ask_ai[r]:
+                results.append(self._apply_ai_answer(answers[r], score))
+            else:
+                results.append((bool(relevant[r] and not sure_irrelevant[r]), score, "keywords"))
+        return results
+
+    def ai_classify_many(self, records: Sequence[Tuple[str, Optional[str]]]) -> List[str]:
+        """Returns: KI-Antwort je (title, subtitles), gebündelt in Batches statt einzelner Aufrufe"""
+        if not records:
+            return []
+        if self.ai_batch is None:
+            return [self.ai_classify(title, subtitles) for title, subtitles in records]
+        return self.ai_batch.classify_many(records)
+
+    def iter_classify_parallel(self, records: Sequence[Tuple[str, Optional[str]]], use_ai: bool = True,
+                               workers: int = 0, chunk_size: int = 500) -> Iterator[Tuple[int, List]]:
+        """
+        Klassifiziert viele Datensätze: die Keyword-Scores (reine CPU-Arbeit) laufen
+        blockweise in einem Prozess-Pool, die Ergebnisse kommen in Eingabereihenfolge
+        zurück. Höchstens 2 * workers Blöcke sind gleichzeitig eingereicht, damit
+        Score-Texte und Ergebnisse nicht für den ganzen Bestand im Speicher liegen.
+        KI-Abfragen für unsichere Fälle laufen im aufrufenden Prozess.
+
+        workers: Anzahl Prozesse (0 = alle Kerne, 1 = ohne Pool)
+
+        Returns: Iterator über (Startindex, Ergebnisse wie classify_batch) je Block
+        """
+        chunks = [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(chunks) <= 1:
+            for n, chunk in enumerate(chunks):
+                yield n * chunk_size, self.classify_batch(chunk, use_ai)
+            return
+        workers = min(workers, len(chunks))
+        in_flight = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for n, chunk in enumerate(chunks):
+                # Nur die gekürzten Score-Texte gehen an die Worker, nicht die ganzen Untertitel
+                texts = [self._score_text(title, subtitles) for title, subtitles in chunk]
+                in_flight.append((n, chunk, pool.submit(_score_texts_worker, texts)))
+                if len(in_flight) < 2 * workers:
+                    continue
+                m, done, future = in_flight.popleft()
+                yield m * chunk_size, self.classify_scored(done, future.result(), use_ai)
+            for m, done, future in in_flight:
+                yield m * chunk_size, self.classify_scored(done, future.result(), use_ai)
+
     def ai_classify(self, title: str, subtitles: Optional[str] = None) -> str:
         """
         Nutzt KI zur Klassifikation des Videos
@@ -101,7 +252,7 @@ class VideoFilter:
         }
         
         response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
+            OPENAI_API_URL,
             headers=headers,
             json=data,
             timeout=10
@@ -133,7 +284,7 @@ class VideoFilter:
         }
         
         response = requests.post(
-            "https://api.anthropic.com/v1/messages",
+            ANTHROPIC_API_URL,
             headers=headers,
             json=data,
             timeout=10
@@ -169,21 +320,37 @@ class VideoFilter:
         
         # Schritt 2: KI-Analyse für unsichere Fälle
         if use_ai and self.ai_available and AI_ANALYSIS_MIN_SCORE <= keyword_score <= AI_ANALYSIS_MAX_SCORE:
-            ai_result = self.ai_classify(title, subtitles)
-            
-            if ai_result == "RELEVANT":
-                # Boost score wenn KI sagt relevant
-                adjusted_score = min(keyword_score + 0.3, 1.0)
-                return True, adjusted_score, "ai"
-            elif ai_result == "IRRELEVANT":
-                return False, keyword_score, "ai"
-            else:
-                # Bei UNSURE: Nutze Keyword-Score
-                return keyword_score >= MIN_KEYWORD_SCORE, keyword_score, "mixed"
+            return self._decide_with_ai(title, subtitles, keyword_score)
         
         # Fallback: Nutze nur Keyword-Score
         return keyword_score >= MIN_KEYWORD_SCORE, keyword_score, "keywords"
 
+    def _decide_with_ai(self, title: str, subtitles: Optional[str], keyword_score: float) -> Tuple[bool, float, str]:
+        """KI-Entscheidung für einen Score im unsicheren Bereich"""
+        return self._apply_ai_answer(self.ai_classify(title, subtitles), keyword_score)
+
+    def _apply_ai_answer(self, ai_result: str, keyword_score: float) -> Tuple[bool, float, str]:
+        if ai_result == "RELEVANT":
+            # Boost score wenn KI sagt relevant
+            adjusted_score = min(keyword_score + 0.3, 1.0)
+            return True, adjusted_score, "ai"
+        elif ai_result == "IRRELEVANT":
+            return False, keyword_score, "ai"
+        else:
+            # Bei UNSURE: Nutze Keyword-Score
+            return keyword_score >= MIN_KEYWORD_SCORE, keyword_score, "mixed"
+
+
+_worker_filter: Optional[VideoFilter] = None
+
+
+def _score_texts_worker(texts: List[str]) -> np.ndarray:
+    """Läuft im Pool-Prozess; der Automat wird pro Prozess nur einmal gebaut"""
+    global _worker_filter
+    if _worker_filter is None:
+        _worker_filter = VideoFilter()
+    return _worker_filter.score_texts(texts)
+
 
 def test_filter():
     """Test-Funktion zum Prüfen des Filters"""
@@ -0,0 +1,95 @@
+"""
+Kanonische YouTube-Video-IDs
+Ein Video taucht unter vielen URLs auf (watch?v=...&t=72s&pp=..., youtu.be,
+shorts, embed). Alle Stufen - Abgleich, Cache, Upserts - arbeiten deshalb mit
+der 11-stelligen ID bzw. der daraus gebildeten kanonischen URL.
+"""
+import re
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+VIDEO_ID_RE = re.compile(r"[A-Za-z0-9_-]{11}\Z")
+
+YOUTUBE_HOSTS = {
+    "youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com",
+    "youtube-nocookie.com", "www.youtube-nocookie.com",
+}
+SHORT_HOSTS = {"youtu.be", "www.youtu.be"}
+# Pfad-Präfixe, hinter denen direkt die ID steht
+ID_PATH_PREFIXES = ("shorts", "embed", "live", "v", "e")
+
+
+def is_video_id(value: str) -> bool:
+    return bool(value) and VIDEO_ID_RE.match(value) is not None
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """
+    Extrahiert die ID aus watch-, youtu.be-, shorts-, embed- und live-URLs
+    (auch ohne Schema); eine nackte 11-stellige ID wird unverändert akzeptiert.
+
+    Returns: ID oder None, wenn die URL kein Video bezeichnet
+    """
+    if not url:
+        return None
+    url = url.strip()
+    if is_video_id(url):
+        return url
+    if "://" not in url:
+        url = "https://" + url
+    try:
+        parsed = urlparse(url)
+    except ValueError:
+        return None
+    host = (parsed.hostname or "").lower()
+    parts = [p for p in parsed.path.split("/") if p]
+
+    candidate = None
+    if host in SHORT_HOSTS:
+        candidate = parts[0] if parts else None
+    elif host in YOUTUBE_HOSTS:
+        if parts[:1] == ["watch"] or not parts:
+            candidate = parse_qs(parsed.query).get("v", [None])[0]
+        elif len(parts) >= 2 and parts[0] in ID_PATH_PREFIXES:
+            candidate = parts[1]
+    return candidate if candidate and is_video_id(candidate) else None
+
+
+# --- Kompakte Kodierung: 11 Zeichen base64url -> 64 Bit ---
+# Die ersten 10 Zeichen tragen je 6 Bit; beim letzten Zeichen sind die unteren
+# 2 Bit immer 0 (nur 16 mögliche Werte), es bleiben 4 Bit -> 10*6 + 4 = 64.
+ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+_INDEX = {c: i for i, c in enumerate(ALPHABET)}
+
+
+def is_encodable(video_id: str) -> bool:
+    return is_video_id(video_id) and _INDEX[video_id[10]] & 3 == 0
+
+
+def encode_video_id(video_id: str) -> int:
+    """Returns: ID als vorzeichenlose 64-Bit-Zahl (ValueError, wenn keine gültige ID)"""
+    if not is_encodable(video_id):
+        raise ValueError(f"Keine kodierbare Video-ID: {video_id!r}")
+    value = 0
+    for c in video_id[:10]:
+        value = (value << 6) | _INDEX[c]
+    return (value << 4) | (_INDEX[video_id[10]] >> 2)
+
+
+def decode_video_id(value: int) -> str:
+    chars = [ALPHABET[(value & 0xF) << 2]]
+    value >>= 4
+    for _ in range(10):
+        chars.append(ALPHABET[value & 0x3F])
+        value >>= 6
+    return "".join(reversed(chars))
+
+
+def canonical_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def canonicalize_url(url: str) -> Optional[str]:
+    """Returns: kanonische watch-URL oder None, wenn keine Video-ID erkennbar ist"""
+    video_id = extract_video_id(url)
+    return canonical_url(video_id) if video_id else None
@@ -0,0 +1,118 @@
+"""
+Kompakte Menge von Video-IDs
+Speichert IDs als sortiertes uint64-Array (8 Byte pro ID statt >100 Byte pro
+URL-String im Python-set). Mitgliedschaft für ganze Batches läuft vektorisiert
+per np.searchsorted, neue IDs werden per np.union1d eingemischt.
+"""
+import os
+import tempfile
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import numpy as np
+
+from .video_id import ALPHABET, is_encodable, decode_video_id
+
+# ASCII -> 6-Bit-Wert; 255 markiert ungültige Zeichen
+_LOOKUP = np.full(256, 255, dtype=np.uint8)
+for _i, _c in enumerate(ALPHABET):
+    _LOOKUP[ord(_c)] = _i
+
+
+def encode_video_ids(video_ids: List[str]) -> np.ndarray:
+    """
+    Kodiert viele IDs auf einmal (gleiche Bitbelegung wie encode_video_id).
+
+    Returns: uint64-Array in Eingabereihenfolge (ValueError bei ungültigen IDs)
+    """
+    if not video_ids:
+        return np.empty(0, dtype=np.uint64)
+    try:
+        raw = "".join(video_ids).encode("ascii")
+    except UnicodeEncodeError:
+        raise ValueError("Ungültige Video-ID im Batch")
+    if len(raw) != 11 * len(video_ids):
+        raise ValueError("Video-IDs müssen genau 11 Zeichen lang sein")
+    digits = _LOOKUP[np.frombuffer(raw, dtype=np.uint8).reshape(-1, 11)].astype(np.uint64)
+    if (digits == 255).any() or (digits[:, 10] & np.uint64(3)).any():
+        raise ValueError("Ungültige Video-ID im Batch")
+    values = np.zeros(len(video_ids), dtype=np.uint64)
+    for col in range(10):
+        values = (values << np.uint64(6)) | digits[:, col]
+    return (values << np.uint64(4)) | (digits[:, 10] >> np.uint64(2))
+
+
+class VideoIdSet:
+    __slots__ = ("values",)
+
+    def __init__(self, values: Optional[np.ndarray] = None):
+        # Invariante: sortiert und eindeutig
+        self.values = np.unique(values.astype(np.uint64, copy=False)) if values is not None \
+            else np.empty(0, dtype=np.uint64)
+
+    @classmethod
+    def from_ids(cls, video_ids: Iterable[str]) -> "VideoIdSet":
+        return cls(encode_video_ids(list(video_ids)))
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __contains__(self, video_id: str) -> bool:
+        if not is_encodable(video_id):
+            return False
+        return bool(self.contains_many([video_id])[0])
+
+    def __iter__(self):
+        return (decode_video_id(int(v)) for v in self.values)
+
+    @property
+    def nbytes(self) -> int:
+        return self.values.nbytes
+
+    def _contains_encoded(self, encoded: np.ndarray) -> np.ndarray:
+        if not len(self.values):
+            return np.zeros(len(encoded), dtype=bool)
+        pos = np.searchsorted(self.values, encoded)
+        pos[pos == len(self.values)] = 0
+        return self.values[pos] == encoded
+
+    def contains_many(self, video_ids: List[str]) -> np.ndarray:
+        """Returns: bool-Array, ob jede ID (in Eingabereihenfolge) enthalten ist"""
+        return self._contains_encoded(encode_video_ids(list(video_ids)))
+
+    def missing(self, video_ids: List[str]) -> List[str]:
+        """Batch-Diff: Returns: die IDs, die noch nicht enthalten sind (Reihenfolge bleibt)"""
+        video_ids = list(video_ids)
+        known = self.contains_many(video_ids)
+        return [vid for vid, hit in zip(video_ids, known) if not hit]
+
+    def add_many(self, video_ids: Iterable[str]):
+        """Mischt einen Batch neuer IDs ein (ein union1d statt vieler Einzel-Inserts)"""
+        self.merge_encoded(encode_video_ids(list(video_ids)))
+
+    def merge_encoded(self, encoded: np.ndarray):
+        if len(encoded):
+            self.values = np.union1d(self.values, encoded.astype(np.uint64, copy=False))
+
+    # --- Persistenz (rohe Little-Endian-uint64) ---
+    def save(self, path: Path):
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.values.astype("<u8", copy=False).tobytes())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path: Path) -> "VideoIdSet":
+        data = np.fromfile(path, dtype="<u8").astype(np.uint64)
+        result = cls()
+        result.values = data  # wurde sortiert gespeichert
+        return result
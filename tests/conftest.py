@@ -1,13 +1,24 @@
 """
 pytest Configuration and Fixtures
 ==================================
-Gemeinsame Test-Konfiguration und wiederverwendbare Fixtures.
+Gemeinsame Test-Konfiguration und wiederverwendbare Fixtures, u.a. ein
+lokaler HTTP-Stub mit optionalem PostgREST-Verhalten für eine Tabelle.
 """
 import pytest
 import os
+import re
+import sys
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlparse, parse_qs
 from dotenv import load_dotenv
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.supabase_client import SupabaseClient
+
 @pytest.fixture(scope="session", autouse=True)
 def load_test_env():
     """Lädt .env für alle Tests"""
@@ -55,3 +66,182 @@ def sample_youtube_urls():
         "https://www.youtube.com/watch?v=9bZkp7q19f0",
         "https://youtu.be/jNQXAC9IVRw",
     ]
+
+
+# --- Lokaler HTTP-Stub ---
+class StubRequest(NamedTuple):
+    method: str
+    path: str
+    query: Dict[str, str]   # erster Wert je Parameter
+    headers: Dict[str, str]
+    body: bytes
+    port: int               # Client-Port, gleich bei wiederverwendeter Verbindung
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-Alive
+
+    def _handle(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        request = StubRequest(self.command, self.path, query, dict(self.headers), body, self.client_address[1])
+        server = self.server
+        with server.lock:
+            server.requests.append(request)
+            forced = server.statuses.pop(0) if server.statuses else None
+        if forced is not None:
+            status, headers, payload = forced, {}, b"[]"
+        else:
+            status, headers, payload = server.responder(request)
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(payload) if self.command != "HEAD" else 0))
+        self.end_headers()
+        if payload and self.command != "HEAD":
+            self.wfile.write(payload)
+
+    do_GET = do_HEAD = do_POST = do_PATCH = do_DELETE = _handle
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), _StubHandler)
+        self.lock = threading.Lock()
+        self.requests: List[StubRequest] = []
+        self.statuses: List[int] = []      # erzwungene Status-Codes für die nächsten Requests
+        self.responder = lambda request: (200, {}, b"[]")
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+@pytest.fixture
+def http_stub():
+    """HTTP-Stub: protokolliert Requests (StubRequest); Antworten über responder(request) -> (status, headers, body)"""
+    server = StubServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+# --- PostgREST-Verhalten für eine Tabelle ---
+def _split_top(text: str) -> List[str]:
+    """Trennt "a,and(b,c),d" an Kommas außerhalb von Klammern und Anführungszeichen"""
+    parts, depth, quoted, current = [], 0, False, ""
+    for c in text:
+        if c == '"':
+            quoted = not quoted
+        elif not quoted and c == "(":
+            depth += 1
+        elif not quoted and c == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and c == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += c
+    return parts + [current] if current else parts
+
+
+def _unquote(value: str) -> str:
+    return value[1:-1].replace('\\"', '"').replace("\\\\", "\\") if value[:1] == '"' else value
+
+
+def _compare(cell, value: str):
+    if isinstance(cell, (int, float)) and not isinstance(cell, bool):
+        return cell, float(value)
+    return str(cell), value
+
+
+def _matches(row: dict, column: str, cond: str) -> bool:
+    op, _, value = cond.partition(".")
+    if op == "not":
+        return not _matches(row, column, value)
+    cell = row.get(column)
+    if op == "is":
+        return cell is {"null": None, "true": True, "false": False}[value]
+    if cell is None:
+        return False
+    if op == "in":
+        return str(cell) in {_unquote(v) for v in _split_top(value[1:-1])}
+    if op == "like":
+        pattern = "".join(".*" if c in "*%" else "." if c == "_" else re.escape(c) for c in _unquote(value))
+        return re.fullmatch(pattern, str(cell), re.S) is not None
+    value = _unquote(value)
+    if op == "eq":
+        return str(cell).lower() == value.lower()
+    left, right = _compare(cell, value)
+    return {"gt": left > right, "gte": left >= right, "lt": left < right, "lte": left <= right}[op]
+
+
+def _matches_logic(row: dict, term: str) -> bool:
+    for logic, combine in (("and(", all), ("or(", any)):
+        if term.startswith(logic):
+            return combine(_matches_logic(row, t) for t in _split_top(term[len(logic):-1]))
+    column, _, cond = term.partition(".")
+    return _matches(row, column, cond)
+
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict"}
+
+
+def postgrest_filter(rows: List[dict], query: Dict[str, str]) -> List[dict]:
+    """Wendet PostgREST-Filter (eq, gt, is, in, like, not, or/and) und order an"""
+    for column, cond in query.items():
+        if column == "or":
+            rows = [r for r in rows if any(_matches_logic(r, t) for t in _split_top(cond[1:-1]))]
+        elif column not in RESERVED_PARAMS:
+            rows = [r for r in rows if _matches(r, column, cond)]
+    for part in reversed(query.get("order", "").split(",")):
+        if part:
+            column, _, direction = part.partition(".")
+            rows = sorted(rows, key=lambda r: r[column], reverse=direction == "desc")
+    return rows
+
+
+def postgrest_responder(server: StubServer):
+    """GET mit Filtern/limit (zusätzlich auf server.max_rows gekürzt), HEAD/DELETE mit Content-Range"""
+
+    def respond(request: StubRequest):
+        with server.lock:
+            rows = postgrest_filter(list(server.rows), request.query)
+            if request.method == "DELETE":
+                server.rows = [r for r in server.rows if not any(r is m for m in rows)]
+        if request.method in ("HEAD", "DELETE"):
+            return (204 if request.method == "DELETE" else 200), {"Content-Range": f"*/{len(rows)}"}, b""
+        if request.method != "GET":
+            return 201, {}, b""
+        rows = rows[:min(int(request.query.get("limit", len(rows))), server.max_rows)]
+        select = request.query.get("select", "*")
+        if select != "*":
+            rows = [{c: r.get(c) for c in select.split(",")} for r in rows]
+        return 200, {"Content-Type": "application/json"}, json.dumps(rows).encode()
+
+    return respond
+
+
+@pytest.fixture
+def table(http_stub):
+    """PostgREST-Stub für eine Tabelle: Zeilen in table.rows, Requests in table.requests"""
+    http_stub.rows = []
+    http_stub.max_rows = 1000
+    http_stub.responder = postgrest_responder(http_stub)
+    return http_stub
+
+
+@pytest.fixture
+def client(table):
+    """SupabaseClient gegen den Tabellen-Stub"""
+    return SupabaseClient(table.url, "key")
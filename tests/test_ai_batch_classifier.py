@@ -0,0 +1,93 @@
+"""
+Test KI-Batch-Klassifikation
+============================
+Testet Batch-Anfragen, Parallelität und den Einzel-Fallback gegen einen lokalen
+Stub-Server im OpenAI-Format.
+"""
+import re
+import sys
+import json
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import src.video_filter as video_filter
+from src.ai_batch_classifier import parse_answers
+
+
+@pytest.fixture
+def stub(http_stub, monkeypatch):
+    """OpenAI-Stub: RELEVANT für Titel mit "python"; Batches optional als kaputtes JSON"""
+    http_stub.broken_batches = False
+
+    def respond(request):
+        prompt = request.json()["messages"][-1]["content"]
+        titles = re.findall(r"^Titel: (.*)$", prompt, re.M)
+        answers = ["RELEVANT" if "python" in t.lower() else "IRRELEVANT" for t in titles]
+        if '"answer"' in prompt:
+            content = "kein json" if http_stub.broken_batches else json.dumps(
+                [{"id": n, "answer": a} for n, a in reversed(list(enumerate(answers, 1)))])
+        else:
+            content = answers[0]
+        payload = json.dumps({"choices": [{"message": {"content": content}}]}).encode()
+        return 200, {"Content-Type": "application/json"}, payload
+
+    http_stub.responder = respond
+    monkeypatch.setattr(video_filter, "PREFERRED_AI_API", "openai")
+    monkeypatch.setattr(video_filter, "OPENAI_API_KEY", "test")
+    monkeypatch.setattr(video_filter, "OPENAI_API_URL", f"{http_stub.url}/v1/chat/completions")
+    monkeypatch.setattr(video_filter, "AI_BATCH_SIZE", 4)
+    monkeypatch.setattr(video_filter, "AI_BATCH_CONCURRENCY", 2)
+    return http_stub
+
+
+def _sizes(stub):
+    """Returns: Anzahl Videos je Anfrage"""
+    return [len(re.findall(r"^Titel: ", r.json()["messages"][-1]["content"], re.M)) for r in stub.requests]
+
+
+ITEMS = [(f"Python Folge {n}" if n % 2 else f"Kochen Folge {n}", "untertitel") for n in range(10)]
+EXPECTED = ["RELEVANT" if n % 2 else "IRRELEVANT" for n in range(10)]
+
+
+def test_parse_answers():
+    """Testet Zuordnung über id und Ablehnung unvollständiger Antworten"""
+    text = 'Hier: [{"id": 2, "answer": "unsure"}, {"id": 1, "answer": "RELEVANT"}]'
+    assert parse_answers(text, 2) == ["RELEVANT", "UNSURE"]
+    assert parse_answers('[{"id": 1, "answer": "RELEVANT"}]', 2) is None
+    assert parse_answers('[{"id": 1, "answer": "JA"}]', 1) is None
+    assert parse_answers("RELEVANT", 1) is None
+
+
+def test_batches_in_order(stub):
+    """Testet ob 10 Videos in 3 Anfragen klassifiziert werden, Ergebnis in Eingabereihenfolge"""
+    vf = video_filter.VideoFilter()
+    assert vf.ai_classify_many(ITEMS) == EXPECTED
+    assert sorted(_sizes(stub)) == [2, 4, 4]
+    assert vf.ai_batch.stats == {"requests": 3, "fallbacks": 0, "throttled": 0}
+
+
+def test_unparseable_batch_falls_back_to_single_calls(stub):
+    """Testet ob unlesbare Batch-Antworten einzeln nachklassifiziert werden"""
+    stub.broken_batches = True
+    vf = video_filter.VideoFilter()
+    assert vf.ai_classify_many(ITEMS) == EXPECTED
+    assert _sizes(stub).count(1) == 10
+    assert vf.ai_batch.stats == {"requests": 3, "fallbacks": 3, "throttled": 0}
+
+
+def test_rate_limited_batch_backs_off_instead_of_fanning_out(stub):
+    """Testet ob ein Batch bei 429 wartet und wiederholt, statt Einzelaufrufe zu starten"""
+    vf = video_filter.VideoFilter()
+    vf.ai_batch.backoff = 0.01
+    stub.statuses = [429, 429]
+    assert vf.ai_classify_many(ITEMS[:4]) == EXPECTED[:4]
+    assert _sizes(stub)[-1] == 4 and len(stub.requests) == 3
+    assert vf.ai_batch.stats == {"requests": 3, "fallbacks": 0, "throttled": 0}
+
+    stub.requests.clear()
+    stub.statuses = [429] * (vf.ai_batch.retries + 1)
+    assert vf.ai_classify_many(ITEMS[:4]) == ["UNSURE"] * 4
+    assert len(stub.requests) == vf.ai_batch.retries + 1
+    assert vf.ai_batch.stats["throttled"] == 1 and vf.ai_batch.stats["fallbacks"] == 0
@@ -0,0 +1,114 @@
+"""
+Test Batch-Pipeline
+===================
+Testet die asyncio-Pipeline aus batch_ytsubs_to_supabase mit gestubbtem Abruf
+und Writer: parallele Cleaner, vollständige Ausgabe, kaputte Spuren und sauberes Beenden.
+"""
+import sys
+import time
+import asyncio
+import threading
+import xml.etree.ElementTree as ET
+from argparse import Namespace
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import batch_ytsubs_to_supabase as batch
+
+
+class _FakeWriter:
+    def __init__(self):
+        self.rows = []
+        self.closed = False
+        self.stats = {"ok": 0}
+
+    def add(self, row):
+        assert not self.closed
+        self.rows.append(row)
+        self.stats["ok"] += 1
+
+    def close(self):
+        self.closed = True
+
+    def summary_line(self):
+        return f"{self.stats['ok']} Zeilen"
+
+
+def _args(**kwargs):
+    defaults = dict(lang="de", source="test", priority=0, fetchers=3, cleaners=3, page_size=4,
+                    batch_size=5, batch_bytes=1 << 20, batch_interval=0)
+    defaults.update(kwargs)
+    return Namespace(**defaults)
+
+
+def test_pipeline_cleans_in_parallel_and_shuts_down(monkeypatch):
+    """Testet ob --cleaners N wirklich N Spuren gleichzeitig bereinigt und alle Zeilen geschrieben werden"""
+    urls = [f"https://www.youtube.com/watch?v=vid{n:08d}" for n in range(10)]
+    pages = [[{"id": n, "url": u} for n, u in enumerate(urls[i:i + 4], i)] for i in range(0, 10, 4)]
+    writer = _FakeWriter()
+    lock = threading.Lock()
+    active = {"now": 0, "max": 0}
+
+    def slow_clean(raw, code):
+        with lock:
+            active["now"] += 1
+            active["max"] = max(active["max"], active["now"])
+        time.sleep(0.05)
+        with lock:
+            active["now"] -= 1
+        return raw.upper(), 0
+
+    monkeypatch.setattr(batch, "iter_unprocessed_pages", lambda page_size: iter(pages))
+    monkeypatch.setattr(batch, "fetch_raw", lambda url, lang: ("t", "de", None if url.endswith("3") else url))
+    monkeypatch.setattr(batch, "clean_raw", slow_clean)
+    monkeypatch.setattr(batch, "make_writer", lambda *a: writer)
+    # Threads statt Prozesse, damit der Stub im Pool sichtbar ist
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", ThreadPoolExecutor)
+
+    stats = asyncio.run(asyncio.wait_for(batch.run_pipeline(_args()), timeout=10))
+
+    assert stats["read"] == 10 and stats["ok"] == 10
+    assert writer.closed
+    assert active["max"] > 1
+    by_url = {row["url"]: row for row in writer.rows}
+    assert sorted(by_url) == sorted(urls)
+    assert by_url[urls[3]]["processed"] is False
+    assert by_url[urls[0]]["subtitles"] == urls[0].upper()
+
+
+def test_pipeline_single_cleaner_and_empty_backlog(monkeypatch):
+    """Testet ob die Pipeline auch ohne Zeilen und mit einem Cleaner sauber endet"""
+    writer = _FakeWriter()
+    monkeypatch.setattr(batch, "iter_unprocessed_pages", lambda page_size: iter([]))
+    monkeypatch.setattr(batch, "make_writer", lambda *a: writer)
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", ThreadPoolExecutor)
+
+    stats = asyncio.run(asyncio.wait_for(batch.run_pipeline(_args(fetchers=2, cleaners=1)), timeout=10))
+
+    assert stats["read"] == 0 and writer.rows == [] and writer.closed
+
+
+def test_pipeline_survives_broken_track(monkeypatch):
+    """Testet ob eine nicht parsebare Spur nur ihre Zeile betrifft (processed=False) und die Pipeline weiterläuft"""
+    urls = [f"https://www.youtube.com/watch?v=vid{n:08d}" for n in range(4)]
+    writer = _FakeWriter()
+
+    def clean(raw, code):
+        if raw.endswith("1"):
+            raise ET.ParseError("not well-formed")
+        return raw, 0
+
+    monkeypatch.setattr(batch, "iter_unprocessed_pages", lambda page_size: iter([[{"id": n, "url": u} for n, u in enumerate(urls)]]))
+    monkeypatch.setattr(batch, "fetch_raw", lambda url, lang: ("t", "de", url))
+    monkeypatch.setattr(batch, "clean_raw", clean)
+    monkeypatch.setattr(batch, "make_writer", lambda *a: writer)
+    monkeypatch.setattr(batch, "ProcessPoolExecutor", ThreadPoolExecutor)
+
+    stats = asyncio.run(asyncio.wait_for(batch.run_pipeline(_args(cleaners=2)), timeout=10))
+
+    assert stats["read"] == 4 and writer.closed
+    by_url = {row["url"]: row for row in writer.rows}
+    assert sorted(by_url) == urls
+    assert by_url[urls[1]]["processed"] is False and "subtitles" not in by_url[urls[1]]
+    assert all(by_url[u]["processed"] for u in urls if u != urls[1])
@@ -0,0 +1,87 @@
+"""
+Test Bloom-Filter-Vorfilter
+===========================
+Testet den Bloom-Filter (keine falschen "sicher neu", Fehlalarmrate nahe am
+Ziel) sowie Aufbau, Nachführen und Persistenz des Vorfilters.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.bloom_filter import BloomFilter, BloomPrefilter
+
+
+def _video_id(i):
+    return f"vid{i:07d}A"
+
+
+def _row(i):
+    return {"id": i, "url": f"https://www.youtube.com/watch?v={_video_id(i)}"}
+
+
+@pytest.fixture
+def table(table):
+    table.rows = [_row(i) for i in range(1, 6)]
+    return table
+
+
+def test_no_false_negatives_and_fp_rate_near_target():
+    """Testet ob eingetragene Schlüssel immer getroffen werden und die Fehlalarmrate stimmt"""
+    bloom = BloomFilter(5000, fp_rate=0.01)
+    known = [f"key-{i}" for i in range(5000)]
+    bloom.add_many(known)
+    assert bloom.might_contain_many(known).all()
+    rate = bloom.might_contain_many([f"other-{i}" for i in range(20000)]).mean()
+    assert rate < 0.02
+    assert abs(bloom.estimated_fp_rate() - 0.01) < 0.005
+
+
+def test_prepare_split_and_catch_up(table, client, tmp_path):
+    """Testet Neuaufbau, Split nach sicher neu/vielleicht und das Nachholen neuer Zeilen"""
+    prefilter = BloomPrefilter(tmp_path / "known.bloom", page_size=2)
+    prefilter.prepare(client, "youtube_urls")
+    assert prefilter.stats["mode"] == "neu aufgebaut" and prefilter.max_id == 5
+
+    # URL-Variante eines bekannten Videos ist "vielleicht", ein neues Video "sicher neu"
+    urls = [f"https://youtu.be/{_video_id(2)}?t=3", f"https://www.youtube.com/watch?v={_video_id(99)}"]
+    definitely_new, maybe = prefilter.split(urls)
+    assert maybe == urls[:1]
+    assert definitely_new == urls[1:]
+
+    # Anderes Skript fügt eine Zeile ein: der nächste Lauf lädt den Filter und holt nur sie nach
+    table.rows.append(_row(6))
+    table.requests.clear()
+    reloaded = BloomPrefilter(tmp_path / "known.bloom", page_size=2)
+    reloaded.prepare(client, "youtube_urls")
+    assert reloaded.stats["mode"] == "geladen" and reloaded.stats["caught_up"] == 1
+    assert table.requests[0].query["id"] == "gt.5"
+    assert reloaded.split([_row(6)["url"]]) == ([], [_row(6)["url"]])
+    assert "1.00%" in reloaded.summary_line()
+
+
+def test_rebuild_on_changed_fp_rate(client, tmp_path):
+    """Testet ob eine andere Ziel-Fehlalarmrate den Filter neu aufbaut"""
+    BloomPrefilter(tmp_path / "known.bloom").prepare(client, "youtube_urls")
+    stricter = BloomPrefilter(tmp_path / "known.bloom", fp_rate=0.001)
+    assert stricter.needs_rebuild()
+    stricter.prepare(client, "youtube_urls")
+    assert stricter.filter.fp_rate == 0.001 and stricter.filter.count == 5
+
+
+def test_resolve_finds_legacy_urls_by_video_id(table, client, tmp_path):
+    """Testet ob ein Video unter einer alten, nicht kanonischen URL als bekannt erkannt wird"""
+    table.rows.append({"id": 6, "url": f"https://youtu.be/{_video_id(6)}?t=42"})
+    prefilter = BloomPrefilter(tmp_path / "known.bloom")
+    prefilter.prepare(client, "youtube_urls")
+    urls = [_row(2)["url"], f"https://www.youtube.com/watch?v={_video_id(6)}",
+            f"https://www.youtube.com/watch?v={_video_id(7)}"]
+    table.requests.clear()
+
+    assert prefilter.resolve(client, "youtube_urls", urls) == set(urls[:2])
+    assert prefilter.stats["false_positives"] == 1
+    # Exakter in.()-Abgleich zuerst, danach nur die zwei offenen IDs per like
+    assert len(table.requests) == 2
+    assert "in." in table.requests[0].query["url"]
+    assert table.requests[1].query["or"].count(".like.") == 2
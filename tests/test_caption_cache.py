@@ -0,0 +1,70 @@
+"""
+Test Caption Cache
+==================
+Testet den lokalen Caption-Cache (TTL, LRU-Verdrängung, Integrität).
+"""
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.caption_cache import CaptionCache
+
+
+def test_roundtrip(tmp_path):
+    """Testet ob Meta-Daten und Spuren wieder gelesen werden"""
+    cache = CaptionCache(tmp_path)
+    cache.put_meta("dQw4w9WgXcQ", "Titel", ["de", "a.en"])
+    cache.put_track("dQw4w9WgXcQ", "a.en", "<timedtext>Ü</timedtext>")
+
+    meta = cache.get_meta("dQw4w9WgXcQ")
+    assert meta["title"] == "Titel"
+    assert meta["tracks"] == ["de", "a.en"]
+    assert cache.get_track("dQw4w9WgXcQ", "a.en") == "<timedtext>Ü</timedtext>"
+    assert cache.get_track("dQw4w9WgXcQ", "de") is None
+
+
+def test_expired_entries_are_misses(tmp_path):
+    """Testet ob abgelaufene Einträge nicht mehr geliefert werden"""
+    cache = CaptionCache(tmp_path, ttl_seconds=0)
+    cache.put_track("dQw4w9WgXcQ", "de", "x")
+    time.sleep(0.01)
+    assert cache.get_track("dQw4w9WgXcQ", "de") is None
+
+
+def test_corrupt_track_is_discarded(tmp_path):
+    """Testet ob beschädigte Einträge (Checksumme) verworfen werden"""
+    cache = CaptionCache(tmp_path)
+    cache.put_track("dQw4w9WgXcQ", "de", "original")
+    path = tmp_path / "dQ" / "dQw4w9WgXcQ" / "de.json"
+    path.write_text(path.read_text(encoding="utf-8").replace("original", "kaputt"), encoding="utf-8")
+
+    assert cache.get_track("dQw4w9WgXcQ", "de") is None
+    assert not path.exists()
+
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    """Testet ob bei Überschreitung der Größe die ältesten Einträge verdrängt werden"""
+    cache = CaptionCache(tmp_path, max_bytes=10_000)
+    for i in range(5):
+        cache.put_track(f"video{i:06d}", "de", "x" * 1000)
+    # video000000 zuletzt benutzt -> darf nicht verdrängt werden
+    old = time.time() - 100
+    for i in range(1, 5):
+        os.utime(tmp_path / "vi" / f"video{i:06d}" / "de.json", (old, old))
+
+    for i in range(5, 12):
+        cache.put_track(f"video{i:06d}", "de", "x" * 1000)
+
+    assert cache.total_size() <= 10_000
+    assert cache.get_track("video000000", "de") is not None
+    assert cache.get_track("video000001", "de") is None
+
+
+def test_eviction_skipped_while_locked(tmp_path):
+    """Testet ob ein fremder Lock die Verdrängung überspringt"""
+    cache = CaptionCache(tmp_path, max_bytes=1)
+    (tmp_path / ".evict.lock").write_text("")
+    cache.put_track("dQw4w9WgXcQ", "de", "x")
+    assert cache.get_track("dQw4w9WgXcQ", "de") == "x"
@@ -0,0 +1,97 @@
+"""
+Test Caption-Fetcher
+====================
+Testet den Abruf über mehrere Clients mit gestubbten Versuchen statt pytubefix:
+Verbuchen von Treffern und Videos ohne Untertitel, Hedge-Verzögerung und Deadline.
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.caption_fetcher import AttemptResult, CaptionFetcher
+from src.client_stats import ClientSelector
+from src.rate_limiter import OK
+
+
+def stub_clients(monkeypatch, behaviour):
+    """
+    Ersetzt den pytubefix-Versuch: behaviour = {Client: (Verzögerung, xml oder None oder Exception)}
+    Returns: Liste der gestarteten Clients
+    """
+    started = []
+
+    def attempt(client, url, lang, cancel, results, permit):
+        started.append(client)
+        delay, outcome = behaviour[client]
+        cancel.wait(delay)
+        if isinstance(outcome, Exception):
+            results.put(AttemptResult(client, None, [], None, None, outcome, delay))
+        else:
+            codes = ["de"] if outcome else []
+            results.put(AttemptResult(client, "Titel", codes, "de" if outcome else None, outcome, None, delay))
+        if permit is not None:
+            permit.release(OK)
+
+    monkeypatch.setattr(CaptionFetcher, "_attempt", staticmethod(attempt))
+    return started
+
+
+def _fetcher(**kwargs):
+    selector = ClientSelector(("ANDROID", "WEB"), explore=0.0)
+    return CaptionFetcher(clients=("ANDROID", "WEB"), selector=selector, **kwargs)
+
+
+def test_video_without_captions_is_not_a_miss(monkeypatch):
+    """Testet ob 'keine Untertitel' von allen Clients keinen Client schlechter stellt"""
+    stub_clients(monkeypatch, {"ANDROID": (0, None), "WEB": (0, None)})
+    fetcher = _fetcher(deadline=5, hedge_delay=5)
+    assert fetcher.fetch_track("https://www.youtube.com/watch?v=aaaaaaaaaaa", "de") == (
+        "https://www.youtube.com/watch?v=aaaaaaaaaaa", None, None)
+    assert all(s.count == 0 for s in fetcher.selector.stats.values())
+
+
+def test_empty_answer_counts_as_miss_when_other_client_finds_track(monkeypatch):
+    """Testet ob ein Client ohne Spur als Fehlgriff zählt, wenn der andere eine Spur liefert"""
+    stub_clients(monkeypatch, {"ANDROID": (0, None), "WEB": (0, "<xml/>")})
+    fetcher = _fetcher(deadline=5, hedge_delay=5)
+    assert fetcher.fetch_track("https://www.youtube.com/watch?v=aaaaaaaaaaa", "de") == ("Titel", "de", "<xml/>")
+    assert [ok for ok, _, _ in fetcher.selector.stats["ANDROID"].samples] == [False]
+    assert [ok for ok, _, _ in fetcher.selector.stats["WEB"].samples] == [True]
+
+
+def test_hedge_starts_after_delay_and_loser_is_recorded(monkeypatch):
+    """Testet ob der zweite Client erst nach hedge_delay startet und der Verlierer verbucht wird"""
+    started = stub_clients(monkeypatch, {"ANDROID": (2, "<langsam/>"), "WEB": (0.05, "<xml/>")})
+    fetcher = _fetcher(deadline=5, hedge_delay=0.2)
+    t0 = time.monotonic()
+    assert fetcher.fetch_track("https://www.youtube.com/watch?v=aaaaaaaaaaa", "de") == ("Titel", "de", "<xml/>")
+    elapsed = time.monotonic() - t0
+    assert started == ["ANDROID", "WEB"]
+    assert 0.2 <= elapsed < 1
+    (ok, latency, timeout), = fetcher.selector.stats["ANDROID"].samples
+    assert not ok and not timeout and latency >= 0.2
+    assert [ok for ok, _, _ in fetcher.selector.stats["WEB"].samples] == [True]
+
+
+def test_failure_starts_next_client_without_hedge_delay(monkeypatch):
+    """Testet ob nach einem Fehler sofort der nächste Client startet"""
+    started = stub_clients(monkeypatch, {"ANDROID": (0, RuntimeError("kaputt")), "WEB": (0, "<xml/>")})
+    fetcher = _fetcher(deadline=5, hedge_delay=5)
+    t0 = time.monotonic()
+    assert fetcher.fetch_track("https://www.youtube.com/watch?v=aaaaaaaaaaa", "de") == ("Titel", "de", "<xml/>")
+    assert time.monotonic() - t0 < 1
+    assert started == ["ANDROID", "WEB"]
+    assert [ok for ok, _, _ in fetcher.selector.stats["ANDROID"].samples] == [False]
+
+
+def test_deadline_returns_none_and_records_timeouts(monkeypatch):
+    """Testet ob nach der Deadline (url, None, None) kommt und alle laufenden Clients als Timeout zählen"""
+    stub_clients(monkeypatch, {"ANDROID": (2, "<xml/>"), "WEB": (2, "<xml/>")})
+    fetcher = _fetcher(deadline=0.3, hedge_delay=0.1)
+    url = "https://www.youtube.com/watch?v=aaaaaaaaaaa"
+    t0 = time.monotonic()
+    assert fetcher.fetch_track(url, "de") == (url, None, None)
+    assert 0.3 <= time.monotonic() - t0 < 1
+    for client in ("ANDROID", "WEB"):
+        assert [timeout for _, _, timeout in fetcher.selector.stats[client].samples] == [True]
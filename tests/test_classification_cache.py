@@ -0,0 +1,91 @@
+"""
+Test Klassifizierungs-Cache
+===========================
+Testet Inhalts-Hash und Konfigurations-Fingerabdruck sowie Treffer und
+Persistenz des Caches.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.classification_cache import ClassificationCache
+from src.video_filter import VideoFilter
+
+
+def test_content_key_tracks_text_and_config():
+    """Testet ob Textänderungen und geänderte Keywords den Schlüssel ändern"""
+    vf = VideoFilter()
+    fp = vf.fingerprint()
+    key = vf.content_key("Python Tutorial", "we learn python", fp)
+    assert key == vf.content_key("Python Tutorial", "we learn python", vf.fingerprint())
+    assert key != vf.content_key("Python Tutorial", "we learn rust", fp)
+
+    vf.keywords = vf.keywords | {"zig"}
+    assert vf.fingerprint() != fp
+
+
+def test_cache_hit_miss_and_persistence(tmp_path):
+    """Testet Treffer nur bei gleichem Schlüssel und das Wiederladen aus der Datei"""
+    record = {"id": 7, "url": "https://www.youtube.com/watch?v=ICQRofCNocA"}
+    cache = ClassificationCache(tmp_path / "cache.json")
+    assert cache.get(record, "k1") is None
+    cache.put(record, "k1", (True, 0.7, "keywords"))
+    cache.save()
+
+    reloaded = ClassificationCache(tmp_path / "cache.json")
+    assert reloaded.get(record, "k1") == (True, 0.7, "keywords")
+    assert reloaded.get(record, "k2") is None
+    assert reloaded.stats == {"hits": 1, "misses": 1}
+    assert "1 unverändert" in reloaded.summary_line()
+
+
+@pytest.fixture
+def classifier(monkeypatch, tmp_path):
+    """RetrogradedClassifier mit Stub-Zugriffen statt Datenbank"""
+    monkeypatch.setenv("SUPABASE_SERVICE_KEY", "test")
+    monkeypatch.setenv("CLASSIFICATION_CACHE_PATH", str(tmp_path / "cache.json"))
+    monkeypatch.syspath_prepend(str(Path(__file__).parent.parent / "src"))
+    import retrograde_classifier
+    monkeypatch.setattr(retrograde_classifier, "SCORE_WORKERS", 1)
+
+    clf = retrograde_classifier.RetrogradedClassifier()
+    rows = [
+        {"id": 1, "url": "https://www.youtube.com/watch?v=aaaaaaaaaaa", "title": "Python Machine Learning Tutorial",
+         "classification": None},
+        {"id": 2, "url": "https://www.youtube.com/watch?v=bbbbbbbbbbb", "title": "My Morning Routine Vlog",
+         "classification": None},
+    ]
+    clf.calls = {"update": [], "delete": []}
+    monkeypatch.setattr(clf, "fetch_all_urls", lambda limit=None: [dict(r) for r in rows])
+    monkeypatch.setattr(clf, "update_classification",
+                        lambda url, c, score, method: clf.calls["update"].append((url, c)) or True)
+    monkeypatch.setattr(clf, "delete_irrelevant_url", lambda url: clf.calls["delete"].append(url) or True)
+    clf.rows = rows
+    return clf
+
+
+def test_auto_delete_after_cached_run(classifier):
+    """Testet ob zwischengespeichert irrelevante Zeilen bei auto_delete ohne Neubewertung gelöscht werden"""
+    classifier.batch_classify_and_clean(auto_delete=False, use_ai=False)
+    assert len(classifier.calls["update"]) == 2 and classifier.calls["delete"] == []
+    for row, (_, label) in zip(classifier.rows, classifier.calls["update"]):
+        row["classification"] = label
+    classifier.calls["update"].clear()
+
+    classifier.batch_classify_and_clean(auto_delete=True, use_ai=False)
+
+    assert classifier.calls["update"] == []
+    assert classifier.calls["delete"] == [classifier.rows[1]["url"]]
+    assert set(classifier.cache.entries) == {"1"}
+
+
+def test_limited_fetch_keeps_cache_entries(classifier):
+    """Testet ob ein begrenzter Lauf (Test-Lauf, max-rows) Einträge fehlender Zeilen nicht verwirft"""
+    classifier.batch_classify_and_clean(auto_delete=False, use_ai=False)
+    assert set(classifier.cache.entries) == {"1", "2"}
+
+    classifier.rows.pop(1)
+    classifier.batch_classify_and_clean(auto_delete=False, use_ai=False)
+    assert set(classifier.cache.entries) == {"1", "2"}
@@ -0,0 +1,68 @@
+"""
+Test Client-Statistik
+=====================
+Testet Trefferquote und Kosten je Client, die Reihenfolge samt Erkundung und
+das Speichern/Laden der Statistik.
+"""
+import sys
+import json
+import random
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.client_stats import ClientStats, ClientSelector
+
+
+def test_hit_rate_is_smoothed_and_windowed():
+    """Testet Laplace-Glättung und das gleitende Fenster"""
+    stats = ClientStats(window=4)
+    assert stats.hit_rate == 0.5 and stats.avg_latency == 1.0
+    for _ in range(4):
+        stats.record(False, 2.0)
+    assert stats.hit_rate == 1 / 6
+    for _ in range(4):
+        stats.record(True, 1.0, timeout=False)
+    assert stats.count == 4 and stats.hit_rate == 5 / 6
+    assert stats.expected_cost() == 1.0 / (5 / 6)
+
+
+def test_ranking_prefers_cheaper_client():
+    """Testet ob der Client mit geringeren erwarteten Kosten vorne steht"""
+    selector = ClientSelector(["ANDROID", "WEB"], explore=0.0)
+    assert selector.order() == ["ANDROID", "WEB"]
+    for _ in range(10):
+        selector.record("ANDROID", False, 1.0)
+        selector.record("WEB", True, 1.0)
+    assert selector.order() == ["WEB", "ANDROID"]
+
+
+def test_exploration_gives_blocked_client_another_chance():
+    """Testet ob ein abgeschlagener Client mit Anteil explore zuerst probiert wird und sich erholen kann"""
+    selector = ClientSelector(["ANDROID", "WEB"], explore=0.2, rng=random.Random(7))
+    for _ in range(20):
+        selector.record("ANDROID", False, 1.0)
+    firsts = [selector.order()[0] for _ in range(2000)]
+    assert 0.15 < firsts.count("ANDROID") / len(firsts) < 0.25
+    assert selector.probes == firsts.count("ANDROID")
+    assert selector.ranking() == ["WEB", "ANDROID"]
+
+    # Nach erfolgreichen Probe-Abrufen rückt der Client wieder nach vorne
+    for _ in range(50):
+        selector.record("ANDROID", True, 0.5)
+    assert selector.ranking() == ["ANDROID", "WEB"]
+
+
+def test_save_and_load(tmp_path):
+    """Testet die Persistenz inkl. älterer Dateien ohne Timeout-Flag"""
+    path = tmp_path / "client_stats.json"
+    selector = ClientSelector(["ANDROID", "WEB"], window=3, path=path, explore=0.0)
+    for ok in (True, False, True, True):
+        selector.record("WEB", ok, 1.0, timeout=not ok)
+    selector.save()
+    reloaded = ClientSelector(["ANDROID", "WEB"], window=3, path=path)
+    assert list(reloaded.stats["WEB"].samples) == [(False, 1.0, True), (True, 1.0, False), (True, 1.0, False)]
+
+    path.write_text(json.dumps({"clients": {"ANDROID": [[False, 2.0]], "UNKNOWN": [[True, 1.0]]}}))
+    legacy = ClientSelector(["ANDROID", "WEB"], path=path)
+    assert list(legacy.stats["ANDROID"].samples) == [(False, 2.0, False)]
+    assert "UNKNOWN" not in legacy.stats
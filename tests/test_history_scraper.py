@@ -0,0 +1,105 @@
+"""
+Test History-Scraper Worker-Pool
+================================
+Testet process_urls_parallel aus run_youtube_history_scraper mit gestubbtem
+Untertitel-Abruf und Upload: Zuordnung der Ausgabe, Fehler-Isolation und
+gleiches Ergebnis wie der sequentielle Pfad; dazu der Abgleich per Video-ID.
+"""
+import re
+import sys
+import time
+import threading
+from argparse import Namespace
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+import run_youtube_history_scraper as scraper
+
+URLS = [f"https://www.youtube.com/watch?v=vid{n:08d}" for n in range(8)]
+
+
+@pytest.fixture
+def uploads(monkeypatch):
+    """Stubbt Abruf (URL 3 wirft, URL 5 ohne Untertitel) und sammelt Uploads"""
+    uploaded = []
+    lock = threading.Lock()
+
+    def fetch_subtitles(url, lang):
+        # Spätere URLs werden schneller fertig, damit die Fertig-Reihenfolge abweicht
+        time.sleep(0.01 * (len(URLS) - URLS.index(url)))
+        if url == URLS[3]:
+            raise RuntimeError("pytubefix kaputt")
+        return f"Titel {url[-2:]}", None if url == URLS[5] else f"text {url}", 0
+
+    def upsert(url, title, text, source, priority):
+        with lock:
+            uploaded.append((url, title, text, source, priority))
+
+    monkeypatch.setattr(scraper, "fetch_subtitles", fetch_subtitles)
+    monkeypatch.setattr(scraper, "upsert_url_with_subtitles", upsert)
+    return uploaded
+
+
+def _args(workers):
+    return Namespace(lang="de", source="test", priority=1, workers=workers)
+
+
+def test_parallel_isolates_errors_and_labels_results(uploads, capsys):
+    """Testet ob ein Fehler nur seine URL betrifft und jede Ausgabe ihrer URL zugeordnet ist"""
+    uploaded = scraper.process_urls_parallel(URLS, _args(4))
+    assert sorted(uploaded) == sorted(u for u in URLS if u != URLS[3])
+    out = capsys.readouterr()
+    assert "pytubefix kaputt" in out.err
+    labels = re.findall(r"\(#(\d+)\) (\S+)", out.out)
+    assert sorted(labels, key=lambda l: int(l[0])) == [(str(i), url) for i, url in enumerate(URLS, 1)]
+    # Fertig-Reihenfolge weicht von der Eingabe ab, Zuordnung bleibt trotzdem korrekt
+    assert [url for _, url in labels] != URLS
+    assert sorted(u[0] for u in uploads) == sorted(uploaded)
+
+
+def test_stopped_worker_is_not_reported_as_uploaded(uploads, monkeypatch):
+    """Testet ob nach Strg+C nicht hochgeladene URLs auch nicht als hochgeladen zurückkommen"""
+    real_process_url = scraper.process_url
+
+    def process_url(url, lang, source, priority, stop_event=None):
+        if url == URLS[0]:
+            stop_event.set()
+        return real_process_url(url, lang, source, priority, stop_event)
+
+    monkeypatch.setattr(scraper, "process_url", process_url)
+    assert scraper.process_urls_parallel(URLS[:1], _args(2)) == []
+    assert uploads == []
+
+
+def test_parallel_matches_sequential(uploads, capsys):
+    """Testet ob Worker-Pool und sequentieller Pfad (--workers 1) dieselben Uploads liefern"""
+    parallel_ok = scraper.process_urls_parallel(URLS, _args(4))
+    parallel = sorted(uploads)
+    uploads.clear()
+    assert scraper.process_urls_sequential(URLS, _args(1)) == [u for u in URLS if u != URLS[3]]
+    assert sorted(parallel_ok) == [u for u in URLS if u != URLS[3]]
+    assert "pytubefix kaputt" in capsys.readouterr().err
+    assert [u[0] for u in uploads] == [u for u in URLS if u != URLS[3]]
+    assert sorted(uploads) == parallel
+
+
+@pytest.mark.parametrize("mode", ["full", "diff"])
+def test_dedup_matches_legacy_urls_by_video_id(table, client, monkeypatch, mode):
+    """Testet ob --dedup full/diff Zeilen unter Alt-URLs (&t=, youtu.be, shorts) als bekannt erkennen"""
+    table.rows = [
+        {"id": 1, "url": URLS[0] + "&t=72s"},
+        {"id": 2, "url": f"https://youtu.be/{URLS[1][-11:]}"},
+        {"id": 3, "url": f"https://www.youtube.com/shorts/{URLS[2][-11:]}"},
+        {"id": 4, "url": URLS[3]},
+    ]
+    monkeypatch.setattr(scraper, "SUPABASE", client)
+    monkeypatch.setattr(scraper, "SUPABASE_TABLE", "youtube_urls")
+    if mode == "full":
+        existing = scraper.fetch_existing_urls()
+        new_urls = [url for url in URLS if scraper.bloom_key(url) not in existing]
+    else:
+        existing = scraper.fetch_existing_among(URLS)
+        new_urls = [url for url in URLS if url not in existing]
+    assert new_urls == URLS[4:]
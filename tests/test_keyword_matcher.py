@@ -0,0 +1,60 @@
+"""
+Test Keyword-Matcher
+====================
+Testet den Aho-Corasick-Matcher: Wortgrenzen, erlaubte Endungen, Gruppen
+und Gleichheit mit einem naiven Regex-Abgleich.
+"""
+import random
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.keyword_matcher import KeywordMatcher
+from src.filter_config import TECH_KEYWORDS, EXCLUDE_KEYWORDS
+from src.video_filter import VideoFilter
+
+
+def _matcher(**kwargs):
+    return KeywordMatcher({"include": TECH_KEYWORDS, "exclude": EXCLUDE_KEYWORDS}, **kwargs)
+
+
+def test_word_boundaries():
+    """Testet ob kurze Keywords nicht in fremden Wörtern treffen"""
+    hits = _matcher().scan("We maintain a large garden and learn about marketing")
+    assert hits == {"include": set(), "exclude": set()}
+    hits = _matcher().scan("AI, AR & ci/cd: Künstliche Intelligenz (GPT)")
+    assert hits["include"] == {"ai", "ar", "ci/cd", "künstliche intelligenz", "gpt"}
+
+
+def test_suffixes_only_for_longer_keywords():
+    """Testet erlaubte Endungen: 'robots' trifft 'robot', 'ais' trifft nicht 'ai'"""
+    matcher = _matcher(suffixes=("s", "es"), suffix_min_len=4)
+    assert matcher.scan("Robots and databases, no ais")["include"] == {"robot", "database"}
+    assert _matcher().scan("Robots")["include"] == set()
+
+
+def test_overlapping_and_groups():
+    """Testet überlappende Keywords und Treffer in beiden Gruppen in einem Durchlauf"""
+    hits = _matcher().scan("Machine Learning Gameplay with Google Cloud")
+    assert hits["include"] == {"machine learning", "google", "cloud", "google cloud"}
+    assert hits["exclude"] == {"gameplay"}
+
+
+def test_matches_naive_regex():
+    """Testet ob der Automat dieselben Keywords findet wie ein Regex pro Keyword"""
+    words = sorted(TECH_KEYWORDS | EXCLUDE_KEYWORDS) + ["maintain", "garden", "xai", "ai_", "-"]
+    rng = random.Random(7)
+    matcher = _matcher()
+    for _ in range(200):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 30)))
+        expected = {kw for kw in TECH_KEYWORDS
+                    if re.search(r"(?<![\w])" + re.escape(kw) + r"(?![\w])", text)}
+        assert matcher.scan(text)["include"] == expected
+
+
+def test_video_filter_uses_boundaries():
+    """Testet ob 'ai' in 'maintain' keinen Score mehr erzeugt"""
+    vf = VideoFilter()
+    assert vf.calculate_keyword_score("How to maintain your garden") == 0.0
+    assert vf.calculate_keyword_score("ChatGPT Tutorial: How to use AI for coding") == 0.7
@@ -0,0 +1,59 @@
+"""
+Test Known URL Index
+====================
+Testet den lokalen URL-Index: Voll-Abgleich, inkrementeller Sync nach
+(added_at, id)-Watermark, Persistenz und periodischen Voll-Abgleich.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.known_index import KnownUrlIndex
+
+
+def _row(i, ts):
+    return {"id": i, "url": f"https://youtu.be/v{i}", "added_at": f"2025-10-0{ts}T10:00:00+00:00"}
+
+
+@pytest.fixture
+def table(table):
+    table.rows = [_row(1, 1), _row(2, 1), _row(3, 2)]
+    return table
+
+
+def test_full_then_incremental_sync(table, client, tmp_path):
+    """Testet ob nach dem Voll-Abgleich nur neue Zeilen nachgeladen werden"""
+    index = KnownUrlIndex(tmp_path / "known.json", page_size=2)
+    assert index.sync(client, "youtube_urls") == 3
+    assert index.stats["mode"] == "voll"
+    assert index.watermark == ("2025-10-02T10:00:00+00:00", 3)
+
+    # Neue Zeile mit gleichem Zeitstempel wie die Watermark, aber größerer id
+    table.rows += [_row(4, 2), _row(5, 3)]
+    reloaded = KnownUrlIndex(tmp_path / "known.json", page_size=2)
+    assert len(reloaded) == 3
+    table.requests.clear()
+    assert reloaded.sync(client, "youtube_urls") == 2
+    assert reloaded.stats["mode"] == "inkrementell"
+    assert "https://youtu.be/v4" in reloaded and "https://youtu.be/v5" in reloaded
+    assert all("or" in r.query for r in table.requests)
+
+
+def test_periodic_full_sync_drops_deleted_rows(table, client, tmp_path):
+    """Testet ob der periodische Voll-Abgleich gelöschte Zeilen aus dem Index entfernt"""
+    index = KnownUrlIndex(tmp_path / "known.json", full_sync_hours=0)
+    index.sync(client, "youtube_urls")
+    table.rows = [r for r in table.rows if r["id"] != 2]
+    index.sync(client, "youtube_urls")
+    assert index.stats["mode"] == "voll"
+    assert "https://youtu.be/v2" not in index and len(index) == 2
+
+
+def test_in_memory_index_without_path(client):
+    """Testet den Index ohne Datei (immer Voll-Abgleich beim ersten Sync)"""
+    index = KnownUrlIndex(None)
+    index.sync(client, "youtube_urls")
+    index.add(["https://youtu.be/neu"])
+    assert "https://youtu.be/neu" in index and len(index) == 4
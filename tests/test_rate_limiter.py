@@ -0,0 +1,80 @@
+"""
+Test Rate-Limiter
+=================
+Testet Drosselungserkennung, Token-Bucket, AIMD-Regelung mit Cooldown und die
+einmalige Freigabe eines Permits.
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.rate_limiter import AdaptiveRateLimiter, is_throttle_error, OK, THROTTLED, ERROR
+
+
+class _HttpError(Exception):
+    def __init__(self, code):
+        super().__init__(f"HTTP Error {code}")
+        self.code = code
+
+
+def test_is_throttle_error():
+    """Testet ob nur echte 429/Bot-Signale als Drosselung gelten"""
+    assert is_throttle_error(_HttpError(429))
+    assert is_throttle_error(RuntimeError("HTTP Error 429: Too Many Requests"))
+    assert is_throttle_error(RuntimeError("unexpected status code: 429"))
+    assert is_throttle_error(RuntimeError("This request was detected as a bot"))
+    assert not is_throttle_error(_HttpError(404))
+    assert not is_throttle_error(RuntimeError("video https://www.youtube.com/watch?v=ab429cdEFgh unavailable"))
+    assert not is_throttle_error(RuntimeError("caption track /api/timedtext?v=x-429-y not found"))
+
+
+def test_token_bucket_paces_requests():
+    """Testet ob nach dem Burst höchstens rate Permits pro Sekunde vergeben werden"""
+    limiter = AdaptiveRateLimiter(rate=20, max_rate=20, burst=1, concurrency=4, rate_increase=0)
+    started = time.monotonic()
+    for _ in range(5):
+        limiter.acquire().release(OK)
+    assert time.monotonic() - started >= 4 / 20 * 0.8
+
+
+def test_concurrency_limit_and_timeout():
+    """Testet ob acquire bei belegten Slots nach timeout None liefert"""
+    limiter = AdaptiveRateLimiter(rate=100, burst=10, concurrency=1, max_concurrency=1)
+    permit = limiter.acquire()
+    assert limiter.acquire(timeout=0.05) is None
+    permit.release(OK)
+    assert limiter.acquire(timeout=0.05) is not None
+
+
+def test_aimd_increase_decrease_and_cooldown():
+    """Testet additive Erhöhung bei Erfolg und einmalige Halbierung samt Pause bei Drosselung"""
+    limiter = AdaptiveRateLimiter(rate=4, max_rate=10, burst=10, concurrency=2, max_concurrency=8,
+                                  rate_increase=1.0, cooldown=0.3)
+    limiter.acquire().release(OK)
+    assert limiter.rate == 4.25 and limiter.concurrency == 2.5
+
+    first, second = limiter.acquire(), limiter.acquire()
+    first.release(THROTTLED)
+    second.release(THROTTLED)  # innerhalb des Cooldowns: keine zweite Halbierung
+    assert limiter.rate == 4.25 / 2 and limiter.concurrency == 1.25
+    assert limiter.acquire(timeout=0.1) is None
+    assert limiter.acquire(timeout=1.0) is not None
+    assert limiter.stats[THROTTLED] == 2
+
+
+def test_permit_releases_once():
+    """Testet ob ein Permit seinen Slot genau einmal freigibt"""
+    limiter = AdaptiveRateLimiter(rate=100, burst=10, concurrency=1, max_concurrency=1, cooldown=0)
+    permit = limiter.acquire()
+    permit.release(ERROR)
+    permit.release(OK)
+    assert limiter.stats[ERROR] == 1 and limiter.stats[OK] == 0
+    assert limiter._in_flight == 0
+
+    try:
+        with limiter.acquire():
+            raise RuntimeError("HTTP Error 429: Too Many Requests")
+    except RuntimeError:
+        pass
+    assert limiter.stats[THROTTLED] == 1 and limiter._in_flight == 0
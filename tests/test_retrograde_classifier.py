@@ -0,0 +1,35 @@
+"""
+Test Retrograde Klassifizierung
+===============================
+Testet, dass intern wiederholte 429/503-Antworten beim Schreiben den
+DB-Schreiblimiter drosseln.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.supabase_client import SupabaseClient
+
+
+@pytest.fixture
+def classifier(http_stub, monkeypatch):
+    monkeypatch.setenv("SUPABASE_SERVICE_KEY", "test")
+    monkeypatch.setenv("CLASSIFICATION_CACHE_PATH", "")
+    monkeypatch.syspath_prepend(str(Path(__file__).parent.parent / "src"))
+    import retrograde_classifier
+    # Erster PATCH gedrosselt, der Client wiederholt selbst
+    http_stub.statuses = [429]
+    http_stub.responder = lambda request: (204, {}, b"")
+    client = SupabaseClient(http_stub.url, "x", retries=2, backoff=0)
+    monkeypatch.setattr(retrograde_classifier.SupabaseClient, "from_env", classmethod(lambda cls, *a: client))
+    return retrograde_classifier.RetrogradedClassifier()
+
+
+def test_retried_throttle_slows_write_limiter(classifier):
+    """Testet ob ein vom Client wiederholter 429 die Schreibrate halbiert, obwohl das Update gelingt"""
+    rate = classifier.write_limiter.rate
+    assert classifier.update_classification("https://www.youtube.com/watch?v=aaaaaaaaaaa", "RELEVANT", 0.9, "keywords")
+    assert classifier.write_limiter.rate < rate
+    assert classifier.write_limiter.stats["throttled"] == 1
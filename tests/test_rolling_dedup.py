@@ -0,0 +1,74 @@
+"""
+Test Rolling-Dedup
+==================
+Testet das Entfernen rollender Wiederholungen aus automatisch generierten
+Untertiteln (jeder Cue wiederholt die vorige Zeile).
+"""
+import json
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.timedtext import Segment, clean_timedtext, dedup_rolling, is_auto_code, timedtext_to_text
+from src.transcript import Transcript
+
+# Typische Auto-Spur (srv1): zweizeilige Cues, die obere Zeile ist die vorige untere
+AUTO_SRV1 = """<?xml version="1.0" encoding="utf-8" ?><transcript>
+<text start="0.0" dur="2.0">heute geht es um</text>
+<text start="2.0" dur="2.0">heute geht es um
+neuronale Netze und</text>
+<text start="4.0" dur="2.0">neuronale Netze und
+wie man sie trainiert</text>
+<text start="6.0" dur="0.5">wie man sie trainiert</text>
+<text start="6.5" dur="2.0">wie man sie trainiert
+mit Python</text>
+</transcript>"""
+
+AUTO_JSON3 = json.dumps({"events": [
+    {"tStartMs": 0, "dDurationMs": 1500, "segs": [{"utf8": "das ist ein"}]},
+    {"tStartMs": 1500, "dDurationMs": 1500, "segs": [{"utf8": "das ist ein\nkleiner Test"}]},
+    {"tStartMs": 3000, "dDurationMs": 1500, "segs": [{"utf8": "kleiner Test"}, {"utf8": "\nfür json3"}]},
+]})
+
+EXPECTED = "heute geht es um neuronale Netze und wie man sie trainiert mit Python"
+
+
+def test_srv1_auto_track_dedup():
+    """Testet ob jede Phrase einer rollenden srv1-Spur nur einmal vorkommt"""
+    text, saved = clean_timedtext(AUTO_SRV1, dedup=True)
+    assert text == EXPECTED
+    raw = timedtext_to_text(AUTO_SRV1)
+    assert saved == len(raw.encode("utf-8")) - len(text.encode("utf-8"))
+    assert saved > 0
+
+
+def test_json3_auto_track_dedup():
+    """Testet die Dedup-Stufe mit einer json3-Spur"""
+    text, saved = clean_timedtext(AUTO_JSON3, dedup=True)
+    assert text == "das ist ein kleiner Test für json3"
+    assert saved > 0
+
+
+def test_without_dedup_text_is_unchanged():
+    """Testet ob ohne Dedup der bisherige Text entsteht"""
+    assert clean_timedtext(AUTO_SRV1) == (timedtext_to_text(AUTO_SRV1), 0)
+
+
+def test_single_word_repetition_is_kept():
+    """Testet ob echte Einzelwort-Wiederholungen über Cue-Grenzen stehen bleiben"""
+    segments = [Segment(0, 1000, "das war sehr"), Segment(1000, 2000, "sehr gut so")]
+    assert [s.text for s in dedup_rolling(segments)] == ["das war sehr", "sehr gut so"]
+
+
+def test_timestamps_survive_dedup():
+    """Testet ob gekürzte Cues ihre Zeitstempel behalten und volle Wiederholungen entfallen"""
+    transcript = Transcript.from_timedtext(AUTO_SRV1, dedup=True)
+    assert transcript.text() == EXPECTED
+    assert [s.start_ms for s in transcript] == [0, 2000, 4000, 6500]
+    assert transcript.segment(3) == Segment(6500, 8500, "mit Python")
+
+
+def test_is_auto_code():
+    """Testet die Erkennung automatisch generierter Spur-Codes"""
+    assert is_auto_code("a.de") and is_auto_code("a.en")
+    assert not is_auto_code("de") and not is_auto_code(None)
@@ -0,0 +1,79 @@
+"""
+Test Subtitle Cleaner Equivalence
+=================================
+Stellt sicher, dass der gemeinsame, vorkompilierte Bereiniger exakt dieselbe
+Ausgabe liefert wie die ursprüngliche zeilenweise Implementierung.
+"""
+import re
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.subtitle_text import clean_srt_to_text
+
+
+def legacy_clean_srt_to_text(srt_text: str) -> str:
+    """Ursprüngliche Implementierung (Referenz)"""
+    out = []
+    for line in srt_text.splitlines():
+        if re.match(r"^\d+$", line):
+            continue
+        if re.match(r"^\d\d:\d\d:\d\d", line):
+            continue
+        if not line.strip():
+            continue
+        out.append(line.strip())
+    return " ".join(out)
+
+
+def _srt_time(ms: int) -> str:
+    h, ms = divmod(ms, 3_600_000)
+    m, ms = divmod(ms, 60_000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02}:{m:02}:{s:02},{ms:03}"
+
+
+def make_srt(cues: int, seed: int = 0) -> str:
+    """Erzeugt eine SRT-Spur mit zufälligen, teils fiesen Textzeilen"""
+    rng = random.Random(seed)
+    words = ["hallo", "Welt", "über", "ÄÖÜß", "42", "00:00:01", "-->", "", "  ", "\t", "１２", "a\u2028b"]
+    parts = []
+    for i in range(cues):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 6)))
+        parts.append(f"{i + 1}\n{_srt_time(i * 2000)} --> {_srt_time(i * 2000 + 1500)}\n{text}\n")
+    sep = rng.choice(["\n", "\r\n"])
+    return sep.join(parts)
+
+
+@pytest.mark.parametrize("srt_input", [
+    "",
+    "\n\n\n",
+    "1\n00:00:01,000 --> 00:00:02,000\nHallo\n",
+    "12 \n 12\n12",                          # nur exakte Zahlenzeilen sind SRT-Indizes
+    "00:00:01 Text nach Zeitstempel",
+    "  00:00:01,000 --> 00:00:02,000\nText",  # eingerückter Zeitstempel bleibt Text
+    "１２\n٣٤:٥٦:٧٨,000\nUnicode-Ziffern",
+    "a\r\nb\rc\x0bd\x0ce\x85f\u2028g\u2029h",  # alle splitlines-Trenner
+    "\u00a0Text mit geschütztem Leerzeichen\u00a0",
+])
+def test_equivalence_edge_cases(srt_input):
+    """Testet Randfälle gegen die Referenz-Implementierung"""
+    assert clean_srt_to_text(srt_input) == legacy_clean_srt_to_text(srt_input)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_equivalence_random_tracks(seed):
+    """Testet zufällige Spuren gegen die Referenz-Implementierung"""
+    srt_input = make_srt(200, seed)
+    assert clean_srt_to_text(srt_input) == legacy_clean_srt_to_text(srt_input)
+
+
+@pytest.mark.slow
+def test_equivalence_multi_megabyte_track():
+    """Testet eine Spur im Megabyte-Bereich (mehrstündiger Vortrag)"""
+    srt_input = make_srt(40_000, seed=7)
+    assert len(srt_input) > 1_000_000
+    assert clean_srt_to_text(srt_input) == legacy_clean_srt_to_text(srt_input)
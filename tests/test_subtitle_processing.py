@@ -9,7 +9,7 @@ from pathlib import Path
 
 # Import der zu testenden Funktionen
 sys.path.insert(0, str(Path(__file__).parent.parent))
-from run_youtube_history_scraper import clean_srt_to_text
+from src.subtitle_text import clean_srt_to_text
 
 
 def test_clean_srt_to_text_basic():
@@ -0,0 +1,147 @@
+"""
+Test Supabase Client
+====================
+Testet den gemeinsamen REST-Client gegen einen lokalen Stub:
+Keep-Alive, Retries bei transienten Fehlern und Timing-Hooks.
+"""
+import sys
+from pathlib import Path
+from urllib.parse import unquote
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.supabase_client import SupabaseClient, in_filter
+
+
+def _client(stub, **kwargs):
+    return SupabaseClient(f"{stub.url}/rest/v1", "key", **kwargs)
+
+
+def test_reuses_connection(http_stub):
+    """Testet ob aufeinanderfolgende Requests dieselbe TCP-Verbindung nutzen"""
+    client = _client(http_stub)
+    for i in range(5):
+        assert client.patch(f"youtube_urls?id=eq.{i}", json={"x": 1}).ok
+    assert len({r.port for r in http_stub.requests}) == 1
+    assert (http_stub.requests[0].method, http_stub.requests[0].path) == ("PATCH", "/rest/v1/youtube_urls?id=eq.0")
+    assert http_stub.requests[0].headers["apikey"] == "key"
+
+
+def test_retries_transient_errors(http_stub):
+    """Testet ob 503/429 mit Backoff wiederholt und danach aufgegeben wird"""
+    http_stub.statuses = [503, 429]
+    client = _client(http_stub, retries=3, backoff=0.01)
+    assert client.get("youtube_urls").status_code == 200
+    assert client.stats["retries"] == 2
+
+    http_stub.statuses = [503, 503, 503]
+    client = _client(http_stub, retries=1, backoff=0.01)
+    assert client.get("youtube_urls").status_code == 503
+    assert len(http_stub.requests) == 5
+
+
+def test_no_retry_on_client_error(http_stub):
+    """Testet ob 4xx-Fehler (außer 429) nicht wiederholt werden"""
+    http_stub.statuses = [400]
+    client = _client(http_stub, backoff=0.01)
+    assert client.delete("youtube_urls?id=eq.1").status_code == 400
+    assert len(http_stub.requests) == 1
+
+
+def test_delete_not_retried_after_server_error(delete_stub):
+    """Testet ob DELETE nach 5xx nicht wiederholt wird (könnte schon committet sein), nach 429 schon"""
+    client = _client(delete_stub, backoff=0.01)
+    delete_stub.statuses = [504]
+    result = client.bulk_delete("youtube_urls", [1, 2])
+    assert (result.deleted, result.failed) == (0, 2)
+    assert len(delete_stub.requests) == 1
+
+    delete_stub.statuses = [429]
+    result = client.bulk_delete("youtube_urls", [1, 2])
+    assert (result.deleted, result.failed) == (2, 0)
+    assert len(delete_stub.requests) == 3
+
+
+def test_timing_hooks(http_stub):
+    """Testet ob Hooks Methode, Pfad ohne Query, Status und Versuch erhalten"""
+    http_stub.statuses = [502]
+    timings = []
+    client = _client(http_stub, backoff=0.01)
+    client.add_hook(timings.append)
+    client.get("youtube_urls?select=url")
+    assert [(t.method, t.path, t.status, t.attempt) for t in timings] == [
+        ("GET", "youtube_urls", 502, 1),
+        ("GET", "youtube_urls", 200, 2),
+    ]
+    assert all(t.elapsed >= 0 for t in timings)
+    assert "2 Requests" in client.summary_line()
+
+
+@pytest.fixture
+def paging_stub(table):
+    table.rows = [{"id": i, "url": f"https://youtu.be/{i}"} for i in range(1, 26)]
+    return table
+
+
+def test_iter_pages_keyset(paging_stub):
+    """Testet Keyset-Paging bis zur leeren Seite, inkl. Schlüsselspalte im select"""
+    client = SupabaseClient(paging_stub.url, "key")
+    pages = list(client.iter_pages("youtube_urls", select="url", page_size=10))
+    assert [len(p) for p in pages] == [10, 10, 5]
+    assert [r.query.get("id") for r in paging_stub.requests] == [None, "gt.10", "gt.20", "gt.25"]
+    assert paging_stub.requests[0].query["select"] == "id,url"
+    assert paging_stub.requests[0].query["order"] == "id.asc"
+
+
+def test_iter_pages_warns_on_truncation(paging_stub, capsys):
+    """Testet ob eine vom Server gekürzte Seite gemeldet und trotzdem alles gelesen wird"""
+    paging_stub.max_rows = 7
+    client = SupabaseClient(paging_stub.url, "key")
+    rows = [r for page in client.iter_pages("youtube_urls", select="id,url", page_size=10) for r in page]
+    assert [r["id"] for r in rows] == list(range(1, 26))
+    err = capsys.readouterr().err
+    assert err.count("[WARN]") == 1 and "7 statt 10" in err
+
+
+def test_in_filter_quoting():
+    """Testet das Quoting von URLs mit Kommas, Klammern, Anführungszeichen und Backslashes"""
+    assert in_filter(["https://youtu.be/a?t=1,2", 'x"(y)\\z']) == \
+        'in.("https://youtu.be/a?t=1,2","x\\"(y)\\\\z")'
+
+
+def test_find_existing_chunks(http_stub):
+    """Testet ob Kandidaten in Blöcken per in.() abgefragt werden"""
+    client = _client(http_stub)
+    urls = [f"https://www.youtube.com/watch?v={i:011d}" for i in range(120)]
+    client.find_existing("youtube_urls", "url", urls + urls[:5], chunk_size=50)
+    lookups = [r.path for r in http_stub.requests if r.method == "GET"]
+    assert len(lookups) == 3
+    assert unquote(lookups[0]).count('"https://www.youtube.com/watch?v=') == 50
+
+
+@pytest.fixture
+def delete_stub(table):
+    table.rows = [{"id": i} for i in range(1, 451)]
+    return table
+
+
+def _ids(stub):
+    return {row["id"] for row in stub.rows}
+
+
+def test_bulk_delete_dry_run_and_delete(delete_stub):
+    """Testet gebündeltes Löschen in Blöcken: Trockenlauf zählt gleich, ohne zu löschen"""
+    client = SupabaseClient(delete_stub.url, "key")
+    ids = list(range(301, 601))  # 150 davon gibt es nicht (mehr)
+
+    dry = client.bulk_delete("youtube_urls", ids, chunk_size=100, dry_run=True)
+    assert (dry.requested, dry.deleted, dry.failed, dry.dry_run) == (300, 150, 0, True)
+    assert len(delete_stub.rows) == 450
+
+    result = client.bulk_delete("youtube_urls", ids + ids[:10], chunk_size=100)
+    assert (result.requested, result.deleted, result.failed) == (300, 150, 0)
+    assert _ids(delete_stub) == set(range(1, 301))
+    deletes = [r for r in delete_stub.requests if r.method == "DELETE"]
+    assert len(deletes) == 3 and all(r.query["id"].count(",") == 99 for r in deletes)
+    assert all("count=exact" in r.headers["Prefer"] for r in delete_stub.requests)
@@ -0,0 +1,115 @@
+"""
+Test Supabase Writer
+====================
+Testet den gepufferten Multi-Row-Upsert gegen einen lokalen PostgREST-Stub:
+Batching nach Zeilen/Bytes/Zeit, return=minimal und Fehler pro Zeile.
+"""
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.supabase_client import SupabaseClient
+from src.supabase_writer import SupabaseWriter
+
+
+def _respond(request):
+    rows = request.json()
+    # Zeilen mit "bad" in der URL verletzen eine Constraint -> ganzer Request scheitert;
+    # "big" simuliert einen zu großen Request, "slow" eine langsame Antwort
+    if any("slow" in row["url"] for row in rows):
+        time.sleep(0.3)
+    if any("big" in row["url"] for row in rows):
+        return 413, {}, b""
+    return (400 if any("bad" in row["url"] for row in rows) else 201), {}, b""
+
+
+@pytest.fixture
+def stub(http_stub):
+    http_stub.responder = _respond
+    return http_stub
+
+
+def _bodies(stub):
+    return [r.json() for r in stub.requests]
+
+
+def _writer(stub, **kwargs):
+    client = SupabaseClient(stub.url, "x", retries=0)
+    return SupabaseWriter(client, "youtube_urls", **kwargs)
+
+
+def test_flush_by_row_count(stub):
+    """Testet ob Zeilen als Multi-Row-Arrays mit return=minimal geschrieben werden"""
+    with _writer(stub, max_rows=3, max_interval=0) as writer:
+        for i in range(7):
+            writer.add({"url": f"u{i}", "processed": False})
+        assert len(stub.requests) == 2
+    assert [len(body) for body in _bodies(stub)] == [3, 3, 1]
+    path, prefer = stub.requests[0].path, stub.requests[0].headers["Prefer"]
+    assert path.endswith("/youtube_urls?on_conflict=url")
+    assert "return=minimal" in prefer and "merge-duplicates" in prefer
+    assert writer.stats == {"rows": 7, "ok": 7, "failed": 0, "requests": 3}
+
+
+def test_flush_by_bytes_and_key_groups(stub):
+    """Testet die Byte-Grenze und getrennte Requests für unterschiedliche Key-Sets"""
+    with _writer(stub, max_rows=100, max_bytes=200, max_interval=0) as writer:
+        writer.add({"url": "a", "subtitles": "x" * 150})
+        writer.add({"url": "b", "subtitles": "y" * 150})
+        assert len(stub.requests) == 1
+        writer.add({"url": "c"})
+    assert sorted(len(body) for body in _bodies(stub)) == [1, 2]
+
+
+def test_flush_by_interval(stub):
+    """Testet ob ein Teil-Batch nach max_interval geschrieben wird"""
+    writer = _writer(stub, max_rows=100, max_interval=0.2)
+    writer.add({"url": "a"})
+    deadline = time.monotonic() + 5
+    while not stub.requests and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert len(stub.requests) == 1
+    writer.close()
+
+
+def test_duplicate_urls_are_merged(stub):
+    """Testet ob mehrfach gepufferte URLs nur mit dem letzten Stand geschrieben werden"""
+    with _writer(stub, max_interval=0) as writer:
+        writer.add({"url": "a", "processed": False})
+        writer.add({"url": "a", "processed": True})
+    assert _bodies(stub)[0] == [{"url": "a", "processed": True}]
+
+
+def test_bisect_reports_failing_rows(stub):
+    """Testet ob bei einem fehlgeschlagenen Batch genau die fehlerhaften Zeilen gemeldet werden"""
+    reported = []
+    with _writer(stub, max_rows=100, max_interval=0, on_failure=reported.append) as writer:
+        for url in ["u0", "u1", "bad2", "u3", "u4", "bad5", "u6", "u7"]:
+            writer.add({"url": url})
+    assert [f.key for f in reported] == ["bad2", "bad5"]
+    assert writer.stats["ok"] == 6 and writer.stats["failed"] == 2
+
+
+def test_non_row_errors_fail_whole_batch(stub):
+    """Testet ob 413 & Co. den Batch sofort scheitern lassen statt ihn zu halbieren"""
+    reported = []
+    with _writer(stub, max_rows=100, max_interval=0, on_failure=reported.append) as writer:
+        for url in ["u0", "u1", "big2", "u3"]:
+            writer.add({"url": url})
+    assert len(stub.requests) == 1
+    assert sorted(f.key for f in reported) == ["big2", "u0", "u1", "u3"]
+
+
+def test_close_waits_for_timer_batch(stub):
+    """Testet ob close() erst zurückkehrt, wenn ein vom Timer gesendeter Batch fertig ist"""
+    writer = _writer(stub, max_rows=100, max_interval=0.05)
+    writer.add({"url": "slow"})
+    deadline = time.monotonic() + 5
+    while not stub.requests and time.monotonic() < deadline:
+        time.sleep(0.01)
+    writer.close()
+    assert writer.stats["ok"] == 1
+    assert not writer._thread.is_alive()
@@ -0,0 +1,91 @@
+"""
+Test Timedtext Parsing
+======================
+Testet das direkte Parsen von Caption-Spuren (XML/json3) gegen den bisherigen
+Weg über pytubefix-SRT + clean_srt_to_text.
+"""
+import json
+import sys
+import xml.etree.ElementTree as ElementTree
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.subtitle_text import clean_srt_to_text
+from src.timedtext import Segment, iter_segments, iter_xml_segments, timedtext_to_text
+
+SRV1_XML = """<?xml version="1.0" encoding="utf-8" ?><transcript>
+<text start="0.5" dur="2.1">Hallo &amp;amp; Welt</text>
+<text start="2.6" dur="1.0">2019</text>
+<text start="3" dur="1">  zwei
+Zeilen  </text>
+<text start="4" dur="1"></text>
+<text start="5.25" dur="1.5">&amp;#39;Zitat&amp;#39; Über äöü</text>
+</transcript>"""
+
+SRV3_XML = """<?xml version="1.0" encoding="utf-8" ?><timedtext format="3"><body>
+<p t="1000" d="2000">Erste Zeile</p>
+<p t="3000" d="1500"><s>auto</s><s t="300">generiert</s></p>
+</body></timedtext>"""
+
+
+def _via_srt(xml: str) -> str:
+    """Bisheriger Weg: XML -> SRT (pytubefix) -> Fließtext"""
+    from pytubefix.captions import Caption
+    return clean_srt_to_text(Caption.__new__(Caption).xml_caption_to_srt(xml))
+
+
+def test_srv1_matches_srt_path():
+    """Testet ob srv1-XML denselben Text liefert wie der SRT-Umweg"""
+    pytest.importorskip("pytubefix")
+    assert timedtext_to_text(SRV1_XML) == _via_srt(SRV1_XML)
+
+
+def test_srv1_segments_have_millisecond_times():
+    """Testet Start/Ende in Millisekunden"""
+    segments = list(iter_segments(SRV1_XML))
+    assert segments[0] == Segment(500, 2600, "Hallo & Welt")
+    assert segments[-1] == Segment(5250, 6750, "'Zitat' Über äöü")
+
+
+def test_srv3_paragraphs_and_spans():
+    """Testet srv3 mit <p t d> und <s>-Wortspannen"""
+    segments = list(iter_segments(SRV3_XML))
+    assert segments == [
+        Segment(1000, 3000, "Erste Zeile"),
+        Segment(3000, 4500, "auto generiert"),
+    ]
+
+
+def test_xml_streams_in_chunks():
+    """Testet ob kleine Blöcke dasselbe liefern und Segmente vor dem Ende der Spur kommen"""
+    assert list(iter_xml_segments(SRV1_XML, chunk_size=7)) == list(iter_segments(SRV1_XML))
+    # Kaputtes Ende: das erste Segment ist schon ausgegeben, bevor der Parser darauf stößt
+    segments = iter_xml_segments(SRV3_XML.replace("</body>", "<kaputt"), chunk_size=64)
+    assert next(segments) == Segment(1000, 3000, "Erste Zeile")
+    with pytest.raises(ElementTree.ParseError):
+        list(segments)
+
+
+def test_json3_events():
+    """Testet json3 inkl. reiner Zeilenumbruch-Events"""
+    payload = json.dumps({
+        "wireMagic": "pb3",
+        "events": [
+            {"tStartMs": 0, "dDurationMs": 1000, "segs": [{"utf8": "hello"}, {"utf8": " world"}]},
+            {"tStartMs": 1000, "dDurationMs": 10, "aAppend": 1, "segs": [{"utf8": "\n"}]},
+            {"tStartMs": 1200},
+            {"tStartMs": 2000, "dDurationMs": 500, "segs": [{"utf8": "again"}]},
+        ],
+    })
+    assert list(iter_segments(payload)) == [
+        Segment(0, 1000, "hello world"),
+        Segment(2000, 2500, "again"),
+    ]
+    assert timedtext_to_text(payload) == "hello world again"
+
+
+def test_empty_track():
+    """Testet leere Spur"""
+    assert timedtext_to_text("<transcript></transcript>") == ""
@@ -0,0 +1,75 @@
+"""
+Test Transcript
+===============
+Testet das kompakte Transkript (gepackte Zeitstempel + UTF-8-Puffer):
+Round-Trip zum gespeicherten Fließtext, Ausschnitte und Serialisierung.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.timedtext import Segment, timedtext_to_text
+from src.transcript import Transcript
+
+SRV1_XML = """<?xml version="1.0" encoding="utf-8" ?><transcript>
+<text start="0.5" dur="2.1">Hallo Welt</text>
+<text start="3" dur="1">Über äöü €</text>
+<text start="4.5" dur="1.5">dritte Zeile</text>
+<text start="9" dur="2">Ende</text>
+</transcript>"""
+
+
+@pytest.fixture
+def transcript():
+    return Transcript.from_timedtext(SRV1_XML)
+
+
+def test_text_round_trip(transcript):
+    """Testet ob text() exakt dem bisher gespeicherten Fließtext entspricht"""
+    assert transcript.text() == timedtext_to_text(SRV1_XML)
+    assert len(transcript) == 4
+
+
+def test_segments_keep_timestamps(transcript):
+    """Testet ob Zeitstempel und Texte pro Cue erhalten bleiben (inkl. Multibyte-Zeichen)"""
+    assert list(transcript) == [
+        Segment(500, 2600, "Hallo Welt"),
+        Segment(3000, 4000, "Über äöü €"),
+        Segment(4500, 6000, "dritte Zeile"),
+        Segment(9000, 11000, "Ende"),
+    ]
+    assert transcript.index_at(4200) == 1
+    assert transcript.index_at(100) == -1
+
+
+def test_slice_and_windows(transcript):
+    """Testet Ausschnitte nach Zeit und fensterweisen Text"""
+    part = transcript.slice(3000, 9000)
+    assert part.text() == "Über äöü € dritte Zeile"
+    assert list(part)[0] == Segment(3000, 4000, "Über äöü €")
+    assert len(transcript.slice(20000, 30000)) == 0
+    assert list(transcript.windows(5000)) == [
+        (500, "Hallo Welt Über äöü € dritte Zeile"),
+        (5500, "Ende"),
+    ]
+
+
+def test_bytes_round_trip(transcript):
+    """Testet ob to_bytes/from_bytes verlustfrei ist"""
+    data = transcript.to_bytes()
+    assert len(data) == transcript.nbytes
+    restored = Transcript.from_bytes(data)
+    assert list(restored) == list(transcript)
+    assert restored.text() == transcript.text()
+    with pytest.raises(ValueError):
+        Transcript.from_bytes(b"XXXX" + data[4:])
+
+
+def test_empty_transcript():
+    """Testet ein Transkript ohne Cues"""
+    empty = Transcript.from_segments([])
+    assert empty.text() == ""
+    assert list(empty.windows(1000)) == []
+    assert Transcript.from_bytes(empty.to_bytes()).text() == ""
@@ -0,0 +1,70 @@
+"""
+Test Statistik-Pfad
+===================
+Testet die Zählungen per HEAD (ohne Zeilen im Body) und das lokale Rollup
+nach Tag und Quelle mit inkrementellem Nachführen.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.url_rollup import UrlRollup
+
+
+def _row(i, day, source, processed=True, classification=None):
+    return {"id": i, "added_at": f"2025-10-{day:02d}T12:00:00+00:00", "source": source,
+            "processed": processed, "classification": classification}
+
+
+@pytest.fixture
+def table(table):
+    table.rows = [_row(1, 1, "cron", classification="RELEVANT"), _row(2, 1, "manual", processed=False),
+                  _row(3, 2, "cron", classification="IRRELEVANT"), _row(4, 2, None)]
+    return table
+
+
+def test_count_many_uses_head(table, client):
+    """Testet ob die Statistik nur HEAD-Requests mit Filtern sendet"""
+    counts = client.count_many("youtube_urls", {
+        "total": {},
+        "processed": {"processed": "eq.true"},
+        "RELEVANT": {"classification": "eq.RELEVANT"},
+        "UNCLASSIFIED": {"classification": "is.null"},
+    })
+    assert counts == {"total": 4, "processed": 3, "RELEVANT": 1, "UNCLASSIFIED": 2}
+    assert {r.method for r in table.requests} == {"HEAD"}
+    assert all(r.query["select"] == "id" for r in table.requests)
+
+
+def test_rollup_incremental_and_persisted(table, client, tmp_path):
+    """Testet das Rollup nach Tag/Quelle: erst voll, danach nur neue Zeilen"""
+    rollup = UrlRollup(tmp_path / "rollup.json", page_size=3)
+    assert rollup.needs_rebuild()
+    assert rollup.rebuild(client, "youtube_urls") == 4
+    assert rollup.days == {"2025-10-01": {"cron": 1, "manual": 1}, "2025-10-02": {"cron": 1, "(ohne)": 1}}
+
+    table.rows.append(_row(5, 3, "cron"))
+    table.requests.clear()
+    reloaded = UrlRollup(tmp_path / "rollup.json", page_size=3)
+    assert reloaded.sync(client, "youtube_urls") == 1
+    assert table.requests[0].query["id"] == "gt.4"
+    assert table.requests[0].query["select"] == "id,added_at,source"
+    assert reloaded.recent(2) == [("2025-10-03", {"cron": 1}), ("2025-10-02", {"cron": 1, "(ohne)": 1})]
+    assert reloaded.by_source() == {"cron": 3, "manual": 1, "(ohne)": 1}
+
+
+def test_sync_never_reads_whole_table_implicitly(table, client, tmp_path):
+    """Testet ob sync() ohne Rollup nichts liest und ein fälliger Neuaufbau nur gemeldet wird"""
+    rollup = UrlRollup(tmp_path / "rollup.json", full_sync_hours=1, page_size=3)
+    assert rollup.sync(client, "youtube_urls") == 0
+    assert table.requests == []
+
+    rollup.rebuild(client, "youtube_urls")
+    rollup.full_sync_at -= 2 * 3600
+    table.rows.append(_row(5, 3, "cron"))
+    table.requests.clear()
+    assert rollup.needs_rebuild()
+    assert rollup.sync(client, "youtube_urls") == 1
+    assert table.requests[0].query["id"] == "gt.4"
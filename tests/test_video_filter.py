@@ -0,0 +1,55 @@
+"""
+Test VideoFilter Batch-Scoring
+==============================
+Testet ob score_batch und classify_batch exakt dieselben Ergebnisse liefern
+wie calculate_keyword_score bzw. is_relevant pro Datensatz.
+"""
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.filter_config import TECH_KEYWORDS, EXCLUDE_KEYWORDS
+from src.video_filter import VideoFilter
+
+
+def _records(n, seed=3):
+    rng = random.Random(seed)
+    words = sorted(TECH_KEYWORDS) + sorted(EXCLUDE_KEYWORDS)[:3] + ["maintain", "garden", "Robots", "the"] * 20
+    records = []
+    for _ in range(n):
+        title = " ".join(rng.choice(words) for _ in range(rng.randint(0, 6)))
+        subtitles = rng.choice([None, "", " ".join(rng.choice(words) for _ in range(rng.randint(1, 400)))])
+        records.append((title, subtitles))
+    return records
+
+
+def test_score_batch_matches_per_record():
+    """Testet exakte Gleichheit der vektorisierten Scores"""
+    vf = VideoFilter()
+    records = _records(300)
+    scores = vf.score_batch(records)
+    assert scores.tolist() == [vf.calculate_keyword_score(t, s) for t, s in records]
+    assert vf.score_batch([]).tolist() == []
+
+
+@pytest.mark.parametrize("use_ai", [False, True])
+def test_classify_batch_matches_is_relevant(monkeypatch, use_ai):
+    """Testet classify_batch gegen is_relevant, auch mit (gestubbter) KI im unsicheren Bereich"""
+    vf = VideoFilter()
+    vf.ai_available = True
+    answers = ["RELEVANT", "IRRELEVANT", "UNSURE"]
+    monkeypatch.setattr(vf, "ai_classify", lambda title, subtitles=None: answers[len(title) % 3])
+    records = _records(300, seed=5)
+    assert vf.classify_batch(records, use_ai=use_ai) == [vf.is_relevant(t, s, use_ai=use_ai) for t, s in records]
+
+
+def test_iter_classify_parallel_keeps_order():
+    """Testet ob das Scoring im Prozess-Pool dieselben Ergebnisse in derselben Reihenfolge liefert"""
+    vf = VideoFilter()
+    records = _records(230, seed=11)
+    blocks = list(vf.iter_classify_parallel(records, use_ai=False, workers=2, chunk_size=50))
+    assert [start for start, _ in blocks] == [0, 50, 100, 150, 200]
+    assert [r for _, results in blocks for r in results] == vf.classify_batch(records, use_ai=False)
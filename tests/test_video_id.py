@@ -0,0 +1,63 @@
+"""
+Test Video-ID Normalisierung
+============================
+Testet die kanonische Video-ID für alle URL-Varianten sowie die Planung des
+Duplikat-Backfills.
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.video_id import extract_video_id, canonicalize_url
+from src.duplicate_merger import find_duplicate_groups, merge_group
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.youtube.com/watch?v=ICQRofCNocA",
+    "https://www.youtube.com/watch?v=ICQRofCNocA&t=72s&pp=0gcJCQMKAYcqIYzv",
+    "https://m.youtube.com/watch?feature=share&v=ICQRofCNocA",
+    "youtube.com/watch?v=ICQRofCNocA",
+    "https://youtu.be/ICQRofCNocA?si=abc",
+    "https://www.youtube.com/shorts/ICQRofCNocA",
+    "https://www.youtube.com/embed/ICQRofCNocA?start=3",
+    "https://www.youtube-nocookie.com/embed/ICQRofCNocA",
+    "https://www.youtube.com/live/ICQRofCNocA",
+    "ICQRofCNocA",
+])
+def test_extract_video_id_variants(url):
+    """Testet ob alle URL-Formate dieselbe ID liefern"""
+    assert extract_video_id(url) == "ICQRofCNocA"
+    assert canonicalize_url(url) == "https://www.youtube.com/watch?v=ICQRofCNocA"
+
+
+@pytest.mark.parametrize("url", [
+    "", "https://www.youtube.com/feed/history", "https://www.youtube.com/watch?v=short",
+    "https://example.com/watch?v=ICQRofCNocA", "https://www.youtube.com/playlist?list=PL123",
+])
+def test_extract_video_id_rejects(url):
+    """Testet ob Nicht-Video-URLs keine ID liefern"""
+    assert extract_video_id(url) is None
+
+
+def test_duplicate_groups_and_merge_plan():
+    """Testet Gruppierung und Zusammenführung von Duplikaten"""
+    rows = [
+        {"id": 1, "url": "https://www.youtube.com/watch?v=ICQRofCNocA&t=72s", "processed": False,
+         "subtitles": None, "priority": 0, "added_at": "2025-01-01T10:00:00+00:00", "classification": "RELEVANT"},
+        {"id": 2, "url": "https://www.youtube.com/watch?v=ICQRofCNocA", "processed": True,
+         "subtitles": "text", "priority": 5, "added_at": "2025-02-01T10:00:00+00:00", "classification": None},
+        {"id": 3, "url": "https://youtu.be/giT0ytynSqg", "processed": False},
+        {"id": 4, "url": "https://www.youtube.com/watch?v=RO7nt-CyYiE", "processed": False},
+    ]
+    groups = find_duplicate_groups(rows)
+    assert set(groups) == {"ICQRofCNocA", "giT0ytynSqg"}
+
+    plan = merge_group("ICQRofCNocA", groups["ICQRofCNocA"])
+    assert plan.keeper_id == 2 and plan.delete_ids == [1]
+    assert plan.url is None
+    assert plan.patch == {"classification": "RELEVANT", "added_at": "2025-01-01T10:00:00+00:00"}
+
+    single = merge_group("giT0ytynSqg", groups["giT0ytynSqg"])
+    assert single.delete_ids == [] and single.url == "https://www.youtube.com/watch?v=giT0ytynSqg"
@@ -0,0 +1,67 @@
+"""
+Test VideoIdSet
+===============
+Testet die 64-Bit-Kodierung der Video-IDs, die Batch-Mitgliedschaft und die
+Persistenz der kompakten ID-Menge.
+"""
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from src.video_id import encode_video_id, decode_video_id, is_encodable
+from src.video_id_set import VideoIdSet, encode_video_ids
+from src.known_index import KnownUrlIndex
+
+IDS = ["ICQRofCNocA", "dQw4w9WgXcQ", "-_-_-_-_-_E", "AAAAAAAAAAA", "__________w"]
+
+
+def test_codec_round_trip():
+    """Testet ob skalare und vektorisierte Kodierung übereinstimmen und verlustfrei sind"""
+    encoded = encode_video_ids(IDS)
+    assert encoded.dtype == np.uint64
+    assert [int(v) for v in encoded] == [encode_video_id(v) for v in IDS]
+    assert [decode_video_id(int(v)) for v in encoded] == IDS
+
+
+@pytest.mark.parametrize("value", ["ICQRofCNocB", "zu-kurz", "ICQRofCNoc!", "ICQRofCNocÄ"])
+def test_rejects_non_encodable(value):
+    """Testet ob ungültige IDs (auch ein letztes Zeichen mit gesetzten Low-Bits) abgelehnt werden"""
+    assert not is_encodable(value)
+    with pytest.raises(ValueError):
+        encode_video_ids([value])
+
+
+def test_contains_missing_and_add():
+    """Testet Batch-Mitgliedschaft, Batch-Diff in Eingabereihenfolge und das Einmischen"""
+    s = VideoIdSet.from_ids(IDS[:3] + IDS[:1])
+    assert len(s) == 3 and s.nbytes == 24
+    assert list(s.contains_many(IDS)) == [True, True, True, False, False]
+    assert s.missing(list(reversed(IDS))) == [IDS[4], IDS[3]]
+    assert "ICQRofCNocB" not in s
+    s.add_many(IDS[3:])
+    assert len(s) == 5 and sorted(s) == sorted(IDS)
+
+
+def test_save_and_load(tmp_path):
+    """Testet ob die rohe uint64-Datei identisch zurückgelesen wird"""
+    s = VideoIdSet.from_ids(IDS)
+    s.save(tmp_path / "known.ids")
+    assert (tmp_path / "known.ids").stat().st_size == 8 * len(IDS)
+    loaded = VideoIdSet.load(tmp_path / "known.ids")
+    assert np.array_equal(loaded.values, s.values)
+    assert list(loaded.contains_many(IDS)) == [True] * len(IDS)
+
+
+def test_known_index_filter_new(tmp_path):
+    """Testet den Batch-Diff des URL-Index für ID-Varianten und URLs ohne ID"""
+    index = KnownUrlIndex(tmp_path / "known.json")
+    index.add(["https://www.youtube.com/watch?v=ICQRofCNocA", "https://example.com/x"])
+    index.save()
+    reloaded = KnownUrlIndex(tmp_path / "known.json")
+    urls = ["https://youtu.be/ICQRofCNocA?si=abc", "https://example.com/x",
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ", "https://example.com/y"]
+    assert reloaded.filter_new(urls) == urls[2:]
+    assert len(reloaded.ids) == 1 and reloaded.extra == {"https://example.com/x"}